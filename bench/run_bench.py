@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Offline throughput benchmark for domain-security-monitor.py and cloudflare-detector.py.
+
+Starts the stubs from ``bench/stubs.py``, points each tool at them through
+its normal CLI flags, runs it over N synthetic domains as a subprocess and
+reports domains/sec, per-domain latency percentiles (from the tool's own
+``--profile-export``) and peak RSS. ``--save`` writes the report as a
+baseline; ``--compare`` fails the run when a metric regresses past
+``--max-regression``.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stubs import SERVICES, Faults, StubSet, parse_faults  # noqa: E402
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+TOOLS = ("monitor", "detector")
+DEFAULT_DOMAINS = 200
+# Metric -> True when higher is better.
+COMPARED_METRICS = {"domains_per_sec": True, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def tool_command(tool: str, stubs: StubSet, input_file: Path, profile_file: Path, work: Path, args: argparse.Namespace) -> list[str]:
+    ep = stubs.endpoints()
+    if tool == "monitor":
+        bootstrap = work / "rdap_bootstrap.json"
+        bootstrap.write_text(
+            json.dumps({"services": [[[stubs.zone.suffix.rsplit(".", 1)[-1]], [f"http://{ep['rdap']}/"]]]}),
+            encoding="utf-8",
+        )
+        cmd = [
+            sys.executable, str(REPO_DIR / "domain-security-monitor.py"),
+            "--input-file", str(input_file),
+            "--output", "ndjson",
+            "--nameserver", ep["dns"],
+            "--rdap-bootstrap", str(bootstrap),
+            "--rdap-rate", "10000",
+            "--whois-server", f"{stubs.zone.suffix.rsplit('.', 1)[-1]}={ep['whois']}",
+            "--whois-rate", "10000",
+            "--whois-connections", "64",
+            "--concurrency", str(args.concurrency),
+            "--profile-export", str(profile_file),
+        ]
+    else:
+        cmd = [
+            sys.executable, str(REPO_DIR / "cloudflare-detector.py"),
+            "--file", str(input_file),
+            "--output", "ndjson",
+            "--resolver", "doh,native",
+            "--doh-url", f"http://{ep['http']}/resolve",
+            "--nameserver", ep["dns"],
+            "--probe-connect", ep["http"],
+            "--concurrency", str(args.concurrency),
+            "--profile-export", str(profile_file),
+        ]
+    if args.no_cache:
+        cmd.append("--no-dns-cache")
+    return cmd
+
+
+def run_tool(tool: str, stubs: StubSet, domains: int, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="dns-bench-") as tmp:
+        work = Path(tmp)
+        input_file = work / "domains.txt"
+        with input_file.open("w", encoding="utf-8") as fh:
+            for i in range(domains):
+                fh.write(stubs.zone.domain(i) + "\n")
+        profile_file = work / "profile.json"
+        out_file = work / "out.ndjson"
+        err_file = work / "err.txt"
+        cmd = tool_command(tool, stubs, input_file, profile_file, work, args)
+
+        before = stubs.counters()
+        started = time.perf_counter()
+        with out_file.open("wb") as out, err_file.open("wb") as err:
+            proc = subprocess.Popen(cmd, stdout=out, stderr=err, cwd=REPO_DIR)
+            # wait4 reports the child's own peak RSS (ru_maxrss is KiB on Linux).
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - started
+        after = stubs.counters()
+
+        with out_file.open(encoding="utf-8") as fh:
+            results = sum(1 for line in fh if line.strip())
+        try:
+            profile = json.loads(profile_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            profile = {}
+        stage = profile.get("stages", {}).get("domain", {})
+        report = {
+            "tool": tool,
+            "domains": domains,
+            "results": results,
+            "exit_code": proc.returncode,
+            "seconds": round(elapsed, 3),
+            "domains_per_sec": round(results / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": stage.get("p50_ms", 0.0),
+            "p95_ms": stage.get("p95_ms", 0.0),
+            "p99_ms": stage.get("p99_ms", 0.0),
+            "max_ms": stage.get("max_ms", 0.0),
+            "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "upstream_requests": {k: after[k] - before[k] for k in after},
+            "stages": {k: v for k, v in profile.get("stages", {}).items() if k != "domain"},
+        }
+        if proc.returncode != 0:
+            report["stderr_tail"] = err_file.read_text(encoding="utf-8", errors="replace")[-2000:]
+        return report
+
+
+def compare(current: list[dict[str, Any]], baseline: list[dict[str, Any]], max_regression: float) -> list[str]:
+    """Return one line per metric that got worse than ``baseline`` by more than ``max_regression``."""
+    base = {r["tool"]: r for r in baseline}
+    problems = []
+    for rep in current:
+        old = base.get(rep["tool"])
+        if not old:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            was, now = float(old.get(metric) or 0), float(rep.get(metric) or 0)
+            if not was:
+                continue
+            change = (was - now) / was if higher_is_better else (now - was) / was
+            if change > max_regression:
+                problems.append(f"{rep['tool']}: {metric} {was:g} -> {now:g} ({change:+.0%} worse)")
+    return problems
+
+
+def render_text(reports: list[dict[str, Any]]) -> str:
+    header = f"{'TOOL':<10} {'DOMAINS':>8} {'SECONDS':>9} {'DOM/S':>9} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'RSS MB':>8}"
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r['tool']:<10} {r['results']:>8} {r['seconds']:>9} {r['domains_per_sec']:>9} "
+            f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['peak_rss_mb']:>8}"
+        )
+        ups = ", ".join(f"{k}={v}" for k, v in r["upstream_requests"].items())
+        lines.append(f"{'':<10} upstream requests: {ups}")
+        if r["exit_code"] != 0:
+            lines.append(f"{'':<10} exit code {r['exit_code']}: {r.get('stderr_tail', '').strip()[-300:]}")
+    return "\n".join(lines) + "\n"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Benchmark the Python tools against local stub upstreams")
+    p.add_argument("--domains", type=int, default=DEFAULT_DOMAINS, help="Synthetic domains per tool")
+    p.add_argument("--tool", action="append", choices=TOOLS, help="Tool to run (repeatable; default both)")
+    p.add_argument("--concurrency", type=int, default=16, help="--concurrency passed to domain-security-monitor.py")
+    p.add_argument("--latency", type=float, default=2.0, help="Base latency in ms for every stub")
+    p.add_argument("--jitter", type=float, default=1.0, help="Latency jitter in ms for every stub")
+    p.add_argument("--loss", type=float, default=0.0, help="Fraction of requests silently dropped by every stub")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error (SERVFAIL/503)")
+    p.add_argument("--fault", action="append", default=[], metavar="SERVICE:SPEC", help="Per-service override, e.g. rdap:latency=40,error=0.05")
+    p.add_argument("--seed", type=int, default=1, help="Seed for the stubs' fault injection")
+    p.add_argument("--no-cache", action="store_true", help="Run the tools with --no-dns-cache")
+    p.add_argument("--json", action="store_true", help="Print the report as JSON")
+    p.add_argument("--save", metavar="FILE", help="Write the report to FILE for later --compare")
+    p.add_argument("--compare", metavar="FILE", help="Baseline report to compare against")
+    p.add_argument("--max-regression", type=float, default=0.20, help="Allowed fractional regression per metric (default 0.20)")
+    args = p.parse_args()
+
+    base = Faults(args.latency / 1000.0, args.jitter / 1000.0, args.loss, args.error_rate, seed=args.seed)
+    faults = {name: base for name in SERVICES}
+    try:
+        for item in args.fault:
+            service, _, spec = item.partition(":")
+            for name in SERVICES if service == "all" else (service,):
+                if name not in SERVICES:
+                    raise ValueError(f"unknown service {name!r}")
+                faults[name] = parse_faults(spec, faults[name])
+    except ValueError as exc:
+        p.error(str(exc))
+    # Give every service its own RNG so one stub's traffic does not shift another's faults.
+    faults = {name: Faults(f.latency, f.jitter, f.loss, f.error_rate, seed=args.seed + i) for i, (name, f) in enumerate(faults.items())}
+
+    reports = []
+    with StubSet(faults) as stubs:
+        for tool in args.tool or TOOLS:
+            reports.append(run_tool(tool, stubs, args.domains, args))
+
+    if args.json:
+        print(json.dumps({"reports": reports}, indent=2))
+    else:
+        sys.stdout.write(render_text(reports))
+    if args.save:
+        Path(args.save).write_text(json.dumps({"reports": reports}, indent=2) + "\n", encoding="utf-8")
+
+    rc = 1 if any(r["exit_code"] != 0 for r in reports) else 0
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")).get("reports", [])
+        problems = compare(reports, baseline, args.max_regression)
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if problems:
+            rc = 1
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""Local stand-ins for every upstream the Python tools talk to.
+
+- ``DnsServer``: UDP and TCP on one port, answering a synthetic zone set
+- ``RdapServer``: HTTP/1.1 keep-alive RDAP ``/domain/<name>`` answers
+- ``WhoisServer``: port-43 style server with a ``Registry Expiry Date:`` line
+- ``HttpServer``: Cloudflare-style response headers plus a DoH JSON
+  ``/resolve`` endpoint backed by the same zone
+
+Each server takes a ``Faults`` profile (latency, jitter, loss, error rate).
+Run this file directly to keep the stubs up for manual testing.
+"""
+
+import argparse
+import heapq
+import json
+import random
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dnsanalysis.resolver import RR_TYPES, decode_name, encode_name  # noqa: E402
+
+BENCH_SUFFIX = "bench.test"
+_TYPE_NAMES = {v: k for k, v in RR_TYPES.items()}
+
+
+@dataclass
+class Faults:
+    """Per-service fault profile; latency/jitter in seconds, rates in 0..1."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    loss: float = 0.0
+    error_rate: float = 0.0
+    seed: int | None = None
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def drop(self) -> bool:
+        return self._roll(self.loss)
+
+    def fail(self) -> bool:
+        return self._roll(self.error_rate)
+
+
+def parse_faults(spec: str, base: Faults | None = None) -> Faults:
+    """Parse ``latency=5,jitter=2,loss=0.01,error=0.02`` (milliseconds for times)."""
+    base = base or Faults()
+    values = {"latency": base.latency, "jitter": base.jitter, "loss": base.loss, "error_rate": base.error_rate}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, sep, raw = part.partition("=")
+        if not sep:
+            raise ValueError(f"expected key=value, got {part!r}")
+        key = {"error": "error_rate", "errors": "error_rate"}.get(key.strip(), key.strip())
+        if key not in values:
+            raise ValueError(f"unknown fault setting {key!r}")
+        num = float(raw)
+        values[key] = num / 1000.0 if key in ("latency", "jitter") else num
+    return Faults(seed=base.seed, **values)
+
+
+# -- synthetic zone --------------------------------------------------------
+
+
+NAMESERVER_ADDRESSES = {"ns1.bench-dns.test": "127.0.0.1", "ns2.bench-dns.test": "127.0.0.2"}
+
+
+class SyntheticZone:
+    """Deterministic records for ``d<i>.bench.test``.
+
+    Every fourth domain is delegated to Cloudflare nameservers and addressed
+    inside 104.16.0.0/13; even domains publish ``selector1`` DKIM (so
+    ``_domainkey`` is an empty non-terminal) and odd ones have no
+    ``_domainkey`` subtree at all, exercising the NXDOMAIN short-circuit.
+    ``mail.`` and ``direct.`` hosts sit outside every provider range,
+    ``dev.`` shares the apex address, and every fifth domain has a
+    wildcard ``A`` record for its other (non-underscore) labels.
+
+    The zone itself is delegated to ``ns1``/``ns2.bench-dns.test``; ``ns1``
+    is the stub's own address and ``ns2`` an unused loopback address, so
+    ``ns-integrity`` runs see one healthy and one unreachable server. Replies
+    to non-recursive queries carry the AA bit.
+    """
+
+    ttl = 300
+    soa = ("ns1.bench-dns.test", "hostmaster.bench.test", 1, 7200, 900, 1209600, 300)
+
+    def __init__(self, suffix: str = BENCH_SUFFIX) -> None:
+        self.suffix = suffix
+
+    def domain(self, i: int) -> str:
+        return f"d{i}.{self.suffix}"
+
+    def _index(self, name: str) -> tuple[str, int] | None:
+        head = name[: -len(self.suffix) - 1] if name.endswith("." + self.suffix) else None
+        if not head:
+            return None
+        prefix, _, leaf = head.rpartition(".")
+        if not leaf.startswith("d") or not leaf[1:].isdigit():
+            return None
+        return prefix, int(leaf[1:])
+
+    def lookup(self, name: str, rtype: str) -> tuple[str, list[str]]:
+        """Return (rcode, values) with values in presentation format."""
+        name = name.lower().rstrip(".")
+        if name == f"_spf.{self.suffix}":
+            return "NOERROR", (['"v=spf1 ip4:192.0.2.0/24 -all"'] if rtype == "TXT" else [])
+        if name == self.suffix and rtype == "NS":
+            return "NOERROR", ["ns1.bench-dns.test", "ns2.bench-dns.test"]
+        if name in NAMESERVER_ADDRESSES:
+            return "NOERROR", ([NAMESERVER_ADDRESSES[name]] if rtype == "A" else [])
+        hit = self._index(name)
+        if hit is None:
+            return ("NOERROR", []) if name == self.suffix else ("NXDOMAIN", [])
+        prefix, i = hit
+        cloudflare = i % 4 == 0
+        rrsets: dict[str, list[str]] = {}
+        if prefix == "":
+            rrsets = {
+                "A": [f"104.16.{i // 250 % 256}.{i % 250 + 1}" if cloudflare else f"192.0.2.{i % 250 + 1}"],
+                "NS": (["amy.ns.cloudflare.com", "bob.ns.cloudflare.com"] if cloudflare else ["ns1.bench-dns.test", "ns2.bench-dns.test"]),
+                "TXT": [f'"v=spf1 include:_spf.{self.suffix} -all"'],
+                "SOA": [" ".join(str(x) for x in self.soa)],
+            }
+        elif prefix == "_dmarc":
+            rrsets = {"TXT": ['"v=DMARC1; p=reject; rua=mailto:dmarc@bench.test"']}
+        elif prefix == "www":
+            rrsets = {"CNAME": [self.domain(i)]}
+        elif i % 2 == 0 and prefix == "_domainkey":
+            rrsets = {}
+        elif i % 2 == 0 and prefix == "selector1._domainkey":
+            rrsets = {"TXT": ['"v=DKIM1; k=rsa; p=MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQC"']}
+        elif prefix in ("mail", "direct"):
+            rrsets = {"A": [f"198.51.100.{i % 250 + 1}"]}
+        elif prefix == "dev":
+            return self.lookup(self.domain(i), rtype) if rtype == "A" else ("NOERROR", [])
+        elif i % 5 == 0 and "_" not in prefix:
+            rrsets = {"A": [f"203.0.113.{i % 250 + 1}"]}
+        else:
+            return "NXDOMAIN", []
+        return "NOERROR", rrsets.get(rtype, [])
+
+
+def _txt_rdata(value: str) -> bytes:
+    out = b""
+    for chunk in value.split('" "'):
+        raw = chunk.strip('"').encode("utf-8")
+        for k in range(0, max(len(raw), 1), 255):
+            piece = raw[k : k + 255]
+            out += bytes([len(piece)]) + piece
+    return out
+
+
+def encode_rdata(rtype: str, value: str) -> bytes:
+    if rtype == "A":
+        return socket.inet_pton(socket.AF_INET, value)
+    if rtype == "AAAA":
+        return socket.inet_pton(socket.AF_INET6, value)
+    if rtype in ("NS", "CNAME", "PTR"):
+        return encode_name(value)
+    if rtype == "TXT":
+        return _txt_rdata(value)
+    if rtype == "SOA":
+        mname, rname, *nums = value.split()
+        return encode_name(mname) + encode_name(rname) + struct.pack("!IIIII", *(int(n) for n in nums))
+    raise ValueError(f"stub cannot encode {rtype}")
+
+
+def build_response(query: bytes, zone: SyntheticZone, servfail: bool = False, max_udp: int | None = None) -> bytes | None:
+    if len(query) < 12:
+        return None
+    qid, flags, qdcount = struct.unpack("!HHH", query[:6])
+    if qdcount != 1:
+        return None
+    try:
+        name, off = decode_name(query, 12)
+        qtype, _ = struct.unpack("!HH", query[off : off + 4])
+    except (ValueError, IndexError, struct.error):
+        return None
+    question = query[12 : off + 4]
+    base_flags = 0x8180 if flags & 0x0100 else 0x8480
+    if servfail:
+        return struct.pack("!HHHHHH", qid, base_flags | 2, 1, 0, 0, 0) + question
+
+    rtype = _TYPE_NAMES.get(qtype, "")
+    rcode, values = zone.lookup(name, rtype) if rtype else ("NOERROR", [])
+    answers = b"".join(
+        b"\xc0\x0c" + struct.pack("!HHIH", qtype, 1, zone.ttl, len(rd)) + rd
+        for rd in (encode_rdata(rtype, v) for v in values)
+    )
+    authority = b""
+    nauth = 0
+    if not values:
+        soa = encode_rdata("SOA", " ".join(str(x) for x in zone.soa))
+        authority = encode_name(zone.suffix) + struct.pack("!HHIH", 6, 1, zone.ttl, len(soa)) + soa
+        nauth = 1
+    rc = 3 if rcode == "NXDOMAIN" else 0
+    msg = struct.pack("!HHHHHH", qid, base_flags | rc, 1, len(values), nauth, 0) + question + answers + authority
+    if max_udp is not None and len(msg) > max_udp:
+        return struct.pack("!HHHHHH", qid, base_flags | 0x0200, 1, 0, 0, 0) + question
+    return msg
+
+
+# -- DNS -------------------------------------------------------------------
+
+
+class DnsServer:
+    """UDP + TCP DNS stub; delayed UDP replies are released by one sender thread."""
+
+    def __init__(self, zone: SyntheticZone, faults: Faults, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.zone = zone
+        self.faults = faults
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.udp.bind((host, port))
+        self.address = self.udp.getsockname()
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind(self.address)
+        self.tcp.listen(128)
+        self.queries = 0
+        self._pending: list[tuple[float, int, bytes, tuple[str, int]]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def start(self) -> "DnsServer":
+        for target in (self._recv_udp, self._send_udp, self._accept_tcp):
+            threading.Thread(target=target, daemon=True).start()
+        return self
+
+    def _recv_udp(self) -> None:
+        while not self._closed:
+            try:
+                data, addr = self.udp.recvfrom(4096)
+            except OSError:
+                return
+            self.queries += 1
+            if self.faults.drop():
+                continue
+            reply = build_response(data, self.zone, self.faults.fail(), max_udp=1232)
+            if reply is None:
+                continue
+            with self._cond:
+                self._seq += 1
+                heapq.heappush(self._pending, (time.monotonic() + self.faults.delay(), self._seq, reply, addr))
+                self._cond.notify()
+
+    def _send_udp(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._pending or self._pending[0][0] > time.monotonic()):
+                    self._cond.wait(self._pending[0][0] - time.monotonic() if self._pending else None)
+                if self._closed:
+                    return
+                _, _, reply, addr = heapq.heappop(self._pending)
+            try:
+                self.udp.sendto(reply, addr)
+            except OSError:
+                pass
+
+    def _accept_tcp(self) -> None:
+        while not self._closed:
+            try:
+                conn, _ = self.tcp.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_tcp, args=(conn,), daemon=True).start()
+
+    def _serve_tcp(self, conn: socket.socket) -> None:
+        with conn:
+            conn.settimeout(10)
+            try:
+                while True:
+                    head = conn.recv(2)
+                    if len(head) < 2:
+                        return
+                    (size,) = struct.unpack("!H", head)
+                    data = b""
+                    while len(data) < size:
+                        chunk = conn.recv(size - len(data))
+                        if not chunk:
+                            return
+                        data += chunk
+                    self.queries += 1
+                    if self.faults.drop():
+                        return
+                    reply = build_response(data, self.zone, self.faults.fail())
+                    if reply is None:
+                        return
+                    time.sleep(self.faults.delay())
+                    conn.sendall(struct.pack("!H", len(reply)) + reply)
+            except OSError:
+                return
+
+    def close(self) -> None:
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        self.udp.close()
+        self.tcp.close()
+
+
+# -- HTTP based stubs ------------------------------------------------------
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], handler: type, zone: SyntheticZone, faults: Faults) -> None:
+        super().__init__(address, handler)
+        self.zone = zone
+        self.faults = faults
+        self.requests = 0
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _StubHTTPServer
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str], head_only: bool = False) -> None:
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _faulted(self) -> bool:
+        """Apply latency; returns True if the request was dropped or answered with an error."""
+        self.server.requests += 1
+        if self.server.faults.drop():
+            self.close_connection = True
+            return True
+        time.sleep(self.server.faults.delay())
+        if self.server.faults.fail():
+            self._send(503, b"", {"Retry-After": "0"})
+            return True
+        return False
+
+
+def _expiry_for(name: str) -> datetime:
+    """Stable per-name expiry date (midnight UTC) 30-730 days from today."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=30 + sum(map(ord, name)) % 700)
+
+
+class _RdapHandler(_StubHandler):
+    def do_GET(self) -> None:
+        if self._faulted():
+            return
+        path = urlsplit(self.path).path
+        if not path.startswith("/domain/"):
+            self._send(404, b"{}", {"Content-Type": "application/rdap+json"})
+            return
+        name = path[len("/domain/") :].lower()
+        rcode, _ = self.server.zone.lookup(name, "SOA")
+        if rcode == "NXDOMAIN":
+            self._send(404, b'{"errorCode":404}', {"Content-Type": "application/rdap+json"})
+            return
+        expires = _expiry_for(name)
+        payload = {
+            "objectClassName": "domain",
+            "ldhName": name,
+            "events": [
+                {"eventAction": "registration", "eventDate": "2015-01-01T00:00:00Z"},
+                {"eventAction": "expiration", "eventDate": expires.strftime("%Y-%m-%dT%H:%M:%SZ")},
+            ],
+        }
+        self._send(200, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/rdap+json"})
+
+
+class _WebHandler(_StubHandler):
+    def _headers(self) -> dict[str, str]:
+        ray = f"{random.getrandbits(64):016x}-LHR"
+        return {"Server": "cloudflare", "CF-RAY": ray, "CF-Cache-Status": "DYNAMIC", "Content-Type": "text/html"}
+
+    def do_HEAD(self) -> None:
+        if not self._faulted():
+            self._send(200, b"", self._headers(), head_only=True)
+
+    def do_GET(self) -> None:
+        if self._faulted():
+            return
+        parts = urlsplit(self.path)
+        if parts.path == "/resolve":
+            self._doh(parse_qs(parts.query))
+            return
+        self._send(200, b"<html>bench</html>", self._headers())
+
+    def _doh(self, query: dict[str, list[str]]) -> None:
+        name = (query.get("name") or [""])[0]
+        rtype = (query.get("type") or ["A"])[0].upper()
+        zone = self.server.zone
+        rcode, values = zone.lookup(name, rtype)
+        payload: dict[str, object] = {"Status": 3 if rcode == "NXDOMAIN" else 0, "Question": [{"name": name, "type": RR_TYPES.get(rtype, 0)}]}
+        if values:
+            payload["Answer"] = [{"name": name, "type": RR_TYPES.get(rtype, 0), "TTL": zone.ttl, "data": v} for v in values]
+        else:
+            payload["Authority"] = [{"name": zone.suffix, "type": 6, "TTL": zone.ttl, "data": " ".join(str(x) for x in zone.soa)}]
+        self._send(200, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/dns-json"})
+
+
+class _HttpStub:
+    handler: type = _StubHandler
+
+    def __init__(self, zone: SyntheticZone, faults: Faults, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.httpd = _StubHTTPServer((host, port), self.handler, zone, faults)
+        self.address = self.httpd.server_address[:2]
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self) -> "_HttpStub":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RdapServer(_HttpStub):
+    handler = _RdapHandler
+
+
+class HttpServer(_HttpStub):
+    handler = _WebHandler
+
+
+# -- WHOIS -----------------------------------------------------------------
+
+
+class _WhoisHandler(socketserver.StreamRequestHandler):
+    server: "_WhoisTCPServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline(1024).decode("utf-8", errors="replace").strip()
+        self.server.requests += 1
+        faults = self.server.faults
+        if faults.drop():
+            return
+        time.sleep(faults.delay())
+        if faults.fail():
+            self.wfile.write(b"% Query rate limit exceeded\r\n")
+            return
+        name = line.split()[-1].lower() if line else ""
+        rcode, _ = self.server.zone.lookup(name, "SOA")
+        if rcode == "NXDOMAIN":
+            self.wfile.write(f'No match for "{name.upper()}".\r\n'.encode("utf-8"))
+            return
+        expires = _expiry_for(name)
+        body = (
+            f"Domain Name: {name.upper()}\r\n"
+            "Registrar: Bench Registrar\r\n"
+            "Creation Date: 2015-01-01T00:00:00Z\r\n"
+            f"Registry Expiry Date: {expires.strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+        )
+        self.wfile.write(body.encode("utf-8"))
+
+
+class _WhoisTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], zone: SyntheticZone, faults: Faults) -> None:
+        super().__init__(address, _WhoisHandler)
+        self.zone = zone
+        self.faults = faults
+        self.requests = 0
+
+
+class WhoisServer(_HttpStub):
+    def __init__(self, zone: SyntheticZone, faults: Faults, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.httpd = _WhoisTCPServer((host, port), zone, faults)  # type: ignore[assignment]
+        self.address = self.httpd.server_address[:2]
+
+
+# -- bundle ----------------------------------------------------------------
+
+SERVICES = ("dns", "rdap", "whois", "http")
+
+
+class StubSet:
+    """All four stubs sharing one zone; ``faults`` maps service name -> Faults."""
+
+    def __init__(self, faults: dict[str, Faults] | None = None, zone: SyntheticZone | None = None) -> None:
+        faults = faults or {}
+        self.zone = zone or SyntheticZone()
+        self.dns = DnsServer(self.zone, faults.get("dns", Faults()))
+        self.rdap = RdapServer(self.zone, faults.get("rdap", Faults()))
+        self.whois = WhoisServer(self.zone, faults.get("whois", Faults()))
+        self.http = HttpServer(self.zone, faults.get("http", Faults()))
+
+    def __enter__(self) -> "StubSet":
+        for stub in (self.dns, self.rdap, self.whois, self.http):
+            stub.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        for stub in (self.dns, self.rdap, self.whois, self.http):
+            stub.close()
+
+    def endpoints(self) -> dict[str, str]:
+        return {name: "{}:{}".format(*getattr(self, name).address) for name in SERVICES}
+
+    def counters(self) -> dict[str, int]:
+        return {"dns": self.dns.queries, "rdap": self.rdap.requests, "whois": self.whois.requests, "http": self.http.requests}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark stub servers in the foreground")
+    parser.add_argument("--fault", action="append", default=[], metavar="SERVICE:SPEC", help="e.g. dns:latency=5,loss=0.01 (repeatable; SERVICE may be 'all')")
+    args = parser.parse_args()
+    faults: dict[str, Faults] = {}
+    for item in args.fault:
+        service, _, spec = item.partition(":")
+        for name in SERVICES if service == "all" else (service,):
+            faults[name] = parse_faults(spec, faults.get(name))
+    with StubSet(faults) as stubs:
+        print(json.dumps(stubs.endpoints()), flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,41 +2,48 @@
 import sys
 if len(sys.argv) > 1 and sys.argv[1] in ("-a", "--author"):
     print("Author: FoxSecIntel")
-    print("Repository: https://github.com/FoxSecIntel/DNS-analysis
+    print("Repository: https://github.com/FoxSecIntel/DNS-analysis")
     print("Tool: cloudflare-detector.py")
     raise SystemExit(0)
 
 
 import argparse
 import base64
-import ipaddress
 import json
 import re
-import socket
+import signal
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import List
-from urllib.error import URLError, HTTPError
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+
+from dnsanalysis import profiling
+from dnsanalysis.backends import BACKENDS, DEFAULT_DOH_URL, BackendChain, BackendError, build_chain
+from dnsanalysis.cache import DnsCache
+from dnsanalysis.client import default_address
+from dnsanalysis.httpprobe import HttpProber, ProbeResult
+from dnsanalysis.ipranges import DEFAULT_RANGES_FILE, RangeIndex, parse_ip, update_ranges
+from dnsanalysis.ratelimit import TokenBucket
+from dnsanalysis.serve import BadRequest, QueryServer, is_local_address
+from dnsanalysis.stream import Deduper, iter_lines, unique
+from dnsanalysis.sweep import DEFAULT_WILDCARD_PROBES, Sweeper
 
 VERSION = "1.2.0"
 
-try:
-    import dns.resolver  # type: ignore
-except Exception:  # dnspython optional
-    dns = None
-
-# Representative Cloudflare anycast ranges (not exhaustive, but high-signal)
-CF_CIDRS = [
-    "103.21.244.0/22", "103.22.200.0/22", "103.31.4.0/22", "104.16.0.0/13",
-    "104.24.0.0/14", "108.162.192.0/18", "131.0.72.0/22", "141.101.64.0/18",
-    "162.158.0.0/15", "172.64.0.0/13", "173.245.48.0/20", "188.114.96.0/20",
-    "190.93.240.0/20", "197.234.240.0/22", "198.41.128.0/17",
-    "2400:cb00::/32", "2405:8100::/32", "2405:b500::/32", "2606:4700::/32",
-    "2803:f800::/32", "2a06:98c0::/29", "2c0f:f248::/32",
-]
-CF_NETS = [ipaddress.ip_network(c) for c in CF_CIDRS]
+# Provider prefixes (Cloudflare, Fastly, CloudFront, ...) come from versioned range files.
+IP_RANGES = None  # type: RangeIndex | None  (configured by main; default file loaded on first use)
+CLASSIFY_BATCH = 65536
+DNS_CACHE = None  # type: DnsCache | None  (configured by main)
+RESOLVER = None  # type: BackendChain | None  (configured by main; every available backend by default)
+PROBE_CONNECT = None  # type: str | None  (host:port every header probe connects to; Host header keeps the domain)
+PROBER = None  # type: HttpProber | None  (configured by main)
+MODES = ("evidence", "fast")
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PROBE_TIMEOUT = 5.0
+DEFAULT_SWEEP_QPS = 500.0
 __r17q_blob = "wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
 
 
@@ -48,33 +55,32 @@ def normalise_domain(raw):
     return d
 
 
-def dns_query(domain, rtype):
-    records = []  # type: List[str]
+def resolver():
+    global RESOLVER
+    if RESOLVER is None:
+        RESOLVER = build_chain(["auto"])
+    return RESOLVER
 
-    # 1) dnspython path (preferred)
-    if dns is not None:
-        try:
-            answers = dns.resolver.resolve(domain, rtype)
-            records = [str(a).strip().rstrip('.') for a in answers]
-            if records:
-                return records
-        except Exception:
-            pass
-
-    # 2) DoH fallback (no dig/nslookup dependency)
-    try:
-        params = urlencode({"name": domain, "type": rtype})
-        req = Request(f"https://dns.google/resolve?{params}", headers={"User-Agent": "Mozilla/5.0"})
-        with urlopen(req, timeout=7) as r:
-            payload = json.loads(r.read().decode("utf-8", errors="ignore"))
-            for ans in payload.get("Answer", []) or []:
-                data = str(ans.get("data", "")).strip().rstrip('.')
-                if data:
-                    records.append(data)
-    except Exception:
-        pass
 
-    return records
+def dns_answer(domain, rtype, limiter=None):
+    """(rcode, records) for one lookup; ``limiter`` (a TokenBucket) gates cache misses only."""
+    started = time.perf_counter()
+    if DNS_CACHE is not None:
+        cached = DNS_CACHE.get(domain, rtype)
+        if cached is not None:
+            profiling.observe("dns", time.perf_counter() - started, "cache", "hit")
+            return cached.rcode, [r.strip().rstrip('.') for r in cached.records]
+
+    if limiter is not None:
+        limiter.acquire()
+    result = resolver().query(domain, rtype)
+    if DNS_CACHE is not None and result.rcode in ("NOERROR", "NXDOMAIN"):
+        DNS_CACHE.put(domain, rtype, result.records, result.rcode, result.ttl)
+    return result.rcode, [r.strip().rstrip('.') for r in result.records]
+
+
+def dns_query(domain, rtype):
+    return dns_answer(domain, rtype)[1]
 
 
 def dns_ns_check(domain):
@@ -83,48 +89,59 @@ def dns_ns_check(domain):
     return is_cf, ns_records
 
 
-def header_check(domain):
-    headers_out = {}
+def http_prober():
+    global PROBER
+    if PROBER is None:
+        PROBER = HttpProber(DEFAULT_PROBE_TIMEOUT, PROBE_CONNECT)
+    return PROBER
+
+
+def _cf_headers(headers):
+    return "cf-ray" in headers or "cf-cache-status" in headers or "cloudflare" in headers.get("server", "").lower()
+
+
+def _probe_info(res):
+    if res.status is None:
+        return {"status": "failed", "error": res.error}
+    return {"status": "done", "scheme": res.scheme, "method": res.method, "http_status": res.status}
+
+
+def header_check(domain, ips=()):
+    """HEAD-first probe over https, then http; returns (is_cf, headers, probe info)."""
+    prober = http_prober()
+    address = next((ip for ip in ips if ":" not in ip), ips[0] if ips else None)
+    last = ProbeResult()
     for scheme in ("https", "http"):
-        url = f"{scheme}://{domain}"
-        try:
-            req = Request(url, headers={"User-Agent": "Mozilla/5.0"})
-            with urlopen(req, timeout=7) as r:
-                headers = {k.lower(): v for k, v in r.headers.items()}
-                headers_out = headers
-                if "cf-ray" in headers or "cf-cache-status" in headers:
-                    return True, headers
-                if "cloudflare" in headers.get("server", "").lower():
-                    return True, headers
-        except (HTTPError, URLError, TimeoutError, ValueError):
-            continue
-        except Exception:
+        res = prober.fetch(scheme, domain, address)
+        if res.status is None:
+            if last.status is None:
+                last = res
             continue
-    return False, headers_out
+        last = res
+        if _cf_headers(res.headers):
+            return True, res.headers, _probe_info(res)
+    return False, last.headers, _probe_info(last)
 
 
+@profiling.timed("resolve")
 def resolve_ips(domain):
-    ips = set()
-    try:
-        infos = socket.getaddrinfo(domain, None)
-        for i in infos:
-            ip = i[4][0]
-            ips.add(ip)
-    except Exception:
-        pass
-    return sorted(ips)
+    return sorted({ip for rtype in ("A", "AAAA") for ip in dns_query(domain, rtype) if parse_ip(ip)})
+
+
+def ip_ranges():
+    global IP_RANGES
+    if IP_RANGES is None:
+        IP_RANGES = RangeIndex.load()
+    return IP_RANGES
+
+
+def ip_providers(ips):
+    """Map each IP that falls in a known provider range to that provider."""
+    return {ip: p for ip, p in zip(ips, ip_ranges().classify_many(list(ips))) if p}
 
 
 def ip_cf_check(ips):
-    for ip in ips:
-        try:
-            addr = ipaddress.ip_address(ip)
-            for net in CF_NETS:
-                if addr.version == net.version and addr in net:
-                    return True
-        except ValueError:
-            continue
-    return False
+    return "cloudflare" in ip_providers(ips).values()
 
 
 def cname_check(domain):
@@ -133,14 +150,40 @@ def cname_check(domain):
     return is_cf, cnames
 
 
-def check_domain(domain):
+def conclusive(ips, providers):
+    """Why the DNS/IP evidence already settles the verdict (fast mode), or None if a probe is needed."""
+    if "cloudflare" in providers.values():
+        return "resolved IPs are in Cloudflare ranges"
+    if not ips:
+        return "no resolved IPs to probe"
+    if len(providers) == len(ips):
+        return "resolved IPs belong to " + ", ".join(sorted(set(providers.values())))
+    return None
+
+
+def check_domain(domain, mode="evidence", pool=None):
+    started = time.perf_counter()
     d = normalise_domain(domain)
 
-    ns_match, ns_records = dns_ns_check(d)
-    cname_match, cnames = cname_check(d)
-    hdr_match, headers = header_check(d)
-    ips = resolve_ips(d)
-    ip_match = ip_cf_check(ips)
+    # The DNS-side checks are independent; fan them out when a pool is available.
+    if pool is not None:
+        ns_f = pool.submit(dns_ns_check, d)
+        cname_f = pool.submit(cname_check, d)
+        ips = resolve_ips(d)
+        ns_match, ns_records = ns_f.result()
+        cname_match, cnames = cname_f.result()
+    else:
+        ns_match, ns_records = dns_ns_check(d)
+        cname_match, cnames = cname_check(d)
+        ips = resolve_ips(d)
+    providers = ip_providers(ips)
+    ip_match = "cloudflare" in providers.values()
+
+    skip = conclusive(ips, providers) if mode == "fast" else None
+    if skip:
+        hdr_match, headers, probe = None, {}, {"status": "skipped", "reason": skip}
+    else:
+        hdr_match, headers, probe = header_check(d, ips)
 
     result = {
         "domain": d,
@@ -154,34 +197,101 @@ def check_domain(domain):
         "ns_records": ns_records,
         "cname_records": cnames,
         "resolved_ips": ips,
+        "ip_providers": providers,
         "header_server": headers.get("server") if headers else None,
+        "http_probe": probe,
     }
+    profiling.observe_domain(d, time.perf_counter() - started)
     return result
 
 
-def load_targets(args):
-    targets = list(args.domains or [])
-    if args.file:
-        p = Path(args.file)
-        if not p.exists():
-            print(f"Error: file not found: {p}", file=sys.stderr)
-            sys.exit(1)
-        targets.extend([l.strip() for l in p.read_text(encoding="utf-8", errors="ignore").splitlines() if l.strip() and not l.strip().startswith("#")])
-    if not targets:
-        print("No domains supplied. Use positional args or --file.", file=sys.stderr)
+def iter_checks(targets, mode="evidence", concurrency=DEFAULT_CONCURRENCY):
+    """Check targets on a bounded worker pool, yielding results in input order."""
+    concurrency = max(1, int(concurrency))
+    if concurrency == 1:
+        for t in targets:
+            yield check_domain(t, mode)
+        return
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="domain") as domain_pool, ThreadPoolExecutor(
+        max_workers=concurrency * 2, thread_name_prefix="dns"
+    ) as dns_pool:
+        window = concurrency * 4
+        pending = deque()
+        for t in targets:
+            pending.append(domain_pool.submit(check_domain, t, mode, dns_pool))
+            while pending and (len(pending) >= window or pending[0].done()):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_targets(args, deduper=None):
+    """Lazily yield unique, normalised targets from positional args and --file ("-" reads stdin)."""
+    if args.file and args.file != "-" and not Path(args.file).exists():
+        print(f"Error: file not found: {args.file}", file=sys.stderr)
         sys.exit(1)
-    return targets
+
+    def raw():
+        for t in args.domains or []:
+            yield normalise_domain(t)
+        if args.file:
+            for line in iter_lines(args.file):
+                yield normalise_domain(line)
+
+    return unique((t for t in raw() if t), deduper)
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Check whether domains are behind Cloudflare")
     parser.add_argument("domains", nargs="*", help="One or more domains")
-    parser.add_argument("-f", "--file", help="File with one domain per line")
+    parser.add_argument("-f", "--file", help="File with one domain per line (- reads stdin)")
     parser.add_argument("-m", action="store_true", help="Print hidden message")
     parser.add_argument("--json", action="store_true", help="Output JSON (legacy switch)")
-    parser.add_argument("--output", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument("--output", choices=["text", "json", "ndjson"], default="text", help="Output format")
     parser.add_argument("--no-color", action="store_true", help="Disable ANSI colours")
     parser.add_argument("--version", action="store_true", help="Show script version")
+    parser.add_argument("--dns-cache", metavar="FILE", help="Persist the DNS answer cache to this SQLite file between runs")
+    parser.add_argument("--no-dns-cache", action="store_true", help="Disable DNS answer caching")
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="evidence",
+        help="evidence: always probe HTTP headers; fast: skip the probe when DNS/IP signals are conclusive",
+    )
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Domains checked in parallel")
+    parser.add_argument("--probe-timeout", type=float, default=DEFAULT_PROBE_TIMEOUT, help="Seconds allowed per HTTP header probe")
+    parser.add_argument(
+        "--resolver",
+        action="append",
+        metavar="BACKEND",
+        help=f"Resolver backend, in fallback order (repeatable or comma-separated): {', '.join(('auto',) + BACKENDS)}. "
+        "The chain re-orders itself by measured latency. Default: auto",
+    )
+    parser.add_argument("--nameserver", action="append", help="Nameserver for the native/dnspython backends, e.g. 9.9.9.9 or 127.0.0.1:5353 (repeatable)")
+    parser.add_argument("--doh-url", default=DEFAULT_DOH_URL, help="DNS-over-HTTPS JSON endpoint for the doh backend")
+    parser.add_argument("--probe-connect", metavar="HOST:PORT", help="Send every header probe to this address (Host header keeps the domain); for test rigs")
+    parser.add_argument(
+        "--ip-ranges",
+        action="append",
+        metavar="FILE",
+        help=f"Provider range file (repeatable; later files replace a provider's prefixes). Default: {DEFAULT_RANGES_FILE.name}",
+    )
+    parser.add_argument("--classify-ips", metavar="FILE", help="Bulk mode: classify one IP per line (first field; - reads stdin) by provider and exit")
+    parser.add_argument("--sweep", metavar="ZONE", help="Sweep mode: resolve --wordlist labels under ZONE and report hosts outside Cloudflare ranges")
+    parser.add_argument("--wordlist", metavar="FILE", help="Subdomain labels for --sweep, one per line (- reads stdin)")
+    parser.add_argument("--qps", type=float, default=DEFAULT_SWEEP_QPS, help="Maximum DNS queries per second during --sweep")
+    parser.add_argument("--wildcard-probes", type=int, default=DEFAULT_WILDCARD_PROBES, help="Random labels resolved to detect a wildcard before --sweep")
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        const=default_address("cloudflare-detector"),
+        metavar="ADDRESS",
+        help="Daemon mode: keep resolver, ranges and probe pools warm and answer /check and /classify on a Unix socket "
+        "path or 127.0.0.1:PORT (default: %(const)s)",
+    )
+    parser.add_argument("--update-ip-ranges", action="store_true", help="Refresh feed-backed providers in the range file and exit")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage latency percentiles and slowest domains to stderr")
+    parser.add_argument("--profile-export", metavar="FILE", help="Write profile data as a Prometheus textfile (.prom) or JSON")
     args = parser.parse_args()
 
     if args.version:
@@ -192,19 +302,245 @@ def main() -> int:
         print(base64.b64decode(__r17q_blob).decode("utf-8", errors="replace"), end="")
         return 0
 
-    targets = load_targets(args)
-    results = [check_domain(t) for t in targets]
+    if args.update_ip_ranges:
+        target = (args.ip_ranges or [DEFAULT_RANGES_FILE])[-1]
+        counts = update_ranges(target)
+        print(json.dumps({"updated": str(target), "prefixes": counts}, indent=2))
+        return 0
+
+    global DNS_CACHE, PROBE_CONNECT, IP_RANGES, PROBER, RESOLVER
+    IP_RANGES = RangeIndex.load(args.ip_ranges or [DEFAULT_RANGES_FILE])
+    if args.classify_ips:
+        return classify_ips(args)
+
+    backends = [b.strip() for item in (args.resolver or ["auto"]) for b in item.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in ("auto",) + BACKENDS]
+    if unknown:
+        parser.error(f"unknown resolver backend: {', '.join(unknown)}")
+    try:
+        RESOLVER = build_chain(backends, args.nameserver, args.doh_url)
+    except (BackendError, ValueError) as exc:
+        parser.error(str(exc))
+    DNS_CACHE = None if args.no_dns_cache else DnsCache(path=args.dns_cache)
+    PROBE_CONNECT = args.probe_connect
+    PROBER = HttpProber(args.probe_timeout, PROBE_CONNECT)
+    prof = profiling.enable("cloudflare-detector") if args.profile or args.profile_export else None
+
+    if args.serve:
+        try:
+            return serve(args)
+        finally:
+            PROBER.close()
+            RESOLVER.close()
+            if DNS_CACHE is not None:
+                DNS_CACHE.save()
+            if prof is not None:
+                if args.profile:
+                    sys.stderr.write(prof.render_text())
+                if args.profile_export:
+                    prof.export(args.profile_export)
+
+    if args.sweep:
+        if not args.wordlist:
+            parser.error("--sweep needs --wordlist")
+        if args.wordlist != "-" and not Path(args.wordlist).exists():
+            print(f"Error: file not found: {args.wordlist}", file=sys.stderr)
+            return 1
+        try:
+            return sweep(args)
+        finally:
+            RESOLVER.close()
+            if DNS_CACHE is not None:
+                DNS_CACHE.save()
+            if prof is not None:
+                if args.profile:
+                    sys.stderr.write(prof.render_text())
+                if args.profile_export:
+                    prof.export(args.profile_export)
+
+    deduper = Deduper()
+    targets = iter_targets(args, deduper)
+    first = next(targets, None)
+    if first is None:
+        print("No domains supplied. Use positional args or --file.", file=sys.stderr)
+        return 1
+    results = iter_checks(chain([first], targets), args.mode, args.concurrency)
+
+    try:
+        return write_results(results, args)
+    finally:
+        deduper.close()
+        PROBER.close()
+        RESOLVER.close()
+        if DNS_CACHE is not None:
+            DNS_CACHE.save()
+        if prof is not None:
+            if args.profile:
+                sys.stderr.write(prof.render_text())
+            if args.profile_export:
+                prof.export(args.profile_export)
+
+
+def _first_field(line):
+    return re.split(r"[\s,;]+", line.strip(), maxsplit=1)[0]
+
+
+def classify_ips(args):
+    """Stream IPs through the range index in batches; text/ndjson emit a row per IP, json a summary."""
+    index = ip_ranges()
+    counts = {}
+    total = 0
+    summary = args.json or args.output == "json"
+    out = sys.stdout
+    batch = []
+
+    def flush():
+        nonlocal total
+        for ip, provider in zip(batch, index.classify_many(batch)):
+            total += 1
+            counts[provider or "none"] = counts.get(provider or "none", 0) + 1
+            if args.output == "ndjson":
+                out.write(json.dumps({"ip": ip, "provider": provider}, separators=(",", ":")) + "\n")
+            elif not summary:
+                out.write(f"{ip}\t{provider or '-'}\n")
+        batch.clear()
+
+    for line in iter_lines(args.classify_ips):
+        ip = _first_field(line)
+        if ip:
+            batch.append(ip)
+            if len(batch) >= CLASSIFY_BATCH:
+                flush()
+    flush()
+    if summary:
+        print(json.dumps({"count": total, "by_provider": counts, "metadata": {"ip_ranges": index.stats()}}, indent=2))
+    return 0
+
+
+def serve(args):
+    """Answer check/classify requests from the warm process until SIGTERM or Ctrl-C."""
+    if not is_local_address(args.serve):
+        print(f"Error: --serve takes a Unix socket path or 127.0.0.1:PORT, got {args.serve}", file=sys.stderr)
+        return 1
+    concurrency = max(1, args.concurrency)
+    dns_pool = ThreadPoolExecutor(max_workers=concurrency * 2, thread_name_prefix="dns")
+    slots = threading.BoundedSemaphore(concurrency)
+
+    def check(params):
+        d = normalise_domain(params.get("domain", ""))
+        if not d or "." not in d:
+            raise BadRequest("domain must be a domain name")
+        mode = params.get("mode", args.mode)
+        if mode not in MODES:
+            raise BadRequest(f"mode must be one of {', '.join(MODES)}")
+        with slots:
+            r = check_domain(d, mode, dns_pool)
+        return {"count": 1, "cloudflare_detected": int(r["cloudflare"]), "results": [r]}
+
+    def classify(params):
+        ips = [ip for ip in (params.get("ip") or "").split(",") if ip.strip()]
+        if not ips:
+            raise BadRequest("ip must be one or more comma-separated addresses")
+        results = [{"ip": ip, "provider": p} for ip, p in zip(ips, ip_ranges().classify_many(ips))]
+        return {"count": len(results), "results": results}
+
+    def stats():
+        out = {"ip_ranges": ip_ranges().versions, "http_probe": http_prober().stats(), "resolver": resolver().stats()}
+        if DNS_CACHE is not None:
+            out["dns_cache"] = DNS_CACHE.stats()
+        return out
+
+    server = QueryServer({"check": check, "classify": classify}, args.serve, stats)
+    try:
+        server.bind()
+    except OSError as exc:
+        print(f"Error: cannot listen on {args.serve}: {exc}", file=sys.stderr)
+        return 1
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
 
+    signal.signal(signal.SIGTERM, stop)
+    sys.stderr.write(f"serving check, classify on {args.serve}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dns_pool.shutdown(wait=False, cancel_futures=True)
+    return 0
+
+
+def sweep(args):
+    """Resolve wordlist labels under the zone; emit hosts with any address outside Cloudflare ranges."""
+    zone = normalise_domain(args.sweep)
+    bucket = TokenBucket(args.qps, max(1, int(args.qps // 10)))
+    sweeper = Sweeper(lambda name, rtype: dns_answer(name, rtype, bucket), args.concurrency, args.wildcard_probes)
+    deduper = Deduper()
+    summary = args.json or args.output == "json"
+    out = sys.stdout
+    hits = []
+    behind_cf = 0
+    try:
+        for hit in sweeper.sweep(zone, unique(iter_lines(args.wordlist), deduper)):
+            providers = ip_providers(hit.ips)
+            exposed = [ip for ip in hit.ips if providers.get(ip) != "cloudflare"]
+            if not exposed:
+                behind_cf += 1
+                continue
+            row = {"name": hit.name, "ips": hit.ips, "non_cloudflare_ips": exposed, "ip_providers": providers}
+            if summary:
+                hits.append(row)
+            elif args.output == "ndjson":
+                out.write(json.dumps(row, separators=(",", ":")) + "\n")
+                out.flush()
+            else:
+                labels = ", ".join(f"{ip} ({providers.get(ip, 'unknown')})" for ip in exposed)
+                print(f"{hit.name:<45} | {labels}", flush=True)
+    finally:
+        deduper.close()
+
+    stats = dict(sweeper.stats.as_dict(), behind_cloudflare=behind_cf, exposed=sweeper.stats.resolved - behind_cf)
+    wildcard = {"detected": bool(sweeper.wildcard), "ips": sorted(sweeper.wildcard.ips)}
+    if summary:
+        payload = {
+            "zone": zone,
+            "count": len(hits),
+            "results": hits,
+            "metadata": {"sweep": stats, "wildcard": wildcard, "ip_ranges": ip_ranges().versions, "resolver": resolver().stats()},
+        }
+        print(json.dumps(payload, indent=2))
+    else:
+        note = f", wildcard {', '.join(wildcard['ips'])} filtered" if wildcard["detected"] else ""
+        print(
+            f"# {zone}: {stats['candidates']} candidates, {stats['resolved']} resolved, "
+            f"{stats['exposed']} outside Cloudflare{note}",
+            file=sys.stderr,
+        )
+    return 0
+
+
+def write_results(results, args):
     output_json = args.json or args.output == "json"
     if output_json:
+        results = list(results)
         payload = {
             "count": len(results),
             "cloudflare_detected": sum(1 for r in results if r.get("cloudflare")),
             "results": results,
         }
+        payload["metadata"] = {"ip_ranges": ip_ranges().versions, "http_probe": http_prober().stats(), "resolver": resolver().stats()}
+        if DNS_CACHE is not None:
+            payload["metadata"]["dns_cache"] = DNS_CACHE.stats()
         print(json.dumps(payload, indent=2))
         return 0
 
+    if args.output == "ndjson":
+        for r in results:
+            sys.stdout.write(json.dumps(r, separators=(",", ":")) + "\n")
+            sys.stdout.flush()
+        return 0
+
     green = "\033[92m" if not args.no_color else ""
     red = "\033[91m" if not args.no_color else ""
     yellow = "\033[93m" if not args.no_color else ""
@@ -217,11 +553,14 @@ def main() -> int:
         sig_parts = []
         for k in ("dns_ns", "dns_cname", "headers", "ip_range"):
             v = sig.get(k, False)
+            if v is None:
+                sig_parts.append(f"{k}={yellow}skipped{reset}")
+                continue
             col = green if v else red
             sig_parts.append(f"{k}={col}{str(v).lower()}{reset}")
 
         status = f"{green}YES{reset}" if r["cloudflare"] else f"{yellow}NO{reset}"
-        print(f"{r['domain']:<35} | {status:<12} | {', '.join(sig_parts)}")
+        print(f"{r['domain']:<35} | {status:<12} | {', '.join(sig_parts)}", flush=True)
 
     return 0
 
@@ -0,0 +1 @@
+"""Shared lookup layer for the DNS-analysis Python tools."""
@@ -0,0 +1,350 @@
+"""Pluggable DNS lookup backends with latency-ordered fallback.
+
+- ``NativeBackend``: the in-process stub resolver (shared UDP sockets)
+- ``DnspythonBackend``: one shared, cached ``dns.resolver.Resolver``
+  (only when dnspython is installed)
+- ``DohBackend``: DNS-over-HTTPS JSON API over pooled keep-alive
+  connections, so concurrent queries never pay a new TLS handshake
+- ``SystemBackend``: ``getaddrinfo``, for A/AAAA only
+
+``BackendChain`` tries its backends fastest-first, ordered by an
+exponentially weighted average of each one's measured latency (failures
+count as slow), and falls through to the next on errors or SERVFAIL.
+Every backend returns only records of the queried type, as ``dig +short``
+style strings.
+"""
+
+import http.client
+import json
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlencode, urlsplit
+
+from dnsanalysis import profiling
+from dnsanalysis.httppool import ConnectionPool
+from dnsanalysis.resolver import DnsError, Resolver, parse_server
+
+try:
+    import dns.exception  # type: ignore
+    import dns.resolver  # type: ignore
+except Exception:  # dnspython optional
+    dns = None
+
+BACKENDS = ("native", "dnspython", "doh", "system")
+DEFAULT_DOH_URL = "https://dns.google/resolve"
+DEFAULT_TIMEOUT = 3.0
+EWMA_WEIGHT = 0.2
+FAILURE_PENALTY = 2.0
+DOH_TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "TXT": 16, "AAAA": 28, "CAA": 257}
+DOH_STATUS = {0: "NOERROR", 2: "SERVFAIL", 3: "NXDOMAIN", 5: "REFUSED"}
+
+
+class BackendError(Exception):
+    pass
+
+
+class Unsupported(BackendError):
+    """The backend cannot answer this record type; not held against it."""
+
+
+@dataclass
+class Lookup:
+    records: list[str]
+    rcode: str
+    ttl: int | None = None
+    backend: str = ""
+
+
+@dataclass
+class _Health:
+    latency: float | None = None
+    queries: int = 0
+    failures: int = 0
+    exploring: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def claim_first_query(self) -> bool:
+        """True for exactly one caller while the backend has no measurement yet."""
+        with self.lock:
+            if self.latency is not None or self.exploring:
+                return False
+            self.exploring = True
+            return True
+
+    def release(self) -> None:
+        """Give up an exploration claim without a measurement, e.g. when the backend declined the query."""
+        with self.lock:
+            self.exploring = False
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        sample = seconds if ok else seconds + FAILURE_PENALTY
+        with self.lock:
+            self.exploring = False
+            self.queries += 1
+            self.failures += not ok
+            self.latency = sample if self.latency is None else (1 - EWMA_WEIGHT) * self.latency + EWMA_WEIGHT * sample
+
+
+class Backend:
+    name = ""
+
+    def __init__(self) -> None:
+        self.health = _Health()
+
+    def supports(self, rtype: str) -> bool:
+        return True
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NativeBackend(Backend):
+    name = "native"
+
+    def __init__(self, nameservers: list[str] | None = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+        super().__init__()
+        self.resolver = Resolver(nameservers or None, timeout=timeout)
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        try:
+            answer = self.resolver.query(name, rtype)
+            records = [r.short() for r in answer.records if r.rtype == rtype]
+        except DnsError as exc:
+            raise BackendError(str(exc)) from exc
+        except (UnicodeError, ValueError, IndexError, struct.error) as exc:
+            # A name that cannot be encoded or an answer that cannot be read fails this lookup only.
+            raise BackendError(f"{type(exc).__name__}: {exc}") from exc
+        return Lookup(records, answer.rcode, answer.ttl(), self.name)
+
+    def close(self) -> None:
+        self.resolver.close()
+
+
+class DnspythonBackend(Backend):
+    name = "dnspython"
+
+    def __init__(self, nameservers: list[str] | None = None, timeout: float = DEFAULT_TIMEOUT) -> None:
+        super().__init__()
+        if dns is None:
+            raise BackendError("dnspython is not installed")
+        self.resolver = dns.resolver.Resolver(configure=True)
+        if nameservers:
+            servers = [parse_server(s) for s in nameservers]
+            self.resolver.nameservers = [host for host, _ in servers]
+            self.resolver.port = servers[0][1]
+        self.resolver.lifetime = timeout
+        self.resolver.cache = dns.resolver.LRUCache(50_000)
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        try:
+            answer = self.resolver.resolve(name, rtype, raise_on_no_answer=False)
+        except dns.resolver.NXDOMAIN:
+            return Lookup([], "NXDOMAIN", None, self.name)
+        except (dns.exception.DNSException, OSError) as exc:
+            raise BackendError(str(exc) or exc.__class__.__name__) from exc
+        rrset = answer.rrset
+        if rrset is None:
+            return Lookup([], "NOERROR", None, self.name)
+        return Lookup([rd.to_text() for rd in rrset], "NOERROR", rrset.ttl, self.name)
+
+
+class DohBackend(Backend):
+    name = "doh"
+
+    def __init__(self, url: str = DEFAULT_DOH_URL, timeout: float = DEFAULT_TIMEOUT, max_idle: int = 16) -> None:
+        super().__init__()
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self.pool = ConnectionPool(self._connect, max_idle)
+
+    def supports(self, rtype: str) -> bool:
+        return rtype in DOH_TYPES
+
+    def _connect(self, key: str) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _get(self, path: str) -> bytes:
+        headers = {"User-Agent": "dns-analysis-monitor/1.0", "Accept": "application/dns-json"}
+        status, _, body = self.pool.request(self.host, "GET", path, headers)
+        if status != 200:
+            raise BackendError(f"DoH HTTP {status}")
+        return body
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        path = f"{self.path}?{urlencode({'name': name, 'type': rtype})}"
+        try:
+            payload = json.loads(self._get(path).decode("utf-8", errors="ignore"))
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            raise BackendError(str(exc)[:120] or exc.__class__.__name__) from exc
+        want = DOH_TYPES[rtype]
+        records = []
+        ttls = []
+        for ans in payload.get("Answer", []) or []:
+            data = str(ans.get("data", "")).strip()
+            if data and ans.get("type") == want:
+                records.append(data)
+                ttls.append(int(ans.get("TTL", 0)))
+        rcode = DOH_STATUS.get(payload.get("Status"), "SERVFAIL")
+        return Lookup(records, rcode, min(ttls) if ttls else doh_negative_ttl(payload), self.name)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def doh_negative_ttl(payload: dict) -> int | None:
+    # RFC 2308: negative answers live for min(SOA TTL, SOA MINIMUM)
+    for auth in payload.get("Authority", []) or []:
+        if auth.get("type") == 6:
+            parts = str(auth.get("data", "")).split()
+            try:
+                return min(int(auth.get("TTL", 0)), int(parts[-1]))
+            except (ValueError, IndexError):
+                return None
+    return None
+
+
+class SystemBackend(Backend):
+    name = "system"
+    _FAMILIES = {"A": socket.AF_INET, "AAAA": socket.AF_INET6}
+
+    def supports(self, rtype: str) -> bool:
+        return rtype in self._FAMILIES
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        try:
+            infos = socket.getaddrinfo(name, None, self._FAMILIES[rtype], socket.SOCK_STREAM)
+        except socket.gaierror as exc:
+            if exc.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+                return Lookup([], "NXDOMAIN", None, self.name)
+            raise BackendError(str(exc)) from exc
+        except UnicodeError as exc:
+            raise BackendError(f"invalid name: {exc}") from exc
+        return Lookup(sorted({i[4][0] for i in infos}), "NOERROR", None, self.name)
+
+
+class BackendChain:
+    """Query backends fastest-first, falling through on failure."""
+
+    def __init__(self, backends: list[Backend]) -> None:
+        if not backends:
+            raise ValueError("no resolver backends")
+        self.backends = backends
+
+    def ordered(self, rtype: str) -> list[Backend]:
+        """Backends that support ``rtype``, fastest first. An unmeasured backend leads for a
+        single query so it gets measured, and otherwise waits at the back; list order breaks ties.
+
+        Unsupported backends are dropped before scoring so that a query they
+        would skip cannot take their one exploration claim. ``query`` hands
+        back claims that produced no measurement.
+        """
+
+        ranked, claimed = self._rank(rtype)
+        for b in claimed:
+            b.health.release()
+        return ranked
+
+    def _rank(self, rtype: str) -> tuple[list[Backend], list[Backend]]:
+        claimed: list[Backend] = []
+
+        def score(b: Backend) -> float:
+            if b.health.latency is not None:
+                return b.health.latency
+            if b.health.claim_first_query():
+                claimed.append(b)
+                return -1.0
+            return float("inf")
+
+        ranked = sorted((b for b in self.backends if b.supports(rtype)), key=score)
+        return ranked, claimed
+
+    def query(self, name: str, rtype: str) -> Lookup:
+        rtype = rtype.upper()
+        fallback: Lookup | None = None
+        errors = []
+        ranked, claimed = self._rank(rtype)
+        try:
+            for backend in ranked:
+                started = time.perf_counter()
+                try:
+                    result = backend.query(name, rtype)
+                except Unsupported:
+                    continue
+                except BackendError as exc:
+                    elapsed = time.perf_counter() - started
+                    backend.health.observe(elapsed, False)
+                    profiling.observe("dns", elapsed, backend.name, "error")
+                    errors.append(f"{backend.name}: {exc}")
+                    continue
+                elapsed = time.perf_counter() - started
+                ok = result.rcode in ("NOERROR", "NXDOMAIN")
+                backend.health.observe(elapsed, ok)
+                profiling.observe("dns", elapsed, backend.name, result.rcode.lower())
+                if ok:
+                    return result
+                fallback = fallback or result
+        finally:
+            # A claimed backend that declined the query, or was never reached, is still
+            # unmeasured: drop the claim so a later query explores it.
+            for b in claimed:
+                if b.health.latency is None:
+                    b.health.release()
+        if fallback is not None:
+            return fallback
+        return Lookup([], "SERVFAIL", None, "; ".join(errors)[:200])
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            b.name: {
+                "queries": b.health.queries,
+                "failures": b.health.failures,
+                "ewma_ms": round(b.health.latency * 1000, 3) if b.health.latency is not None else None,
+            }
+            for b in sorted(self.backends, key=lambda b: b.health.latency if b.health.latency is not None else float("inf"))
+        }
+
+    def close(self) -> None:
+        for b in self.backends:
+            b.close()
+
+
+def build_chain(
+    names: list[str],
+    nameservers: list[str] | None = None,
+    doh_url: str = DEFAULT_DOH_URL,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> BackendChain:
+    """Backends in the given order; "auto" expands to every available one."""
+    wanted: list[str] = []
+    for name in names:
+        for n in BACKENDS if name == "auto" else [name]:
+            if n not in wanted:
+                wanted.append(n)
+    backends: list[Backend] = []
+    for name in wanted:
+        if name == "native":
+            backends.append(NativeBackend(nameservers, timeout))
+        elif name == "dnspython":
+            if dns is None:
+                if "auto" in names:
+                    continue
+                raise BackendError("dnspython backend requested but dnspython is not installed")
+            backends.append(DnspythonBackend(nameservers, timeout))
+        elif name == "doh":
+            backends.append(DohBackend(doh_url, timeout))
+        elif name == "system":
+            backends.append(SystemBackend())
+        else:
+            raise ValueError(f"unknown resolver backend {name!r}")
+    return BackendChain(backends)
@@ -0,0 +1,181 @@
+"""TTL-aware DNS answer cache shared by the Python tools.
+
+Entries are keyed by (name, type) and hold the answer in presentation form
+(``dig +short`` style strings) plus the response code, so both tools can
+share one on-disk store:
+- positive answers live for their minimum record TTL
+- NXDOMAIN/NODATA answers are cached for the SOA-derived negative TTL (RFC 2308)
+- least recently used entries are evicted once the memory cap is reached
+- an optional SQLite file keeps unexpired entries across runs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_NEGATIVE_TTL = 60
+MAX_TTL = 86400
+# Rough per-entry overhead of the dict slot, key tuple and dataclass.
+_ENTRY_OVERHEAD = 200
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    records: tuple[str, ...]
+    rcode: str
+    expires: float
+
+    @property
+    def negative(self) -> bool:
+        return not self.records
+
+    def ttl(self, now: float | None = None) -> int:
+        return max(0, int(self.expires - (time.time() if now is None else now)))
+
+
+def cache_key(name: str, rtype: str) -> tuple[str, str]:
+    return name.strip().rstrip(".").lower(), rtype.upper()
+
+
+def _entry_size(key: tuple[str, str], entry: CachedAnswer) -> int:
+    return _ENTRY_OVERHEAD + len(key[0]) + sum(len(r) for r in entry.records)
+
+
+class DnsCache:
+    """Thread-safe LRU of DNS answers bounded by an approximate byte budget."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        path: str | Path | None = None,
+        negative_ttl: int = DEFAULT_NEGATIVE_TTL,
+        max_ttl: int = MAX_TTL,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.path = Path(path) if path else None
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict[tuple[str, str], CachedAnswer] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loaded = 0
+        if self.path is not None:
+            self.load()
+
+    def get(self, name: str, rtype: str) -> CachedAnswer | None:
+        key = cache_key(name, rtype)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry.negative:
+                self.negative_hits += 1
+            return entry
+
+    def put(self, name: str, rtype: str, records: list[str], rcode: str, ttl: int | None) -> None:
+        """Store an answer; ``ttl`` None means no SOA was seen for a negative answer."""
+        if rcode not in ("NOERROR", "NXDOMAIN"):
+            return
+        if ttl is None:
+            ttl = self.negative_ttl if not records else 0
+        ttl = min(int(ttl), self.max_ttl)
+        if ttl <= 0:
+            return
+        self._store(cache_key(name, rtype), CachedAnswer(tuple(records), rcode, time.time() + ttl))
+
+    def _store(self, key: tuple[str, str], entry: CachedAnswer) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += _entry_size(key, entry)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                self.evictions += 1
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= _entry_size(key, entry)
+
+    def stats(self) -> dict[str, int | str | None]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "approx_bytes": self._bytes,
+                "evictions": self.evictions,
+                "loaded_from_disk": self.loaded,
+                "store": str(self.path) if self.path else None,
+            }
+
+    def _connect(self) -> sqlite3.Connection:
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=10)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS dns_cache ("
+            "name TEXT NOT NULL, rtype TEXT NOT NULL, rcode TEXT NOT NULL, "
+            "records TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (name, rtype))"
+        )
+        return conn
+
+    def load(self) -> None:
+        """Warm the in-memory cache from the SQLite store, oldest expiry first."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT name, rtype, rcode, records, expires FROM dns_cache WHERE expires > ? ORDER BY expires",
+                    (time.time(),),
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return
+        for name, rtype, rcode, records, expires in rows:
+            self._store((name, rtype), CachedAnswer(tuple(json.loads(records)), rcode, expires))
+            self.loaded += 1
+
+    def save(self) -> None:
+        """Write unexpired entries back to the SQLite store and prune expired rows."""
+        if self.path is None:
+            return
+        now = time.time()
+        with self._lock:
+            rows = [
+                (k[0], k[1], e.rcode, json.dumps(list(e.records)), e.expires)
+                for k, e in self._entries.items()
+                if e.expires > now
+            ]
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM dns_cache WHERE expires <= ?", (now,))
+                    conn.executemany("INSERT OR REPLACE INTO dns_cache VALUES (?, ?, ?, ?, ?)", rows)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,84 @@
+"""Thin client for the tools' ``serve`` daemons (see ``dnsanalysis.serve``).
+
+Only ``json``, ``os`` and ``socket`` are imported, and the request is one
+hand-written HTTP/1.1 GET, so a caller spends its time on the answer
+rather than on interpreter imports.
+"""
+
+import json
+import os
+import socket
+from typing import Any
+
+ADDRESS_ENV = "DNS_ANALYSIS_SERVER"
+DEFAULT_TIMEOUT = 300.0
+
+
+def default_address(name: str = "dns-analysis") -> str:
+    """``$DNS_ANALYSIS_SERVER``, else a per-user socket in the runtime directory."""
+    env = os.environ.get(ADDRESS_ENV)
+    if env:
+        return env
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(base, f"{name}-{os.getuid()}.sock")
+
+
+def is_unix(address: str) -> bool:
+    return "/" in address
+
+
+def host_port(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _quote(value: str) -> str:
+    safe = "-._~"
+    return "".join(c if c.isascii() and (c.isalnum() or c in safe) else "".join(f"%{b:02X}" for b in c.encode("utf-8")) for c in value)
+
+
+def query(address: str, route: str, params: dict[str, str] | None = None, timeout: float = DEFAULT_TIMEOUT) -> Any:
+    """GET one route; returns the decoded JSON payload, or text for text responses.
+
+    Raises OSError when no server is reachable and ``RuntimeError`` with the
+    server's message for error responses.
+    """
+    target = f"/{route}"
+    if params:
+        target += "?" + "&".join(f"{_quote(k)}={_quote(str(v))}" for k, v in params.items())
+    if is_unix(address):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+    else:
+        sock = socket.create_connection(host_port(address), timeout=timeout)
+    try:
+        sock.sendall(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode("ascii"))
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    raw = b"".join(chunks)
+    head, sep, body = raw.partition(b"\r\n\r\n")
+    if not sep:
+        raise OSError(f"bad response from {address}")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        raise OSError(f"bad status line from {address}: {lines[0][:80]!r}") from None
+    headers = {k.strip().lower(): v.strip() for k, _, v in (ln.partition(":") for ln in lines[1:])}
+    text = body.decode("utf-8", errors="replace")
+    payload: Any = json.loads(text) if headers.get("content-type", "").startswith("application/json") else text
+    if status != 200:
+        message = payload.get("error") if isinstance(payload, dict) else text
+        raise RuntimeError(f"HTTP {status}: {message}")
+    return payload
@@ -0,0 +1,309 @@
+"""Flat, columnar exports of monitor results for analytics jobs.
+
+- ``write_delimited``: CSV or TSV, one row per domain and four columns per
+  signal (``<signal>_status``, ``_confidence``, ``_source`` and
+  ``_details`` as compact JSON), streamed row by row
+- ``ColumnarWriter``/``ColumnarFile``: a binary file with one column per
+  signal field that can be memory-mapped and scanned without parsing JSON
+
+Binary layout (all integers little-endian)::
+
+    b"DACOLv1\\0"
+    column blocks, each starting on an 8-byte boundary
+    footer: UTF-8 JSON describing rows, columns and dictionaries
+    footer length (u64), b"DACOLv1\\0"
+
+Column types are ``u8``, ``u16`` and ``i64`` arrays of ``rows`` values, and
+``str``: an ``offsets`` block of ``rows + 1`` u64 values into a ``data``
+block of UTF-8. Status, confidence and source columns hold codes into the
+footer's ``dictionaries``; ``255``/``65535`` marks a signal that is absent
+from the row (``--changes-only``). ``generated_at`` is microseconds since
+the Unix epoch. The footer sits at the end so the file can be written to a
+pipe; a reader finds it from the last 16 bytes.
+
+The writer keeps typed arrays rather than result dicts, so a batch costs a
+few bytes per signal plus its details JSON.
+"""
+
+import csv
+import json
+import mmap
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Iterable, Iterator, TextIO
+
+from dnsanalysis.records import Confidence, SourceTable, Status
+
+MAGIC = b"DACOLv1\0"
+MISSING_U8 = 0xFF
+MISSING_U16 = 0xFFFF
+SIGNAL_FIELDS = ("status", "confidence", "source", "details")
+_TYPECODES = {"u8": "B", "u16": "H", "i64": "q"}
+_TRAILER = struct.Struct("<Q8s")
+_ALIGN = 8
+
+
+def delimited_header(signal_names: Iterable[str]) -> list[str]:
+    return ["domain", "generated_at_utc", *(f"{name}_{field}" for name in signal_names for field in SIGNAL_FIELDS)]
+
+
+def delimited_row(item: dict[str, Any], signal_names: Iterable[str]) -> list[str]:
+    row = [item.get("domain", ""), item.get("generated_at_utc", "")]
+    signals = item.get("signals") or {}
+    for name in signal_names:
+        sig = signals.get(name)
+        if sig is None:
+            row.extend(("", "", "", ""))
+        else:
+            details = json.dumps(sig.get("details") or {}, separators=(",", ":"), sort_keys=True)
+            row.extend((sig.get("status", ""), sig.get("confidence", ""), sig.get("data_source", ""), details))
+    return row
+
+
+def write_delimited(results: Iterable[dict[str, Any]], signal_names: tuple[str, ...], out: TextIO, delimiter: str = ",") -> int:
+    """Stream results as CSV (RFC 4180 quoting) or TSV; returns the row count.
+
+    TSV fields are written unquoted: domains and sources cannot hold tabs or
+    newlines, and the details JSON escapes them.
+    """
+    if delimiter == ",":
+        writer = csv.writer(out, lineterminator="\n")
+        write = writer.writerow
+    else:
+
+        def write(row: list[str]) -> None:
+            out.write(delimiter.join(row) + "\n")
+
+    write(delimited_header(signal_names))
+    count = 0
+    for item in results:
+        write(delimited_row(item, signal_names))
+        count += 1
+        out.flush()
+    return count
+
+
+class _StrColumn:
+    __slots__ = ("offsets", "data")
+
+    def __init__(self) -> None:
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def append(self, value: str) -> None:
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+def _iso_to_us(value: str) -> int:
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _us_to_iso(value: int) -> str:
+    seconds, micros = divmod(value, 1_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=micros).isoformat()
+
+
+class ColumnarWriter:
+    """Collects results into typed column arrays and writes the binary file on ``close``."""
+
+    def __init__(self, out: BinaryIO, signal_names: tuple[str, ...], metadata: dict[str, Any] | None = None) -> None:
+        self.out = out
+        self.signal_names = signal_names
+        self.metadata = dict(metadata or {})
+        self.sources = SourceTable()
+        self.rows = 0
+        self.columns: dict[str, tuple[str, Any]] = {"domain": ("str", _StrColumn()), "generated_at": ("i64", array("q"))}
+        for name in signal_names:
+            self.columns[f"{name}.status"] = ("u8", array("B"))
+            self.columns[f"{name}.confidence"] = ("u8", array("B"))
+            self.columns[f"{name}.source"] = ("u16", array("H"))
+            self.columns[f"{name}.details"] = ("str", _StrColumn())
+
+    def add(self, item: dict[str, Any]) -> None:
+        cols = self.columns
+        cols["domain"][1].append(str(item.get("domain", "")))
+        cols["generated_at"][1].append(_iso_to_us(str(item.get("generated_at_utc", ""))))
+        signals = item.get("signals") or {}
+        for name in self.signal_names:
+            sig = signals.get(name)
+            if sig is None:
+                status = confidence = MISSING_U8
+                source = MISSING_U16
+                details = ""
+            else:
+                status = _code(Status, sig.get("status"), MISSING_U8)
+                confidence = _code(Confidence, sig.get("confidence"), MISSING_U8)
+                source = self.sources.code(str(sig.get("data_source", "")))
+                details = json.dumps(sig.get("details") or {}, separators=(",", ":"), sort_keys=True)
+            cols[f"{name}.status"][1].append(status)
+            cols[f"{name}.confidence"][1].append(confidence)
+            cols[f"{name}.source"][1].append(source)
+            cols[f"{name}.details"][1].append(details)
+        self.rows += 1
+
+    def extend(self, results: Iterable[dict[str, Any]]) -> int:
+        for item in results:
+            self.add(item)
+        return self.rows
+
+    def close(self) -> None:
+        out = self.out
+        pos = 0
+
+        def block(data: bytes | bytearray | memoryview) -> dict[str, int]:
+            nonlocal pos
+            start = pos
+            out.write(data)
+            pos += len(data)
+            pad = -pos % _ALIGN
+            if pad:
+                out.write(b"\0" * pad)
+                pos += pad
+            return {"offset": start, "length": len(data)}
+
+        block(MAGIC)
+        described = []
+        for name, (kind, col) in self.columns.items():
+            if kind == "str":
+                described.append({"name": name, "type": kind, "offsets": block(_le_bytes(col.offsets)), "data": block(col.data)})
+            else:
+                described.append({"name": name, "type": kind, **block(_le_bytes(col))})
+        footer = {
+            "version": 1,
+            "rows": self.rows,
+            "signals": list(self.signal_names),
+            "columns": described,
+            "dictionaries": {
+                "status": [s.label for s in Status],
+                "confidence": [c.label for c in Confidence],
+                "source": self.sources.names(),
+            },
+            "metadata": self.metadata,
+        }
+        data = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+        out.write(data)
+        out.write(_TRAILER.pack(len(data), MAGIC))
+        out.flush()
+
+
+def _code(enum: type[Status] | type[Confidence], value: Any, missing: int) -> int:
+    try:
+        return int(enum.parse(str(value)))
+    except KeyError:
+        return missing
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ColumnarFile:
+    """Memory-mapped reader for files written by ``ColumnarWriter``."""
+
+    def __init__(self, path: str) -> None:
+        self._fh = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise ValueError(f"{path}: empty file") from None
+        size = len(self._map)
+        if size < len(MAGIC) + _TRAILER.size or self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a columnar results file")
+        length, magic = _TRAILER.unpack_from(self._map, size - _TRAILER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: truncated columnar results file")
+        start = size - _TRAILER.size - length
+        self.footer: dict[str, Any] = json.loads(bytes(self._map[start : start + length]))
+        self.rows: int = self.footer["rows"]
+        self.signal_names: list[str] = self.footer["signals"]
+        self.dictionaries: dict[str, list[str]] = self.footer["dictionaries"]
+        self._columns = {c["name"]: c for c in self.footer["columns"]}
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        return self.footer.get("metadata", {})
+
+    def names(self) -> list[str]:
+        return list(self._columns)
+
+    def _array(self, kind: str, spec: dict[str, int]) -> memoryview | array:
+        view = memoryview(self._map)[spec["offset"] : spec["offset"] + spec["length"]]
+        if sys.byteorder == "little":
+            return view.cast(_TYPECODES.get(kind, "Q"))
+        values = array(_TYPECODES.get(kind, "Q"), view.tobytes())
+        values.byteswap()
+        return values
+
+    def column(self, name: str) -> memoryview | array:
+        """Raw codes/values of a numeric column (zero-copy on little-endian hosts)."""
+        spec = self._columns[name]
+        if spec["type"] == "str":
+            raise TypeError(f"{name} is a string column; use strings()")
+        return self._array(spec["type"], spec)
+
+    def strings(self, name: str) -> Iterator[str]:
+        spec = self._columns[name]
+        offsets = self._array("u64", spec["offsets"])
+        base = spec["data"]["offset"]
+        for i in range(self.rows):
+            yield self._map[base + offsets[i] : base + offsets[i + 1]].decode("utf-8")
+
+    def labels(self, name: str) -> Iterator[str | None]:
+        """Decoded values of a status/confidence/source column; None where the signal is absent."""
+        table = self.dictionaries[name.rsplit(".", 1)[-1]]
+        for code in self.column(name):
+            yield table[code] if code < len(table) else None
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Rebuild result dicts (domain, generated_at_utc, signals) row by row."""
+        names = self.signal_names
+        domains = self.strings("domain")
+        stamps = self.column("generated_at")
+        fields = [
+            (
+                name,
+                self.labels(f"{name}.status"),
+                self.labels(f"{name}.confidence"),
+                self.labels(f"{name}.source"),
+                self.strings(f"{name}.details"),
+            )
+            for name in names
+        ]
+        for row in range(self.rows):
+            signals = {}
+            for name, status, confidence, source, details in fields:
+                st, conf, src, det = next(status), next(confidence), next(source), next(details)
+                if st is not None:
+                    signals[name] = {"status": st, "confidence": conf, "data_source": src, "details": json.loads(det or "{}")}
+            yield {"domain": next(domains), "generated_at_utc": _us_to_iso(stamps[row]), "signals": signals}
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a column view is still referenced; the mapping closes when it is released
+            self._map = None
+        self._fh.close()
+
+    def __enter__(self) -> "ColumnarFile":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,222 @@
+"""Delegation and authoritative-server consistency checks.
+
+For each domain:
+- the parent zone's servers are asked (without recursion) for the domain's
+  NS delegation; parent zones are found once per batch and memoized. A
+  name that the enclosing zone answers for authoritatively (a host such as
+  www.example.com rather than a zone) is reported as an error, not as
+  undelegated
+- every delegated nameserver is resolved to its IPv4 and IPv6 addresses,
+  and each address is asked directly for SOA and NS, all in parallel
+- a server is lame when it answers without the AA bit, with an error
+  rcode or without an SOA, and unresponsive when it times out; addresses
+  this host cannot reach at all (e.g. IPv6 without a route) are listed
+  separately and not held against the domain
+- the NS sets served by the parent and by the authoritative servers are
+  compared, and SOA serials across servers give the serial skew
+
+Direct queries go through the shared UDP sockets of one ``Resolver``, so
+nameservers shared by many domains (big DNS providers) are reused across
+the batch behind their own circuit breakers, and recursive lookups of
+nameserver addresses go through the caller's cached, coalesced lookup.
+"""
+
+import threading
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from dnsanalysis.resolver import SOA, DnsError, DnsTimeout, Resolver
+
+SERIAL_SPACE = 2**32
+DEFAULT_MAX_PARENT_SERVERS = 4
+
+# (rtype, name) -> (records, source, rcode); the monitor's dns_lookup.
+Lookup = Callable[[str, str], tuple[list[str], str, str | None]]
+
+
+def _norm(name: str) -> str:
+    return name.strip().rstrip(".").lower()
+
+
+def serial_skew(serials: list[int]) -> int:
+    """Largest RFC 1982 distance between any serial and the newest one."""
+    if len(serials) < 2:
+        return 0
+    unique = sorted(set(serials))
+    # The newest serial is the one every other is "behind" in sequence space.
+    newest = max(unique, key=lambda s: sum(((s - o) % SERIAL_SPACE) < SERIAL_SPACE // 2 for o in unique))
+    return max((newest - s) % SERIAL_SPACE for s in unique)
+
+
+@dataclass
+class ServerCheck:
+    ns: str
+    address: str
+    status: str = "ok"  # ok | lame | timeout | unreachable
+    rcode: str | None = None
+    authoritative: bool | None = None
+    serial: int | None = None
+    nameservers: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+@dataclass
+class DelegationReport:
+    domain: str
+    parent_zone: str | None = None
+    parent_rcode: str | None = None
+    parent_ns: list[str] = field(default_factory=list)
+    child_ns: list[str] = field(default_factory=list)
+    servers: list[ServerCheck] = field(default_factory=list)
+    unresolved_ns: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def lame(self) -> list[ServerCheck]:
+        return [s for s in self.servers if s.status in ("lame", "timeout")]
+
+    @property
+    def healthy(self) -> list[ServerCheck]:
+        return [s for s in self.servers if s.status == "ok"]
+
+    @property
+    def serials(self) -> dict[str, int]:
+        return {f"{s.ns}/{s.address}": s.serial for s in self.healthy if s.serial is not None}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "parent_zone": self.parent_zone,
+            "parent_ns": self.parent_ns,
+            "child_ns": self.child_ns,
+            "servers": [s.__dict__ for s in self.servers],
+            "unresolved_ns": self.unresolved_ns,
+        }
+
+
+class DelegationChecker:
+    """Parallel parent/authoritative NS and SOA checks sharing one resolver across a batch."""
+
+    def __init__(
+        self,
+        resolver: Resolver,
+        lookup: Lookup,
+        pool: Executor,
+        port: int = 53,
+        timeout: float = 2.0,
+        max_parent_servers: int = DEFAULT_MAX_PARENT_SERVERS,
+    ) -> None:
+        self.resolver = resolver
+        self.lookup = lookup
+        self.pool = pool
+        self.port = port
+        self.timeout = timeout
+        self.max_parent_servers = max_parent_servers
+        self._parents: dict[str, tuple[str, list[tuple[str, int]]] | None] = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def addresses(self, host: str) -> list[str]:
+        """IPv4 then IPv6 addresses of a nameserver host (cached and coalesced by ``lookup``)."""
+        out: list[str] = []
+        for rtype in ("A", "AAAA"):
+            records, _, _ = self.lookup(rtype, host)
+            out.extend(r for r in records if r and r[-1] != ".")
+        return out
+
+    def parent(self, domain: str) -> tuple[str, list[tuple[str, int]]] | None:
+        """(parent zone, server addresses) for the closest enclosing zone cut, memoized per zone."""
+        labels = domain.split(".")
+        for i in range(1, len(labels)):
+            zone = ".".join(labels[i:])
+            with self._lock:
+                if zone in self._parents:
+                    cached = self._parents[zone]
+                    if cached is not None:
+                        return cached
+                    continue
+            ns, _, rcode = self.lookup("NS", zone)
+            if not ns and rcode is None:
+                return None  # lookup failed; do not memoize a transient error for the whole batch
+            found = None
+            if ns:
+                servers: list[tuple[str, int]] = []
+                for host in sorted(_norm(n) for n in ns):
+                    servers.extend((addr, self.port) for addr in self.addresses(host))
+                    if len(servers) >= self.max_parent_servers:
+                        break
+                if servers:
+                    found = (zone, servers[: self.max_parent_servers])
+            with self._lock:
+                self._parents[zone] = found
+            if found is not None:
+                return found
+        return None
+
+    def _query(self, name: str, rtype: str, servers: list[tuple[str, int]]):
+        with self._lock:
+            self.queries += 1
+        return self.resolver.query(name, rtype, servers=servers, timeout=self.timeout, recursion=False)
+
+    def check_server(self, domain: str, ns: str, address: str) -> ServerCheck:
+        result = ServerCheck(ns, address)
+        target = [(address, self.port)]
+        try:
+            soa = self._query(domain, "SOA", target)
+        except DnsTimeout as exc:
+            result.status, result.error = "timeout", str(exc)[:120]
+            return result
+        except DnsError as exc:
+            result.status, result.error = "unreachable", str(exc)[:120]
+            return result
+        result.rcode, result.authoritative = soa.rcode, soa.authoritative
+        serials = [v.serial for v in soa.values("SOA") if isinstance(v, SOA)]
+        if soa.rcode != "NOERROR" or not soa.authoritative or not serials:
+            result.status = "lame"
+            return result
+        result.serial = serials[0]
+        try:
+            ns_answer = self._query(domain, "NS", target)
+            result.nameservers = sorted({_norm(v) for v in ns_answer.values("NS")})
+        except DnsError as exc:
+            result.error = f"NS query: {str(exc)[:100]}"
+        return result
+
+    def check(self, domain: str) -> DelegationReport:
+        domain = _norm(domain)
+        report = DelegationReport(domain)
+        parent = self.parent(domain)
+        if parent is None:
+            report.error = "no parent zone servers found"
+            return report
+        report.parent_zone, parent_servers = parent
+        try:
+            referral = self._query(domain, "NS", parent_servers)
+        except DnsError as exc:
+            report.error = f"parent query failed: {str(exc)[:120]}"
+            return report
+        report.parent_rcode = referral.rcode
+        delegated = [r.value for r in referral.records + referral.authority if r.rtype == "NS" and _norm(r.name) == domain]
+        report.parent_ns = sorted({_norm(v) for v in delegated})
+        if not report.parent_ns:
+            if referral.authoritative and referral.rcode == "NOERROR":
+                # The enclosing zone answers for the name itself (e.g. www.example.com in
+                # example.com): there is no zone cut here, so no delegation to check.
+                report.error = f"not a zone cut: name is inside {report.parent_zone}"
+            return report
+
+        # Resolve every nameserver, then probe every address, all concurrently.
+        addr_futures = {ns: self.pool.submit(self.addresses, ns) for ns in report.parent_ns}
+        probes = []
+        for ns, fut in addr_futures.items():
+            addrs = fut.result()
+            if not addrs:
+                report.unresolved_ns.append(ns)
+            probes.extend(self.pool.submit(self.check_server, domain, ns, addr) for addr in addrs)
+        report.servers = [p.result() for p in probes]
+        report.child_ns = sorted({n for s in report.healthy for n in s.nameservers})
+        return report
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"direct_queries": self.queries, "parent_zones": sum(1 for v in self._parents.values() if v)}
@@ -0,0 +1,299 @@
+"""Append-only SQLite history of monitor results with drift queries.
+
+Storage is a change log rather than a copy of every report:
+- ``runs`` has one row per monitor run
+- ``changes`` gets a row only when a (domain, signal) is first seen or its
+  comparable value differs from the previous one (append-only, indexed by
+  domain/signal/status/time)
+- ``latest`` holds the current value, first-seen, last-changed and
+  last-seen times for each (domain, signal), so deciding whether a fresh
+  result changed is one primary-key lookup
+
+Volatile details (days left to expiry, the DKIM selectors probed) are left
+out of the comparison so that a countdown is not reported as drift, and
+results from failed lookups are not recorded at all.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+VOLATILE_DETAILS = {
+    "expiry": ("days",),
+    "dkim": ("selectors_checked", "short_circuit"),
+}
+_COMMIT_EVERY = 500
+_RELATIVE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$", re.I)
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def transient(result: dict[str, Any]) -> bool:
+    """True for results that reflect a failed lookup rather than the domain's state."""
+    source = str(result.get("data_source", ""))
+    return source in ("deadline", "error") or "_error" in source
+
+
+def comparable(signal: str, result: dict[str, Any]) -> dict[str, Any]:
+    details = {k: v for k, v in (result.get("details") or {}).items() if k not in VOLATILE_DETAILS.get(signal, ())}
+    return {"status": result.get("status"), "details": details}
+
+
+def digest(signal: str, result: dict[str, Any]) -> str:
+    raw = json.dumps(comparable(signal, result), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def changed_fields(signal: str, old: dict[str, Any] | None, new: dict[str, Any]) -> list[str]:
+    if old is None:
+        return ["status", *sorted(comparable(signal, new)["details"])]
+    a, b = comparable(signal, old), comparable(signal, new)
+    fields = ["status"] if a["status"] != b["status"] else []
+    keys = set(a["details"]) | set(b["details"])
+    fields.extend(sorted(k for k in keys if a["details"].get(k) != b["details"].get(k)))
+    return fields
+
+
+def parse_when(value: str | None, now: float | None = None) -> float | None:
+    """Parse ``7d``/``12h``/``30m`` (ago) or an ISO date/time into a UNIX timestamp."""
+    if not value:
+        return None
+    now = time.time() if now is None else now
+    m = _RELATIVE.match(value)
+    if m:
+        return now - float(m.group(1)) * _UNITS[m.group(2).lower()]
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def iso(ts: float | None) -> str | None:
+    return None if ts is None else datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class HistoryStore:
+    """Thread-safe writer and query helper over one history database."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tool TEXT NOT NULL, started REAL NOT NULL, finished REAL,
+                domains INTEGER NOT NULL DEFAULT 0, changes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                run_id INTEGER NOT NULL, domain TEXT NOT NULL, signal TEXT NOT NULL,
+                observed REAL NOT NULL, status TEXT, prev_status TEXT,
+                fields TEXT NOT NULL, result TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS changes_domain ON changes (domain, signal, run_id);
+            CREATE INDEX IF NOT EXISTS changes_signal_status ON changes (signal, status, observed);
+            CREATE INDEX IF NOT EXISTS changes_observed ON changes (observed);
+            CREATE INDEX IF NOT EXISTS changes_run ON changes (run_id);
+            CREATE TABLE IF NOT EXISTS latest (
+                domain TEXT NOT NULL, signal TEXT NOT NULL, status TEXT, digest TEXT NOT NULL,
+                result TEXT NOT NULL, first_seen REAL NOT NULL, last_changed REAL NOT NULL,
+                last_seen REAL NOT NULL, last_run INTEGER NOT NULL,
+                PRIMARY KEY (domain, signal)
+            );
+            CREATE INDEX IF NOT EXISTS latest_signal_status ON latest (signal, status);
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    # -- writing ------------------------------------------------------------
+
+    def begin_run(self, tool: str) -> int:
+        with self._lock:
+            cur = self._conn.execute("INSERT INTO runs (tool, started) VALUES (?, ?)", (tool, time.time()))
+            self._conn.commit()
+            return int(cur.lastrowid)
+
+    def record(self, run_id: int, domain: str, signal: str, result: dict[str, Any], now: float | None = None) -> dict[str, Any] | None:
+        """Record one signal result; returns a change description, or None if unchanged."""
+        if transient(result):
+            return None
+        now = time.time() if now is None else now
+        new_digest = digest(signal, result)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, status, result, last_changed FROM latest WHERE domain = ? AND signal = ?", (domain, signal)
+            ).fetchone()
+            if row is not None and row[0] == new_digest:
+                self._conn.execute(
+                    "UPDATE latest SET last_seen = ?, last_run = ? WHERE domain = ? AND signal = ?", (now, run_id, domain, signal)
+                )
+                self._tick()
+                return None
+            old = json.loads(row[2]) if row is not None else None
+            fields = changed_fields(signal, old, result)
+            payload = json.dumps(result, separators=(",", ":"), default=str)
+            self._conn.execute(
+                "INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, domain, signal, now, result.get("status"), row[1] if row else None, json.dumps(fields), payload),
+            )
+            self._conn.execute(
+                "INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (domain, signal) DO UPDATE SET status = excluded.status, digest = excluded.digest, "
+                "result = excluded.result, last_changed = excluded.last_changed, last_seen = excluded.last_seen, "
+                "last_run = excluded.last_run",
+                (domain, signal, result.get("status"), new_digest, payload, now, now, now, run_id),
+            )
+            self._tick()
+        return {
+            "previous_status": row[1] if row else None,
+            "previous_changed_utc": iso(row[3]) if row else None,
+            "fields": fields,
+            "first_seen": row is None,
+        }
+
+    def finish_run(self, run_id: int, domains: int, changes: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET finished = ?, domains = ?, changes = ? WHERE run_id = ?", (time.time(), domains, changes, run_id)
+            )
+            self._conn.commit()
+            self._pending = 0
+
+    def _tick(self) -> None:
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    # -- queries ------------------------------------------------------------
+
+    def _rows(self, sql: str, params: list[Any]) -> list[dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def runs(self, limit: int = 20) -> list[dict[str, Any]]:
+        rows = self._rows("SELECT * FROM runs ORDER BY run_id DESC LIMIT ?", [limit])
+        for r in rows:
+            r["started"], r["finished"] = iso(r["started"]), iso(r["finished"])
+        return rows
+
+    def resolve_run(self, ref: str | int) -> int:
+        """Accept a run id, ``last`` or ``prev``/``last~N``."""
+        ref = str(ref).strip().lower()
+        if ref.isdigit():
+            return int(ref)
+        back = {"last": 0, "latest": 0, "prev": 1, "previous": 1}.get(ref)
+        if back is None and ref.startswith("last~") and ref[5:].isdigit():
+            back = int(ref[5:])
+        if back is None:
+            raise ValueError(f"unknown run reference {ref!r}")
+        rows = self._rows("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT 1 OFFSET ?", [back])
+        if not rows:
+            raise ValueError(f"no run {ref!r} in history")
+        return int(rows[0]["run_id"])
+
+    def transitions(
+        self,
+        domain: str | None = None,
+        signal: str | None = None,
+        from_status: str | None = None,
+        to_status: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        include_first_seen: bool = False,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        where, params = [], []
+        for col, val in (("domain", domain), ("signal", signal), ("prev_status", from_status), ("status", to_status)):
+            if val:
+                where.append(f"{col} = ?")
+                params.append(val)
+        if since is not None:
+            where.append("observed >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("observed < ?")
+            params.append(until)
+        if not include_first_seen and not from_status:
+            where.append("prev_status IS NOT NULL")
+        sql = "SELECT run_id, domain, signal, observed, prev_status, status, fields, result FROM changes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY observed, domain, signal"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = self._rows(sql, params)
+        for r in rows:
+            r["observed"] = iso(r["observed"])
+            r["fields"] = json.loads(r["fields"])
+            r["result"] = json.loads(r["result"])
+        return rows
+
+    def timeline(self, domain: str | None = None, signal: str | None = None, status: str | None = None) -> list[dict[str, Any]]:
+        """Current status with first-seen, last-changed and last-seen times."""
+        where, params = [], []
+        for col, val in (("domain", domain), ("signal", signal), ("status", status)):
+            if val:
+                where.append(f"{col} = ?")
+                params.append(val)
+        sql = "SELECT domain, signal, status, first_seen, last_changed, last_seen, last_run FROM latest"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._rows(sql + " ORDER BY domain, signal", params)
+        for r in rows:
+            for k in ("first_seen", "last_changed", "last_seen"):
+                r[k] = iso(r[k])
+        return rows
+
+    def value_at(self, domain: str, signal: str, run_id: int) -> dict[str, Any] | None:
+        rows = self._rows(
+            "SELECT result FROM changes WHERE domain = ? AND signal = ? AND run_id <= ? ORDER BY run_id DESC LIMIT 1",
+            [domain, signal, run_id],
+        )
+        return json.loads(rows[0]["result"]) if rows else None
+
+    def diff(self, run_a: int, run_b: int, domain: str | None = None, signal: str | None = None) -> list[dict[str, Any]]:
+        """Per-signal differences between the values as of ``run_a`` and as of ``run_b``."""
+        lo, hi = sorted((run_a, run_b))
+        where, params = ["run_id > ?", "run_id <= ?"], [lo, hi]
+        for col, val in (("domain", domain), ("signal", signal)):
+            if val:
+                where.append(f"{col} = ?")
+                params.append(val)
+        touched = self._rows(f"SELECT DISTINCT domain, signal FROM changes WHERE {' AND '.join(where)} ORDER BY domain, signal", params)
+        out = []
+        for t in touched:
+            old = self.value_at(t["domain"], t["signal"], lo)
+            new = self.value_at(t["domain"], t["signal"], hi)
+            if new is None or (old is not None and digest(t["signal"], old) == digest(t["signal"], new)):
+                continue
+            if run_a > run_b:
+                old, new = new, old
+            out.append(
+                {
+                    "domain": t["domain"],
+                    "signal": t["signal"],
+                    "from_status": old.get("status") if old else None,
+                    "to_status": new.get("status") if new else None,
+                    "fields": changed_fields(t["signal"], old, new) if new else ["status"],
+                    "from": old,
+                    "to": new,
+                }
+            )
+        return out
@@ -0,0 +1,96 @@
+"""Keep-alive HTTP connection pool shared by the RDAP, DoH and header-probe clients.
+
+- idle connections are kept per key (e.g. scheme/host/port) up to a limit
+- a request first tries an idle connection; if the server had already
+  closed it (``STALE_ERRORS``) the request is retried once on a fresh one
+- a connection goes back to the pool only when its response was read to
+  the end and the server did not ask to close it
+"""
+
+import http.client
+import threading
+from typing import Callable, Hashable
+
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class ConnectionPool:
+    """Thread-safe idle connections per key, opened on demand by ``factory(key)``."""
+
+    def __init__(self, factory: Callable[[Hashable], http.client.HTTPConnection], max_idle_per_key: int = 4) -> None:
+        self.factory = factory
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: dict[Hashable, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _open(self, key: Hashable) -> http.client.HTTPConnection:
+        with self._lock:
+            self.opened += 1
+        return self.factory(key)
+
+    def _checkout(self, key: Hashable) -> http.client.HTTPConnection | None:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+        return None
+
+    def _checkin(self, key: Hashable, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(
+        self,
+        key: Hashable,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        timeout: float | None = None,
+        max_body: int | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """(status, lower-cased headers, body); at most ``max_body`` bytes of the body are read."""
+        for pooled in (True, False):
+            conn = self._checkout(key) if pooled else self._open(key)
+            if conn is None:
+                continue
+            if timeout is not None:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read(max_body) if max_body is not None else resp.read()
+            except STALE_ERRORS:
+                conn.close()
+                if not pooled:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            if resp.will_close or not resp.isclosed():
+                conn.close()  # asked to close, or body left unread
+            else:
+                self._checkin(key, conn)
+            return resp.status, resp_headers, body
+        raise http.client.HTTPException("unreachable")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"connections_opened": self.opened, "connections_reused": self.reused}
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
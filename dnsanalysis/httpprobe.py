@@ -0,0 +1,104 @@
+"""HEAD-first HTTP(S) header probes over pooled keep-alive connections.
+
+- probes connect to an already-resolved IP, sending the domain as Host (and
+  as SNI for HTTPS), so the system resolver is not asked again
+- plain-HTTP connections are pooled per (IP, port) and shared by every
+  domain served from that edge address; HTTPS connections are pooled per
+  (IP, port, domain) because the TLS session is bound to the SNI name
+- HEAD is sent first; GET is used only when the server rejects HEAD
+- redirects are not followed, since edge headers appear on the 3xx itself
+"""
+
+import http.client
+import socket
+import ssl
+import time
+from dataclasses import dataclass, field
+
+from dnsanalysis import profiling
+from dnsanalysis.httppool import ConnectionPool
+
+USER_AGENT = "Mozilla/5.0"
+HEAD_REJECTED = (405, 501)
+MAX_DRAIN_BYTES = 256 * 1024
+
+
+@dataclass
+class ProbeResult:
+    scheme: str | None = None
+    method: str | None = None
+    status: int | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+
+
+class _SniHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS to a fixed address with a separate SNI / certificate name."""
+
+    def __init__(self, host: str, port: int, server_hostname: str, timeout: float, context: ssl.SSLContext) -> None:
+        super().__init__(host, port, timeout=timeout, context=context)
+        self.server_hostname = server_hostname
+
+    def connect(self) -> None:
+        sock = socket.create_connection((self.host, self.port), self.timeout, self.source_address)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.server_hostname)
+
+
+def _split_address(value: str, default_port: int) -> tuple[str, int]:
+    if value.startswith("["):
+        host, _, rest = value[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if value.count(":") == 1:
+        host, port = value.split(":")
+        return host, int(port)
+    return value, default_port
+
+
+class HttpProber:
+    """Thread-safe header prober sharing idle connections between domains."""
+
+    def __init__(self, timeout: float = 5.0, connect: str | None = None, max_idle_per_key: int = 4) -> None:
+        self.timeout = timeout
+        self.connect = connect
+        self.context = ssl.create_default_context()
+        self.pool = ConnectionPool(self._open, max_idle_per_key)
+
+    def _key(self, scheme: str, address: str, domain: str) -> tuple:
+        host, port = _split_address(address, 443 if scheme == "https" else 80)
+        return (scheme, host, port, domain if scheme == "https" else None)
+
+    def _open(self, key: tuple) -> http.client.HTTPConnection:
+        scheme, host, port, sni = key
+        if scheme == "https":
+            return _SniHTTPSConnection(host, port, sni, self.timeout, self.context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _request(self, key: tuple, method: str, domain: str) -> tuple[int, dict[str, str]]:
+        headers = {"User-Agent": USER_AGENT, "Host": domain, "Accept": "*/*"}
+        # Drain the body (empty for HEAD) so the connection can carry the next request.
+        status, resp_headers, _ = self.pool.request(key, method, "/", headers, max_body=MAX_DRAIN_BYTES)
+        return status, resp_headers
+
+    def fetch(self, scheme: str, domain: str, address: str | None = None) -> ProbeResult:
+        """HEAD (then GET if HEAD is rejected) ``/`` on one scheme."""
+        key = self._key(scheme, self.connect or address or domain, domain)
+        result = ProbeResult(scheme=scheme)
+        for method in ("HEAD", "GET"):
+            started = time.perf_counter()
+            try:
+                status, headers = self._request(key, method, domain)
+            except (OSError, http.client.HTTPException, ValueError) as exc:
+                profiling.observe("http", time.perf_counter() - started, scheme, "error")
+                result.error = str(exc)[:120] or exc.__class__.__name__
+                return result
+            profiling.observe("http", time.perf_counter() - started, scheme, "ok")
+            result.method, result.status, result.headers = method, status, headers
+            if status not in HEAD_REJECTED:
+                break
+        return result
+
+    def stats(self) -> dict[str, int]:
+        return self.pool.stats()
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,230 @@
+"""CDN/cloud provider IP range database compiled into sorted interval arrays.
+
+- range files are versioned JSON (``config/ip_ranges.json``): a ``version``
+  plus per-provider ``prefixes``; several files can be layered, later
+  files replacing a provider's prefixes
+- all prefixes are flattened into non-overlapping integer intervals, one
+  sorted set per address family, so a lookup is one binary search whatever
+  the number of prefixes; overlapping prefixes resolve to the most specific
+- ``classify_many`` classifies IPv4 batches with NumPy ``searchsorted``
+  when NumPy is installed, and falls back to ``bisect`` otherwise
+- ``update_ranges`` refreshes the providers that publish machine-readable
+  feeds (Cloudflare, Fastly, CloudFront) and keeps the others
+"""
+
+import heapq
+import ipaddress
+import json
+import socket
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.request import Request, urlopen
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # numpy optional
+    np = None
+
+DEFAULT_RANGES_FILE = Path(__file__).resolve().parent.parent / "config" / "ip_ranges.json"
+USER_AGENT = "dns-analysis-monitor/1.0"
+_V4_TYPE = "I" if array("I").itemsize >= 4 else "L"
+
+FEEDS = {
+    "cloudflare": ("https://www.cloudflare.com/ips-v4", "https://www.cloudflare.com/ips-v6"),
+    "fastly": ("https://api.fastly.com/public-ip-list",),
+    "cloudfront": ("https://ip-ranges.amazonaws.com/ip-ranges.json",),
+}
+
+
+def parse_ip(value: str) -> tuple[int, int] | None:
+    """Return (version, integer) for an address string, or None if it is not one."""
+    value = value.strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, value), "big")
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, value), "big")
+    except OSError:
+        return None
+
+
+def load_ranges(paths: Iterable[str | Path] = (DEFAULT_RANGES_FILE,)) -> tuple[dict[str, list[str]], dict[str, str]]:
+    """Merge range files into (provider -> prefixes, file -> version)."""
+    providers: dict[str, list[str]] = {}
+    versions: dict[str, str] = {}
+    for path in paths:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        versions[str(path)] = str(payload.get("version", "unversioned"))
+        for name, entry in (payload.get("providers") or {}).items():
+            prefixes = entry.get("prefixes", []) if isinstance(entry, dict) else entry
+            providers[str(name).lower()] = [str(p) for p in prefixes]
+    return providers, versions
+
+
+class _Family:
+    """Non-overlapping [start, end] intervals of one address family, sorted by start."""
+
+    def __init__(self, starts: Any, ends: Any, owners: array) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.owners = owners
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def find(self, value: int) -> int:
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.owners[i]
+        return -1
+
+
+def _flatten(entries: list[tuple[int, int, int, int]]) -> tuple[list[int], list[int], list[int]]:
+    """Sweep (start, end, prefixlen, owner) prefixes into disjoint intervals, longest prefix winning."""
+    bounds = sorted({s for s, _, _, _ in entries} | {e + 1 for _, e, _, _ in entries})
+    entries = sorted(entries)
+    starts: list[int] = []
+    ends: list[int] = []
+    owners: list[int] = []
+    active: list[tuple[int, int, int]] = []  # (-prefixlen, end, owner)
+    j = 0
+    for k, point in enumerate(bounds[:-1]):
+        while j < len(entries) and entries[j][0] == point:
+            s, e, plen, owner = entries[j]
+            heapq.heappush(active, (-plen, e, owner))
+            j += 1
+        while active and active[0][1] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+        owner = active[0][2]
+        end = bounds[k + 1] - 1
+        if owners and owners[-1] == owner and ends[-1] + 1 == point:
+            ends[-1] = end
+        else:
+            starts.append(point)
+            ends.append(end)
+            owners.append(owner)
+    return starts, ends, owners
+
+
+class RangeIndex:
+    """Provider lookup for IPv4/IPv6 addresses by binary search over interval arrays."""
+
+    def __init__(self, providers: dict[str, Iterable[str]], versions: dict[str, str] | None = None) -> None:
+        self.providers = sorted(providers)
+        self.versions = dict(versions or {})
+        self.prefixes = 0
+        by_family: dict[int, list[tuple[int, int, int, int]]] = {4: [], 6: []}
+        for owner, name in enumerate(self.providers):
+            for prefix in providers[name]:
+                net = ipaddress.ip_network(prefix, strict=False)
+                by_family[net.version].append(
+                    (int(net.network_address), int(net.broadcast_address), net.prefixlen, owner)
+                )
+                self.prefixes += 1
+
+        s4, e4, o4 = _flatten(by_family[4])
+        self.v4 = _Family(array(_V4_TYPE, s4), array(_V4_TYPE, e4), array("h", o4))
+        # 128-bit values do not fit an array typecode; plain int lists bisect just as well.
+        s6, e6, o6 = _flatten(by_family[6])
+        self.v6 = _Family(s6, e6, array("h", o6))
+        self._np = None
+        if np is not None and len(self.v4):
+            self._np = (np.asarray(s4, dtype=np.uint32), np.asarray(e4, dtype=np.uint32), np.asarray(o4, dtype=np.int16))
+
+    @classmethod
+    def load(cls, paths: Iterable[str | Path] = (DEFAULT_RANGES_FILE,)) -> "RangeIndex":
+        providers, versions = load_ranges(paths)
+        return cls(providers, versions)
+
+    def classify(self, ip: str) -> str | None:
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None
+        version, value = parsed
+        owner = (self.v4 if version == 4 else self.v6).find(value)
+        return self.providers[owner] if owner >= 0 else None
+
+    def classify_many(self, ips: list[str]) -> list[str | None]:
+        """Classify a batch; IPv4 goes through one vectorized search when NumPy is available."""
+        if self._np is None:
+            return [self.classify(ip) for ip in ips]
+        out: list[str | None] = [None] * len(ips)
+        v4_pos: list[int] = []
+        v4_val: list[int] = []
+        for i, ip in enumerate(ips):
+            parsed = parse_ip(ip)
+            if parsed is None:
+                continue
+            if parsed[0] == 4:
+                v4_pos.append(i)
+                v4_val.append(parsed[1])
+            else:
+                owner = self.v6.find(parsed[1])
+                out[i] = self.providers[owner] if owner >= 0 else None
+        if v4_val:
+            starts, ends, owners = self._np
+            values = np.asarray(v4_val, dtype=np.uint32)
+            idx = np.searchsorted(starts, values, side="right") - 1
+            safe = idx.clip(0)
+            hit = (idx >= 0) & (values <= ends[safe])
+            found = np.where(hit, owners[safe], -1)
+            for pos, owner in zip(v4_pos, found.tolist()):
+                if owner >= 0:
+                    out[pos] = self.providers[owner]
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "versions": self.versions,
+            "providers": self.providers,
+            "prefixes": self.prefixes,
+            "intervals_v4": len(self.v4),
+            "intervals_v6": len(self.v6),
+            "vectorized": self._np is not None,
+        }
+
+
+def _fetch(url: str, timeout: int) -> bytes:
+    req = Request(url, headers={"User-Agent": USER_AGENT})
+    with urlopen(req, timeout=timeout) as resp:
+        return resp.read()
+
+
+def fetch_feed(provider: str, timeout: int = 20) -> list[str]:
+    """Current prefixes of a provider from its published feed."""
+    urls = FEEDS[provider]
+    if provider == "cloudflare":
+        text = b"\n".join(_fetch(u, timeout) for u in urls).decode("utf-8")
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    payload = json.loads(_fetch(urls[0], timeout).decode("utf-8"))
+    if provider == "fastly":
+        return list(payload.get("addresses", [])) + list(payload.get("ipv6_addresses", []))
+    v4 = [p["ip_prefix"] for p in payload.get("prefixes", []) if p.get("service") == "CLOUDFRONT"]
+    v6 = [p["ipv6_prefix"] for p in payload.get("ipv6_prefixes", []) if p.get("service") == "CLOUDFRONT"]
+    return v4 + v6
+
+
+def update_ranges(path: str | Path = DEFAULT_RANGES_FILE, timeout: int = 20) -> dict[str, int]:
+    """Refresh feed-backed providers in ``path`` and bump its version; returns prefix counts."""
+    path = Path(path)
+    payload = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {"providers": {}}
+    counts = {}
+    for provider in FEEDS:
+        prefixes = fetch_feed(provider, timeout)
+        for prefix in prefixes:
+            ipaddress.ip_network(prefix, strict=False)  # refuse to write a malformed feed
+        if not prefixes:
+            raise ValueError(f"{provider} feed returned no prefixes")
+        entry = payload["providers"].setdefault(provider, {})
+        entry["source"] = " ".join(FEEDS[provider])
+        entry["prefixes"] = prefixes
+        counts[provider] = len(prefixes)
+    payload["version"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    return counts
@@ -0,0 +1,153 @@
+"""Compiled expected-nameserver policy.
+
+expected_ns.json is compiled once into a reversed-label trie, so resolving
+the rule for a domain costs O(labels) however many rules there are.
+Supported rule kinds, most specific first:
+- exact keys in ``domain_overrides`` (``brand.com``)
+- suffix keys (``*.example.co.uk``) matching any name below the suffix
+- ``groups`` whose ``domains`` list holds exact or suffix keys; a group can
+  give exact ``nameservers``, provider ``patterns`` (``ns-*.awsdns-*``) or both
+- the global ``default`` list
+"""
+
+import fnmatch
+import hashlib
+import json
+import pickle
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+CACHE_FORMAT = 2
+
+
+def norm_ns(value: str) -> str:
+    return value.strip().rstrip(".").lower()
+
+
+@dataclass(frozen=True)
+class NsRule:
+    source: str
+    nameservers: tuple[str, ...] = ()
+    patterns: tuple[str, ...] = ()
+    pattern_re: re.Pattern | None = None
+
+    def matches(self, actual: list[str]) -> bool:
+        if self.nameservers and list(self.nameservers) == actual:
+            return True
+        if self.pattern_re is not None and actual:
+            return all(self.pattern_re.match(ns) for ns in actual)
+        return False
+
+
+def make_rule(source: str, nameservers: list[str] | None = None, patterns: list[str] | None = None) -> NsRule:
+    ns = tuple(sorted(set(norm_ns(x) for x in nameservers or [] if str(x).strip())))
+    pats = tuple(norm_ns(p) for p in patterns or [] if str(p).strip())
+    regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in pats)) if pats else None
+    return NsRule(source, ns, pats, regex)
+
+
+# Trie nodes are plain dicts (label -> child) so they compile and unpickle fast;
+# these keys cannot collide with DNS labels.
+_EXACT = "\x00exact"
+_WILD = "\x00wild"
+
+
+class NsPolicy:
+    """Nameserver policy resolved through a reversed-label trie."""
+
+    def __init__(self, default: NsRule) -> None:
+        self.root: dict[str, Any] = {}
+        self.default = default
+        self.rules = 0
+
+    def add(self, key: str, rule: NsRule) -> None:
+        key = key.strip().rstrip(".").lower()
+        wildcard = key.startswith("*.")
+        if wildcard:
+            key = key[2:]
+        node = self.root
+        for label in reversed(key.split(".")):
+            node = node.setdefault(label, {})
+        node[_WILD if wildcard else _EXACT] = rule
+        self.rules += 1
+
+    def lookup(self, domain: str) -> NsRule:
+        labels = domain.strip().rstrip(".").lower().split(".")
+        node = self.root
+        best = self.default
+        for label in reversed(labels):
+            # A suffix rule on an ancestor applies to everything strictly below it.
+            best = node.get(_WILD, best)
+            nxt = node.get(label)
+            if nxt is None:
+                return best
+            node = nxt
+        return node.get(_EXACT, best)
+
+
+def compile_policy(cfg: dict[str, Any]) -> NsPolicy:
+    # Brand portfolios share a handful of provider NS sets; build one rule per set.
+    interned: dict[tuple[str, Any, Any], NsRule] = {}
+
+    def rule_for(source: str, nameservers: Any, patterns: Any = None) -> NsRule:
+        key = (source, tuple(nameservers or ()), tuple(patterns or ()))
+        rule = interned.get(key)
+        if rule is None:
+            rule = interned[key] = make_rule(source, nameservers, patterns)
+        return rule
+
+    policy = NsPolicy(make_rule("default", cfg.get("default") or []))
+    # Groups first so explicit domain_overrides win on identical keys.
+    for name, group in (cfg.get("groups") or {}).items():
+        if not isinstance(group, dict):
+            continue
+        rule = rule_for(f"group:{name}", group.get("nameservers"), group.get("patterns"))
+        for key in group.get("domains") or []:
+            policy.add(str(key), rule)
+    for key, vals in (cfg.get("domain_overrides") or {}).items():
+        source = f"suffix:{key.lower()}" if str(key).startswith("*.") else "exact"
+        if isinstance(vals, dict):
+            rule = rule_for(source, vals.get("nameservers"), vals.get("patterns"))
+        else:
+            rule = rule_for(source, vals)
+        policy.add(str(key), rule)
+    return policy
+
+
+def load_policy(path: str | Path, cache_path: str | Path | None = None) -> NsPolicy:
+    """Compile the policy file, reusing a pickled copy when the source is unchanged.
+
+    The cache is keyed by the SHA-256 of the policy file; only point
+    ``cache_path`` at a location you control.
+    """
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return compile_policy({"default": [], "domain_overrides": {}})
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if cache_path is not None:
+        cache_path = Path(cache_path)
+        try:
+            with cache_path.open("rb") as fh:
+                fmt, cached_digest, policy = pickle.load(fh)
+            if fmt == CACHE_FORMAT and cached_digest == digest and isinstance(policy, NsPolicy):
+                return policy
+        except Exception:
+            pass
+
+    try:
+        cfg = json.loads(raw.decode("utf-8"))
+    except ValueError:
+        return compile_policy({"default": [], "domain_overrides": {}})
+    policy = compile_policy(cfg)
+    if cache_path is not None:
+        try:
+            with cache_path.open("wb") as fh:
+                pickle.dump((CACHE_FORMAT, digest, policy), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+    return policy
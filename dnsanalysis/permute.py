@@ -0,0 +1,150 @@
+"""Lazy typosquat permutations of brand domains.
+
+Every technique is a generator over the registrable label (the first label
+of the brand domain); nothing is materialised, so a large TLD list crossed
+with every permutation streams in constant memory.
+
+- omission: one character dropped (``exmple``)
+- transposition: two adjacent characters swapped (``exmaple``)
+- homoglyph: ASCII look-alikes (``rn``/``m``, ``0``/``o``, ``1``/``l``) and
+  single Unicode confusables, emitted as IDNA punycode (``xn--...``)
+- bitsquat: one bit flipped in one character, kept if still a hostname
+  character (``dxample``)
+- hyphenation: a hyphen inserted between two characters (``ex-ample``)
+- tld-swap: the brand label under other TLDs (``example.net``)
+
+The brand's own suffix is everything after its first label, so
+``example.co.uk`` permutes ``example`` and keeps ``co.uk``.
+"""
+
+import string
+from typing import Iterable, Iterator
+
+TECHNIQUES = ("omission", "transposition", "homoglyph", "bitsquat", "hyphenation", "tld-swap")
+DEFAULT_TLDS = (
+    "com", "net", "org", "info", "biz", "co", "io", "me", "us", "uk", "co.uk", "de", "fr", "nl", "eu",
+    "ch", "be", "it", "es", "ru", "cn", "in", "xyz", "online", "site", "shop", "store", "app", "dev", "top",
+)
+_HOSTNAME_CHARS = frozenset(string.ascii_lowercase + string.digits + "-")
+
+ASCII_LOOKALIKES = {
+    "m": ("rn", "nn"),
+    "rn": ("m",),
+    "w": ("vv",),
+    "vv": ("w",),
+    "d": ("cl",),
+    "cl": ("d",),
+    "o": ("0",),
+    "0": ("o",),
+    "l": ("1", "i"),
+    "1": ("l",),
+    "i": ("1", "l"),
+    "e": ("3",),
+    "s": ("5",),
+    "g": ("q",),
+    "q": ("g",),
+}
+UNICODE_CONFUSABLES = {
+    "a": ("а", "à", "á", "ä", "ɑ"),
+    "c": ("с", "ç"),
+    "e": ("е", "è", "é", "ë"),
+    "i": ("і", "í", "ï", "ı"),
+    "j": ("ј",),
+    "k": ("κ",),
+    "n": ("ñ",),
+    "o": ("о", "ο", "ó", "ö"),
+    "p": ("р",),
+    "s": ("ѕ",),
+    "u": ("ú", "ü"),
+    "x": ("х",),
+    "y": ("у", "ý"),
+}
+
+
+def split_brand(domain: str) -> tuple[str, str]:
+    """(first label, suffix) of a brand domain."""
+    label, _, suffix = domain.lower().strip(".").partition(".")
+    return label, suffix
+
+
+def valid_label(label: str) -> bool:
+    return 0 < len(label) <= 63 and label[0] != "-" and label[-1] != "-" and set(label) <= _HOSTNAME_CHARS
+
+
+def omission(label: str) -> Iterator[str]:
+    for i in range(len(label)):
+        yield label[:i] + label[i + 1 :]
+
+
+def transposition(label: str) -> Iterator[str]:
+    for i in range(len(label) - 1):
+        if label[i] != label[i + 1]:
+            yield label[:i] + label[i + 1] + label[i] + label[i + 2 :]
+
+
+def homoglyph(label: str) -> Iterator[str]:
+    for glyph, swaps in ASCII_LOOKALIKES.items():
+        start = label.find(glyph)
+        while start >= 0:
+            for swap in swaps:
+                yield label[:start] + swap + label[start + len(glyph) :]
+            start = label.find(glyph, start + 1)
+    for i, ch in enumerate(label):
+        for swap in UNICODE_CONFUSABLES.get(ch, ()):
+            try:
+                yield (label[:i] + swap + label[i + 1 :]).encode("idna").decode("ascii")
+            except UnicodeError:
+                continue
+
+
+def bitsquat(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        code = ord(ch)
+        for bit in range(8):
+            flipped = chr(code ^ (1 << bit)).lower()
+            if flipped != ch and flipped in _HOSTNAME_CHARS:
+                yield label[:i] + flipped + label[i + 1 :]
+
+
+def hyphenation(label: str) -> Iterator[str]:
+    for i in range(1, len(label)):
+        if label[i - 1] != "-" and label[i] != "-":
+            yield label[:i] + "-" + label[i:]
+
+
+_LABEL_TECHNIQUES = {
+    "omission": omission,
+    "transposition": transposition,
+    "homoglyph": homoglyph,
+    "bitsquat": bitsquat,
+    "hyphenation": hyphenation,
+}
+
+
+def permutations(
+    brand: str,
+    techniques: Iterable[str] = TECHNIQUES,
+    tlds: Iterable[str] = DEFAULT_TLDS,
+    cross_tlds: bool = False,
+) -> Iterator[tuple[str, str]]:
+    """Yield (technique, candidate domain) for one brand; duplicates are left to the caller.
+
+    Label permutations keep the brand's suffix, or with ``cross_tlds`` are
+    also emitted under every TLD in ``tlds``.
+    """
+    label, suffix = split_brand(brand)
+    if not label or not suffix:
+        return
+    tlds = [t.lower().strip(".") for t in tlds]
+    wanted = list(techniques)
+    suffixes = [suffix] + [t for t in tlds if t != suffix] if cross_tlds else [suffix]
+    for technique in wanted:
+        if technique == "tld-swap":
+            for tld in tlds:
+                if tld != suffix:
+                    yield technique, f"{label}.{tld}"
+            continue
+        for candidate in _LABEL_TECHNIQUES[technique](label):
+            if candidate != label and valid_label(candidate):
+                for sfx in suffixes:
+                    yield technique, f"{candidate}.{sfx}"
@@ -0,0 +1,103 @@
+"""Per-domain DNS query planning with single-flight request coalescing.
+
+- ``SingleFlight`` makes concurrent identical lookups share one upstream
+  request: the first caller runs it, later callers wait for its result
+- ``QueryPlan`` takes the (type, name) queries a domain's checks declare,
+  deduplicates them and issues them as one concurrent batch; checks then
+  read the planned answers instead of querying again
+
+Together these collapse the overlap between signals (apex TXT for SPF and
+others, A for IP resolution) and between domains in a batch that share
+names, such as nameserver hosts and SPF include targets.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Iterable
+
+PLAN_WORKERS = 64
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key onto one execution."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.joined = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return (result, shared); ``shared`` is True if another caller did the work."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+                self.leaders += 1
+            else:
+                self.joined += 1
+        if not leader:
+            return fut.result(), True
+        try:
+            result = fn()
+        except BaseException as exc:
+            fut.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        fut.set_result(result)
+        return result, False
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"upstream": self.leaders, "coalesced": self.joined}
+
+
+class QueryPlan:
+    """The deduplicated DNS queries declared up front for one domain."""
+
+    def __init__(self, pool: ThreadPoolExecutor, fetch: Callable[[str, str], Any]) -> None:
+        self._pool = pool
+        self._fetch = fetch
+        self._futures: dict[tuple[str, str], Future] = {}
+        self.declared = 0
+
+    @staticmethod
+    def key(rtype: str, name: str) -> tuple[str, str]:
+        return rtype.upper(), name.strip().rstrip(".").lower()
+
+    def start(self, queries: Iterable[tuple[str, str]]) -> "QueryPlan":
+        for rtype, name in queries:
+            self.declared += 1
+            key = self.key(rtype, name)
+            if key not in self._futures:
+                # Run in a copy of the caller's context so the domain's time budget applies.
+                self._futures[key] = self._pool.submit(contextvars.copy_context().run, self._fetch, *key)
+        return self
+
+    def get(self, rtype: str, name: str) -> Future | None:
+        return self._futures.get(self.key(rtype, name))
+
+    @property
+    def issued(self) -> int:
+        return len(self._futures)
+
+    def cancel(self) -> None:
+        for fut in self._futures.values():
+            fut.cancel()
+
+
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def plan_pool() -> ThreadPoolExecutor:
+    """Pool reserved for planned queries, so they never queue behind work that waits on them."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=PLAN_WORKERS, thread_name_prefix="plan")
+        return _POOL
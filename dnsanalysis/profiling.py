@@ -0,0 +1,227 @@
+"""Low-overhead per-stage latency histograms for the Python tools.
+
+Instrumentation is a no-op until ``enable`` is called. Once enabled, every
+observation lands in a fixed log-bucketed histogram keyed by (stage,
+upstream), along with retry and outcome counters and the slowest domains.
+The data can be rendered as a text report, JSON, or a Prometheus textfile.
+"""
+
+import bisect
+import functools
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+# Geometric bucket bounds from 50 microseconds to ~5 minutes (ratio 1.25).
+_BOUNDS = [5e-5 * (1.25**i) for i in range(int(math.log(300 / 5e-5, 1.25)) + 2)]
+# Bucket edges exported to Prometheus; finer internal buckets are folded into these.
+PROM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SLOWEST_DOMAINS = 10
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max", "retries", "outcomes")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.retries = 0
+        self.outcomes: dict[str, int] = {}
+
+    def add(self, seconds: float, outcome: str, retries: int) -> None:
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.retries += retries
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_BOUNDS[idx] if idx < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def le(self, bound: float) -> int:
+        """Observations in buckets whose upper edge is <= ``bound``."""
+        return sum(self.counts[: bisect.bisect_right(_BOUNDS, bound)])
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "retries": self.retries,
+            "outcomes": dict(sorted(self.outcomes.items())),
+        }
+
+
+class Profiler:
+    def __init__(self, tool: str) -> None:
+        self.tool = tool
+        self.started = time.time()
+        self._hists: dict[tuple[str, str], Histogram] = {}
+        self._slowest: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, upstream: str = "", outcome: str = "ok", retries: int = 0) -> None:
+        key = (stage, upstream)
+        with self._lock:
+            hist = self._hists.get(key)
+            if hist is None:
+                hist = self._hists[key] = Histogram()
+            hist.add(seconds, outcome, retries)
+
+    def observe_domain(self, domain: str, seconds: float) -> None:
+        self.observe("domain", seconds)
+        with self._lock:
+            if len(self._slowest) < SLOWEST_DOMAINS:
+                heapq.heappush(self._slowest, (seconds, domain))
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, domain))
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            items = sorted(self._hists.items())
+            slowest = sorted(self._slowest, reverse=True)
+        stages: dict[str, Histogram] = {}
+        for (stage, _), hist in items:
+            merged = stages.setdefault(stage, Histogram())
+            merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+            merged.count += hist.count
+            merged.total += hist.total
+            merged.max = max(merged.max, hist.max)
+            merged.retries += hist.retries
+            for k, v in hist.outcomes.items():
+                merged.outcomes[k] = merged.outcomes.get(k, 0) + v
+        return {
+            "tool": self.tool,
+            "wall_seconds": round(time.time() - self.started, 3),
+            "stages": {stage: h.summary() for stage, h in sorted(stages.items())},
+            "upstreams": [{"stage": s, "upstream": u, **h.summary()} for (s, u), h in items if u],
+            "slowest_domains": [{"domain": d, "seconds": round(sec, 3)} for sec, d in slowest],
+        }
+
+    def render_text(self) -> str:
+        rep = self.report()
+        lines = [f"Profile: {rep['tool']} ({rep['wall_seconds']}s wall)", "=" * 72]
+        header = f"{'STAGE':<24} {'UPSTREAM':<24} {'N':>7} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'retries':>7}"
+        lines.append(header)
+        lines.append("-" * len(header))
+        for stage, s in rep["stages"].items():
+            lines.append(f"{stage:<24} {'*':<24} {s['count']:>7} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['retries']:>7}")
+        for u in rep["upstreams"]:
+            lines.append(
+                f"{u['stage']:<24} {u['upstream'][:24]:<24} {u['count']:>7} {u['p50_ms']:>9} {u['p95_ms']:>9} {u['p99_ms']:>9} {u['retries']:>7}"
+            )
+        if rep["slowest_domains"]:
+            lines.append("")
+            lines.append("Slowest domains:")
+            for d in rep["slowest_domains"]:
+                lines.append(f"  {d['seconds']:>9.3f}s  {d['domain']}")
+        return "\n".join(lines) + "\n"
+
+    def prometheus_text(self) -> str:
+        def esc(v: str) -> str:
+            return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        with self._lock:
+            items = sorted(self._hists.items())
+        name = "dns_analysis_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Wall time per instrumented stage and upstream.",
+            f"# TYPE {name} histogram",
+        ]
+        retries = ["# HELP dns_analysis_stage_retries_total Retries per stage and upstream.", "# TYPE dns_analysis_stage_retries_total counter"]
+        outcomes = ["# HELP dns_analysis_stage_outcomes_total Calls per stage, upstream and outcome.", "# TYPE dns_analysis_stage_outcomes_total counter"]
+        for (stage, upstream), h in items:
+            labels = f'tool="{esc(self.tool)}",stage="{esc(stage)}",upstream="{esc(upstream)}"'
+            for bound in PROM_BUCKETS:
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {h.le(bound)}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{name}_sum{{{labels}}} {h.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+            retries.append(f"dns_analysis_stage_retries_total{{{labels}}} {h.retries}")
+            for outcome, n in sorted(h.outcomes.items()):
+                outcomes.append(f'dns_analysis_stage_outcomes_total{{{labels},outcome="{esc(outcome)}"}} {n}')
+        return "\n".join(lines + retries + outcomes) + "\n"
+
+    def export(self, path: str | Path) -> None:
+        """Write ``.prom`` files in Prometheus textfile format, anything else as JSON.
+
+        The file is replaced atomically so a textfile collector never reads a partial write.
+        """
+        path = Path(path)
+        body = self.prometheus_text() if path.suffix == ".prom" else json.dumps(self.report(), indent=2) + "\n"
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(body, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+_ACTIVE: Profiler | None = None
+
+
+def enable(tool: str) -> Profiler:
+    global _ACTIVE
+    _ACTIVE = Profiler(tool)
+    return _ACTIVE
+
+
+def active() -> Profiler | None:
+    return _ACTIVE
+
+
+def observe(stage: str, seconds: float, upstream: str = "", outcome: str = "ok", retries: int = 0) -> None:
+    prof = _ACTIVE
+    if prof is not None:
+        prof.observe(stage, seconds, upstream, outcome, retries)
+
+
+def observe_domain(domain: str, seconds: float) -> None:
+    prof = _ACTIVE
+    if prof is not None:
+        prof.observe_domain(domain, seconds)
+
+
+def timed(
+    stage: str,
+    upstream: Callable[..., str] | None = None,
+    outcome: Callable[[Any], str] | None = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator recording a call's wall time; ``upstream``/``outcome`` label it from args/result."""
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            prof = _ACTIVE
+            if prof is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            up = upstream(*args, **kwargs) if upstream else ""
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                prof.observe(stage, time.perf_counter() - start, up, "exception")
+                raise
+            prof.observe(stage, time.perf_counter() - start, up, outcome(result) if outcome else "ok")
+            return result
+
+        return wrapper
+
+    return deco
@@ -0,0 +1,195 @@
+"""RDAP client with IANA bootstrap routing, pooled connections and per-host rate limits.
+
+- each TLD is routed to its registry RDAP server using the IANA bootstrap
+  registry (RFC 9224), bundled as config/rdap_bootstrap.json and refreshable
+  with ``update_bootstrap``; TLDs missing from it go through rdap.org
+- HTTP/1.1 keep-alive connections are pooled per registry host
+- every host has its own token bucket; 429 responses pause the host for
+  the Retry-After interval
+- attempts go through the shared retry policy, so an unhealthy registry
+  host fails fast behind its circuit breaker
+"""
+
+import http.client
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+from dnsanalysis import profiling, retry
+from dnsanalysis.httppool import ConnectionPool
+from dnsanalysis.ratelimit import TokenBucket
+
+IANA_BOOTSTRAP_URL = "https://data.iana.org/rdap/dns.json"
+DEFAULT_BOOTSTRAP_FILE = Path(__file__).resolve().parent.parent / "config" / "rdap_bootstrap.json"
+FALLBACK_BASE = "https://rdap.org/"
+USER_AGENT = "dns-analysis-monitor/1.0"
+MAX_REDIRECTS = 3
+MAX_RETRY_AFTER = 60.0
+
+
+def load_bootstrap(path: str | Path = DEFAULT_BOOTSTRAP_FILE) -> dict[str, str]:
+    """Return a TLD -> base URL map from an IANA dns.json style file."""
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return bootstrap_map(payload)
+
+
+def bootstrap_map(payload: dict[str, Any]) -> dict[str, str]:
+    routes: dict[str, str] = {}
+    for entry in payload.get("services", []) or []:
+        if len(entry) < 2 or not entry[1]:
+            continue
+        urls = [u for u in entry[1] if str(u).startswith("https://")] or list(entry[1])
+        base = str(urls[0])
+        if not base.endswith("/"):
+            base += "/"
+        for tld in entry[0]:
+            routes[str(tld).lower().strip(".")] = base
+    return routes
+
+
+def update_bootstrap(path: str | Path = DEFAULT_BOOTSTRAP_FILE, url: str = IANA_BOOTSTRAP_URL, timeout: int = 20) -> int:
+    """Download the IANA registry to ``path``; returns the number of services."""
+    req = Request(url, headers={"User-Agent": USER_AGENT})
+    with urlopen(req, timeout=timeout) as resp:
+        payload = json.loads(resp.read().decode("utf-8"))
+    if not isinstance(payload.get("services"), list):
+        raise ValueError("bootstrap payload has no services list")
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    return len(payload["services"])
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        delta = parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+    return min(max(delta, 0.0), MAX_RETRY_AFTER)
+
+
+class RdapClient:
+    """Thread-safe RDAP domain lookups routed by TLD over pooled connections."""
+
+    def __init__(
+        self,
+        bootstrap: dict[str, str] | None = None,
+        bootstrap_file: str | Path = DEFAULT_BOOTSTRAP_FILE,
+        fallback_base: str = FALLBACK_BASE,
+        rate: float = 2.0,
+        burst: int = 4,
+        timeout: float = 6.0,
+        retries: int = 3,
+        max_idle_per_host: int = 8,
+        policy: retry.RetryPolicy | None = None,
+    ) -> None:
+        self.routes = bootstrap if bootstrap is not None else load_bootstrap(bootstrap_file)
+        self.fallback_base = fallback_base
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.retries = retries
+        self.policy = policy if policy is not None else retry.current()
+        self.pool = ConnectionPool(self._connect, max_idle_per_host)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def base_for(self, domain: str) -> str:
+        labels = domain.lower().strip(".").split(".")
+        for i in range(len(labels)):
+            base = self.routes.get(".".join(labels[i:]))
+            if base:
+                return base
+        return self.fallback_base
+
+    def domain_url(self, domain: str) -> str:
+        return urljoin(self.base_for(domain), f"domain/{quote(domain.lower().strip('.'))}")
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return b
+
+    def _connect(self, key: tuple[str, str, int | None]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout)
+
+    def _request(self, url: str, timeout: float) -> tuple[int, dict[str, str], bytes]:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {"User-Agent": USER_AGENT, "Accept": "application/rdap+json, application/json"}
+        return self.pool.request((parts.scheme, parts.hostname or "", parts.port), "GET", path, headers, timeout)
+
+    def get_json(self, url: str) -> tuple[dict[str, Any] | None, str]:
+        """GET an RDAP URL with redirects, rate limiting and retries; returns (payload, source)."""
+        payload, source, _ = self.get_json_status(url)
+        return payload, source
+
+    def get_json_status(self, url: str) -> tuple[dict[str, Any] | None, str, int | None]:
+        """As ``get_json``, plus the final HTTP status (None when no response arrived)."""
+        started = time.perf_counter()
+        payload, source, attempts, status = self._get_json(url)
+        outcome = "ok" if payload is not None else ("notfound" if status == 404 else "error")
+        profiling.observe("rdap", time.perf_counter() - started, urlsplit(url).hostname or "", outcome, attempts - 1)
+        return payload, source, status
+
+    def _get_json(self, url: str) -> tuple[dict[str, Any] | None, str, int, int | None]:
+        call = self.policy.call(f"rdap:{urlsplit(url).hostname or ''}", self.timeout, self.retries)
+        status: int | None = None
+        while call.attempt():
+            target = url
+            try:
+                for _ in range(MAX_REDIRECTS + 1):
+                    host = urlsplit(target).hostname or ""
+                    bucket = self.bucket(host)
+                    bucket.acquire()
+                    status, headers, body = self._request(target, call.timeout)
+                    if status in (301, 302, 303, 307, 308) and headers.get("location"):
+                        target = urljoin(target, headers["location"])
+                        continue
+                    break
+                if status == 200:
+                    payload = json.loads(body.decode("utf-8", errors="ignore"))
+                    call.success()
+                    return payload, "rdap", call.attempts, status
+                if status == 404:
+                    call.success()
+                    return None, "rdap_error:HTTP 404 not found", call.attempts, status
+                if status == 429:
+                    # Throttling says nothing about the host's health; just wait it out.
+                    call.failure("HTTP Error 429", upstream_fault=False)
+                    wait_for = _retry_after_seconds(headers.get("retry-after"))
+                    bucket.pause(wait_for if wait_for is not None else 1.0 * call.attempts)
+                    continue
+                call.failure(f"HTTP Error {status}", upstream_fault=status >= 500)
+            except Exception as exc:
+                status = None
+                call.failure(str(exc))
+        return None, f"rdap_error:{call.reason[:120]}", max(1, call.attempts), status
+
+    def domain(self, domain: str) -> tuple[dict[str, Any] | None, str]:
+        return self.get_json(self.domain_url(domain))
+
+    def domain_status(self, domain: str) -> tuple[dict[str, Any] | None, str, int | None]:
+        return self.get_json_status(self.domain_url(domain))
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,137 @@
+"""Compact per-signal result records.
+
+A batch of a million domains holds six signals per domain, and almost all
+of their fields come from a handful of values. ``Signal`` therefore keeps
+only small codes:
+- ``status`` and ``confidence`` are ``Status``/``Confidence`` enum members
+- ``data_source`` is a code into ``SOURCES``, a process-wide intern table
+  (sources are open-ended, e.g. ``dns_error:SERVFAIL`` or ``rdap+dns``)
+- ``__slots__``, so a record has no per-instance dict
+
+The string properties return the same interned objects every time, and
+``as_dict`` builds the plain dict used by the JSON output, the state store
+and the history store.
+"""
+
+import sys
+import threading
+from enum import IntEnum
+from typing import Any
+
+
+class Status(IntEnum):
+    PASS = 0
+    WARN = 1
+    FAIL = 2
+    UNKNOWN = 3
+
+    @property
+    def label(self) -> str:
+        return _STATUS_LABELS[self]
+
+    @classmethod
+    def parse(cls, value: "str | Status") -> "Status":
+        return value if isinstance(value, cls) else cls[value.upper()]
+
+
+class Confidence(IntEnum):
+    HIGH = 0
+    MEDIUM = 1
+    LOW = 2
+
+    @property
+    def label(self) -> str:
+        return _CONFIDENCE_LABELS[self]
+
+    @classmethod
+    def parse(cls, value: "str | Confidence") -> "Confidence":
+        return value if isinstance(value, cls) else cls[value.upper()]
+
+
+_STATUS_LABELS = {s: sys.intern(s.name.lower()) for s in Status}
+_CONFIDENCE_LABELS = {c: sys.intern(c.name.lower()) for c in Confidence}
+
+
+class SourceTable:
+    """Interns data-source strings as small integer codes, in first-seen order."""
+
+    def __init__(self, names: tuple[str, ...] = ()) -> None:
+        self._lock = threading.Lock()
+        self._codes: dict[str, int] = {}
+        self._names: list[str] = []
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    code = len(self._names)
+                    self._names.append(sys.intern(name))
+                    self._codes[self._names[code]] = code
+        return code
+
+    def name(self, code: int) -> str:
+        return self._names[code]
+
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+SOURCES = SourceTable(("dns", "rdap", "whois", "deadline", "error"))
+
+
+class Signal:
+    """One signal result: status, confidence, data source and free-form details."""
+
+    __slots__ = ("_status", "_confidence", "_source", "details")
+
+    def __init__(self, status: str | Status, confidence: str | Confidence, data_source: str, details: dict[str, Any]) -> None:
+        self._status = Status.parse(status)
+        self._confidence = Confidence.parse(confidence)
+        self._source = SOURCES.code(data_source)
+        self.details = details
+
+    @property
+    def status(self) -> str:
+        return self._status.label
+
+    @property
+    def confidence(self) -> str:
+        return self._confidence.label
+
+    @property
+    def data_source(self) -> str:
+        return SOURCES.name(self._source)
+
+    @property
+    def status_code(self) -> Status:
+        return self._status
+
+    @property
+    def confidence_code(self) -> Confidence:
+        return self._confidence
+
+    @property
+    def source_code(self) -> int:
+        return self._source
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"status": self.status, "confidence": self.confidence, "data_source": self.data_source, "details": self.details}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Signal":
+        return cls(data["status"], data["confidence"], str(data.get("data_source", "")), data.get("details") or {})
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Signal):
+            return NotImplemented
+        return (self._status, self._confidence, self._source, self.details) == (other._status, other._confidence, other._source, other.details)
+
+    def __repr__(self) -> str:
+        return f"Signal(status={self.status!r}, confidence={self.confidence!r}, data_source={self.data_source!r}, details={self.details!r})"
@@ -0,0 +1,190 @@
+"""Tiered registered/unregistered checks for bulk domain lists.
+
+Each domain stops at the first tier that settles it:
+- DNS: an NS (or, failing that, apex SOA) answer proves the domain is
+  delegated and therefore registered. DNS never proves the opposite, since
+  registered domains can be undelegated (e.g. on clientHold)
+- RDAP: an object means registered; a 404 from the TLD's own registry
+  server (routed by the IANA bootstrap) means unregistered. A 404 through
+  the rdap.org fallback is ambiguous and moves on to the next tier
+- WHOIS: only for what is still ambiguous; registries' "not found"
+  phrasing (or "<domain> is free") means unregistered, a rate-limit or
+  refusal notice unknown, and any other answer registered
+
+``Checkpoint`` stores settled results in SQLite so an interrupted run can
+resume without repeating them; "unknown" results are retried.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+STATUSES = ("registered", "unregistered", "unknown")
+_COMMIT_EVERY = 100
+_COMMIT_SECONDS = 2.0
+
+# Registry phrasing for names with no registration object.
+AVAILABLE_PATTERNS = re.compile(
+    r"^\s*(?:no match|not found|no matching record|no data found|no entries found|no object found"
+    r"|domain not found|status:\s*(?:free|available))",
+    re.I | re.M,
+)
+# "<domain> is free" style answers only count when they name the queried
+# domain, so disclaimers such as "this service is free of charge" do not.
+_DOMAIN_AVAILABLE = r"""^[\s"'(]*(?:the\s+)?(?:domain\s+(?:name\s+)?)?["']?{domain}["'.)]*\s+is\s+(?:free|available)\b"""
+# Rate-limit and refusal notices from port-43 servers. Only trusted when the
+# answer has no record fields, since terms of use often mention rate limits.
+REFUSED_PATTERNS = re.compile(
+    r"rate.?limit|limit exceeded|exceeded (?:the |your )?(?:query |request )?(?:limit|quota)|quota exceeded"
+    r"|too many (?:requests|queries|connections)|try again later|temporarily (?:unavailable|blocked|denied)"
+    r"|access (?:denied|refused)|blacklisted",
+    re.I,
+)
+_RECORD_FIELDS = re.compile(r"^\s*(?:domain(?: name)?|registrar|registry domain id|creat(?:ed|ion date)|registered)\s*:", re.I | re.M)
+
+# The monitor's lookup layer: dns_lookup, rdap_domain_status and whois_lookup.
+DnsLookup = Callable[[str, str], tuple[list[str], str, str | None]]
+RdapLookup = Callable[[str], tuple[dict[str, Any] | None, str, int | None]]  # payload, source, HTTP status
+WhoisLookup = Callable[[str], tuple[str, str]]
+
+
+def whois_unregistered(text: str, domain: str) -> bool:
+    if AVAILABLE_PATTERNS.search(text):
+        return True
+    return bool(re.search(_DOMAIN_AVAILABLE.format(domain=re.escape(domain)), text, re.I | re.M))
+
+
+def whois_refused(text: str) -> bool:
+    """A throttling or refusal notice rather than an answer about the domain."""
+    return bool(REFUSED_PATTERNS.search(text)) and not _RECORD_FIELDS.search(text)
+
+
+@dataclass
+class Registration:
+    domain: str
+    status: str
+    confidence: str
+    data_source: str
+    details: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class RegistrationChecker:
+    """Settle each domain at the cheapest tier that can; thread-safe if the lookups are."""
+
+    def __init__(
+        self,
+        dns_lookup: DnsLookup,
+        rdap_domain: RdapLookup,
+        whois_lookup: WhoisLookup,
+        rdap_authoritative: Callable[[str], bool] = lambda domain: True,
+    ) -> None:
+        self.dns_lookup = dns_lookup
+        self.rdap_domain = rdap_domain
+        self.whois_lookup = whois_lookup
+        self.rdap_authoritative = rdap_authoritative
+        self._lock = threading.Lock()
+        self.tiers = {"dns": 0, "rdap": 0, "whois": 0, "unsettled": 0}
+
+    def _settled(self, tier: str) -> None:
+        with self._lock:
+            self.tiers[tier] += 1
+
+    def check(self, domain: str) -> Registration:
+        domain = domain.lower().strip(".")
+        ns, ns_src, ns_rcode = self.dns_lookup("NS", domain)
+        if ns:
+            self._settled("dns")
+            return Registration(domain, "registered", "high", "dns", {"tier": "dns", "ns": ns})
+        dns_note = ns_rcode or ns_src
+        if ns_rcode == "NOERROR":
+            soa, _, _ = self.dns_lookup("SOA", domain)
+            if soa:
+                self._settled("dns")
+                return Registration(domain, "registered", "high", "dns", {"tier": "dns", "soa": soa[0]})
+
+        payload, rdap_src, http_status = self.rdap_domain(domain)
+        if payload:
+            self._settled("rdap")
+            status = [str(s) for s in payload.get("status", []) or []]
+            return Registration(domain, "registered", "high", "rdap", {"tier": "rdap", "dns": dns_note, "rdap_status": status})
+        if http_status == 404 and self.rdap_authoritative(domain):
+            self._settled("rdap")
+            return Registration(domain, "unregistered", "high", "rdap", {"tier": "rdap", "dns": dns_note})
+
+        text, whois_src = self.whois_lookup(domain)
+        if text and whois_refused(text):
+            # Not settled: "unknown" is left out of the checkpoint so a resumed run asks again.
+            self._settled("unsettled")
+            return Registration(domain, "unknown", "low", "whois_error:refused", {"tier": None, "dns": dns_note, "rdap": rdap_src})
+        if text:
+            self._settled("whois")
+            status = "unregistered" if whois_unregistered(text, domain) else "registered"
+            return Registration(domain, status, "medium", "whois", {"tier": "whois", "dns": dns_note, "rdap": rdap_src})
+
+        self._settled("unsettled")
+        return Registration(domain, "unknown", "low", whois_src, {"tier": None, "dns": dns_note, "rdap": rdap_src})
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.tiers)
+
+
+class Checkpoint:
+    """SQLite record of settled results, committed every few rows or seconds."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS registration ("
+            "domain TEXT PRIMARY KEY, status TEXT NOT NULL, checked REAL NOT NULL, result TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._committed = time.monotonic()
+        self.resumed = 0
+        self.recorded = 0
+
+    def get(self, domain: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM registration WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            return None
+        self.resumed += 1
+        return json.loads(row[0])
+
+    def record(self, result: dict[str, Any]) -> None:
+        if result.get("status") not in ("registered", "unregistered"):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO registration VALUES (?, ?, ?, ?)",
+                (result["domain"], result["status"], time.time(), json.dumps(result, separators=(",", ":"))),
+            )
+            self.recorded += 1
+            self._pending += 1
+            if self._pending >= _COMMIT_EVERY or time.monotonic() - self._committed >= _COMMIT_SECONDS:
+                self._conn.commit()
+                self._pending = 0
+                self._committed = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM registration").fetchone()[0]
+        return {"store": str(self.path), "resumed": self.resumed, "recorded": self.recorded, "settled_total": total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,573 @@
+"""In-process DNS stub resolver.
+
+Builds and parses DNS messages (RFC 1035) itself instead of forking ``dig``:
+- one shared UDP socket per address family, reused for every query
+- responses matched by query ID, so many threads can have lookups in flight
+- TCP fallback when a UDP answer comes back truncated
+- typed records with a ``dig +short`` compatible rendering
+- per-server circuit breakers and adaptive timeouts from the shared retry policy
+"""
+
+import ipaddress
+import random
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from dnsanalysis import retry
+
+RR_TYPES = {
+    "A": 1,
+    "NS": 2,
+    "CNAME": 5,
+    "SOA": 6,
+    "PTR": 12,
+    "MX": 15,
+    "TXT": 16,
+    "AAAA": 28,
+    "SRV": 33,
+    "OPT": 41,
+    "DS": 43,
+    "DNSKEY": 48,
+    "CAA": 257,
+}
+RR_NAMES = {v: k for k, v in RR_TYPES.items()}
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+CLASS_IN = 1
+EDNS_PAYLOAD = 1232
+RESOLV_CONF = Path("/etc/resolv.conf")
+
+
+class DnsError(Exception):
+    """Lookup could not be completed (socket, config or protocol failure)."""
+
+
+class DnsTimeout(DnsError):
+    """No usable response from any nameserver within the retry budget."""
+
+
+@dataclass(frozen=True)
+class SOA:
+    mname: str
+    rname: str
+    serial: int
+    refresh: int
+    retry: int
+    expire: int
+    minimum: int
+
+
+@dataclass(frozen=True)
+class MX:
+    preference: int
+    exchange: str
+
+
+@dataclass(frozen=True)
+class SRV:
+    priority: int
+    weight: int
+    port: int
+    target: str
+
+
+@dataclass(frozen=True)
+class CAA:
+    flags: int
+    tag: str
+    value: str
+
+
+def _quote_txt(raw: str) -> str:
+    out = []
+    for ch in raw:
+        if ch in ('"', "\\"):
+            out.append("\\" + ch)
+        elif 32 <= ord(ch) < 127:
+            out.append(ch)
+        else:
+            out.extend(f"\\{b:03d}" for b in ch.encode("utf-8", errors="replace"))
+    return '"' + "".join(out) + '"'
+
+
+@dataclass(frozen=True)
+class Record:
+    name: str
+    rtype: str
+    ttl: int
+    value: Any
+
+    def short(self) -> str:
+        """Render the RDATA the way ``dig +short`` prints it."""
+        v = self.value
+        if isinstance(v, SOA):
+            return f"{v.mname}. {v.rname}. {v.serial} {v.refresh} {v.retry} {v.expire} {v.minimum}"
+        if isinstance(v, MX):
+            return f"{v.preference} {v.exchange}."
+        if isinstance(v, SRV):
+            return f"{v.priority} {v.weight} {v.port} {v.target}."
+        if isinstance(v, CAA):
+            return f'{v.flags} {v.tag} "{v.value}"'
+        if self.rtype == "TXT":
+            return " ".join(_quote_txt(s) for s in v)
+        if self.rtype in ("NS", "CNAME", "PTR"):
+            return f"{v}."
+        if isinstance(v, bytes):
+            return f"\\# {len(v)} {v.hex()}".rstrip()
+        return str(v)
+
+
+@dataclass
+class Answer:
+    name: str
+    rtype: str
+    rcode: str
+    records: list[Record] = field(default_factory=list)
+    authority: list[Record] = field(default_factory=list)
+    server: str = ""
+    authoritative: bool = False
+
+    @property
+    def nxdomain(self) -> bool:
+        return self.rcode == "NXDOMAIN"
+
+    @property
+    def nodata(self) -> bool:
+        return self.rcode == "NOERROR" and not self.values()
+
+    def values(self, rtype: str | None = None) -> list[Any]:
+        """Typed values for the queried (or given) type, skipping CNAME hops."""
+        want = (rtype or self.rtype).upper()
+        return [r.value for r in self.records if r.rtype == want]
+
+    def short(self) -> list[str]:
+        return [r.short() for r in self.records]
+
+    def ttl(self) -> int | None:
+        """Cache lifetime: minimum answer TTL, or the RFC 2308 negative TTL."""
+        if self.records:
+            return min(r.ttl for r in self.records)
+        for rec in self.authority:
+            if isinstance(rec.value, SOA):
+                return min(rec.ttl, rec.value.minimum)
+        return None
+
+
+def encode_name(name: str) -> bytes:
+    name = name.strip().rstrip(".")
+    if not name:
+        return b"\x00"
+    out = bytearray()
+    for label in name.split("."):
+        try:
+            raw = label.encode("ascii") if label.isascii() else label.encode("idna")
+        except UnicodeError as exc:
+            raise DnsError(f"invalid label in {name!r}: {exc}") from None
+        if not raw or len(raw) > 63:
+            raise DnsError(f"invalid label in {name!r}")
+        out.append(len(raw))
+        out += raw
+    out.append(0)
+    if len(out) > 255:
+        raise DnsError(f"name too long: {name!r}")
+    return bytes(out)
+
+
+def _decode_label(raw: bytes) -> str:
+    chars = []
+    for b in raw:
+        if b == 0x2E or b == 0x5C:
+            chars.append("\\" + chr(b))
+        elif 0x21 <= b < 0x7F:
+            chars.append(chr(b))
+        else:
+            chars.append(f"\\{b:03d}")
+    return "".join(chars)
+
+
+def decode_name(msg: bytes, offset: int) -> tuple[str, int]:
+    """Read a possibly compressed name; returns (name, offset after it)."""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(msg):
+            raise DnsError("truncated name")
+        length = msg[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(msg):
+                raise DnsError("truncated pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | msg[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DnsError("compression loop")
+            continue
+        if length == 0:
+            offset += 1
+            break
+        labels.append(_decode_label(msg[offset + 1 : offset + 1 + length]))
+        offset += 1 + length
+    return ".".join(labels).lower(), end if end is not None else offset
+
+
+def build_query(qid: int, name: str, rtype: str, recursion: bool = True, edns: bool = True) -> bytes:
+    code = RR_TYPES.get(rtype.upper())
+    if code is None:
+        raise DnsError(f"unsupported record type {rtype!r}")
+    flags = 0x0100 if recursion else 0
+    header = struct.pack("!HHHHHH", qid, flags, 1, 0, 0, 1 if edns else 0)
+    msg = header + encode_name(name) + struct.pack("!HH", code, CLASS_IN)
+    if edns:
+        msg += b"\x00" + struct.pack("!HHIH", RR_TYPES["OPT"], EDNS_PAYLOAD, 0, 0)
+    return msg
+
+
+_MALFORMED = (struct.error, IndexError, ValueError)
+
+
+def _parse_rdata(msg: bytes, rtype: str, start: int, length: int) -> Any:
+    try:
+        return _rdata(msg, rtype, start, length)
+    except _MALFORMED as exc:
+        raise DnsError(f"malformed {rtype} rdata: {exc}") from None
+
+
+def _rdata(msg: bytes, rtype: str, start: int, length: int) -> Any:
+    rdata = msg[start : start + length]
+    if rtype == "A" and length == 4:
+        return socket.inet_ntop(socket.AF_INET, rdata)
+    if rtype == "AAAA" and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype in ("NS", "CNAME", "PTR"):
+        return decode_name(msg, start)[0]
+    if rtype == "MX":
+        return MX(struct.unpack("!H", rdata[:2])[0], decode_name(msg, start + 2)[0])
+    if rtype == "SRV":
+        prio, weight, port = struct.unpack("!HHH", rdata[:6])
+        return SRV(prio, weight, port, decode_name(msg, start + 6)[0])
+    if rtype == "SOA":
+        mname, off = decode_name(msg, start)
+        rname, off = decode_name(msg, off)
+        return SOA(mname, rname, *struct.unpack("!IIIII", msg[off : off + 20]))
+    if rtype == "TXT":
+        parts = []
+        i = 0
+        while i < length:
+            n = rdata[i]
+            parts.append(rdata[i + 1 : i + 1 + n].decode("utf-8", errors="replace"))
+            i += 1 + n
+        return tuple(parts)
+    if rtype == "CAA" and length >= 2:
+        tag_len = rdata[1]
+        tag = rdata[2 : 2 + tag_len].decode("ascii", errors="replace")
+        return CAA(rdata[0], tag, rdata[2 + tag_len :].decode("utf-8", errors="replace"))
+    return bytes(rdata)
+
+
+def parse_response(msg: bytes) -> tuple[int, int, str, str, list[Record], list[Record]]:
+    """Parse a response into (id, flags, qname, qtype, answers, authority); DnsError if malformed."""
+    try:
+        return _parse_response(msg)
+    except _MALFORMED as exc:
+        raise DnsError(f"malformed response: {exc}") from None
+
+
+def _parse_response(msg: bytes) -> tuple[int, int, str, str, list[Record], list[Record]]:
+    if len(msg) < 12:
+        raise DnsError("short response")
+    qid, flags, qd, an, ns, _ar = struct.unpack("!HHHHHH", msg[:12])
+    offset = 12
+    qname, qtype = "", ""
+    for _ in range(qd):
+        qname, offset = decode_name(msg, offset)
+        code, _cls = struct.unpack("!HH", msg[offset : offset + 4])
+        qtype = RR_NAMES.get(code, str(code))
+        offset += 4
+
+    sections: list[list[Record]] = [[], []]
+    for idx, count in enumerate((an, ns)):
+        for _ in range(count):
+            rname, offset = decode_name(msg, offset)
+            code, _cls, ttl, rdlen = struct.unpack("!HHIH", msg[offset : offset + 10])
+            offset += 10
+            if offset + rdlen > len(msg):
+                raise DnsError("truncated record")
+            rtype = RR_NAMES.get(code, str(code))
+            sections[idx].append(Record(rname, rtype, ttl, _parse_rdata(msg, rtype, offset, rdlen)))
+            offset += rdlen
+    return qid, flags, qname, qtype, sections[0], sections[1]
+
+
+def parse_server(value: str, port: int = 53) -> tuple[str, int]:
+    """Accept ``1.2.3.4``, ``1.2.3.4:5353``, ``::1``, ``[::1]:5353`` or ``host[:port]``.
+
+    Replies are matched on their source address, so a hostname is resolved
+    here, once, through the system resolver, and the address is normalised.
+    Raises ValueError for a bad port or a name that does not resolve.
+    """
+    value = value.strip()
+    if value.startswith("["):
+        host, _, rest = value[1:].partition("]")
+        p = rest[1:] if rest.startswith(":") else ""
+    elif value.count(":") == 1:
+        host, _, p = value.partition(":")
+    else:
+        host, p = value, ""
+    if p:
+        if not p.isdigit() or not 0 < int(p) < 65536:
+            raise ValueError(f"nameserver {value!r}: bad port {p!r}")
+        port = int(p)
+    if not host:
+        raise ValueError(f"nameserver {value!r}: no address")
+    try:
+        return str(ipaddress.ip_address(host.split("%")[0])), port
+    except ValueError:
+        pass
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise ValueError(f"nameserver {value!r}: cannot resolve {host}: {exc}") from None
+    # Prefer IPv4, matching how most resolv.conf setups reach a named server.
+    infos.sort(key=lambda info: info[0] != socket.AF_INET)
+    return infos[0][4][0], port
+
+
+def system_nameservers(path: Path = RESOLV_CONF) -> list[str]:
+    servers = []
+    try:
+        for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == "nameserver":
+                servers.append(parts[1].split("%")[0])
+    except OSError:
+        pass
+    return servers
+
+
+class _Pending:
+    __slots__ = ("server", "qname", "qtype", "event", "response")
+
+    def __init__(self, server: tuple[str, int], qname: str, qtype: str) -> None:
+        self.server = server
+        self.qname = qname
+        self.qtype = qtype
+        self.event = threading.Event()
+        self.response: bytes | None = None
+
+
+class _UdpTransport:
+    """One UDP socket shared by all queries of an address family."""
+
+    def __init__(self, family: int) -> None:
+        self.family = family
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.lock = threading.Lock()
+        self.pending: dict[int, _Pending] = {}
+        self.closed = False
+        self.thread = threading.Thread(target=self._receive_loop, name="dns-udp-recv", daemon=True)
+        self.thread.start()
+
+    def _receive_loop(self) -> None:
+        while not self.closed:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            try:
+                self._deliver(data, addr)
+            except Exception:
+                continue  # drop anything unparseable; this thread serves every query of the family
+
+    def _deliver(self, data: bytes, addr: Any) -> None:
+        if len(data) < 12:
+            return
+        qid = struct.unpack("!H", data[:2])[0]
+        with self.lock:
+            waiter = self.pending.get(qid)
+        if waiter is None or (addr[0], addr[1]) != waiter.server:
+            return
+        _, _, qname, qtype, _, _ = parse_response(data)
+        if qname != waiter.qname or qtype != waiter.qtype:
+            return
+        waiter.response = data
+        waiter.event.set()
+
+    def exchange(self, name: str, rtype: str, server: tuple[str, int], timeout: float, recursion: bool) -> bytes | None:
+        qname = name.strip().rstrip(".").lower()
+        waiter = _Pending(server, qname, rtype.upper())
+        with self.lock:
+            qid = random.getrandbits(16)
+            while qid in self.pending:
+                qid = random.getrandbits(16)
+            self.pending[qid] = waiter
+        try:
+            self.sock.sendto(build_query(qid, name, rtype, recursion), server)
+            if not waiter.event.wait(timeout):
+                return None
+            return waiter.response
+        finally:
+            with self.lock:
+                self.pending.pop(qid, None)
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise DnsError("tcp connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def tcp_exchange(name: str, rtype: str, server: tuple[str, int], timeout: float, recursion: bool = True) -> bytes:
+    qid = random.getrandbits(16)
+    msg = build_query(qid, name, rtype, recursion)
+    try:
+        with socket.create_connection(server, timeout=timeout) as sock:
+            sock.sendall(struct.pack("!H", len(msg)) + msg)
+            size = struct.unpack("!H", _recv_exact(sock, 2))[0]
+            data = _recv_exact(sock, size)
+    except OSError as exc:
+        raise DnsError(f"tcp {server[0]}: {exc}") from exc
+    if struct.unpack("!H", data[:2])[0] != qid:
+        raise DnsError("tcp response id mismatch")
+    return data
+
+
+class Resolver:
+    """Thread-safe stub resolver over shared UDP sockets with TCP fallback."""
+
+    def __init__(
+        self,
+        nameservers: list[str] | None = None,
+        timeout: float = 2.0,
+        tries: int = 2,
+        port: int = 53,
+        policy: retry.RetryPolicy | None = None,
+    ) -> None:
+        servers = system_nameservers() if nameservers is None else nameservers
+        self.nameservers = [parse_server(s, port) for s in servers]
+        self.timeout = timeout
+        self.tries = tries
+        self.policy = policy if policy is not None else retry.current()
+        self._transports: dict[int, _UdpTransport] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def direct(cls, timeout: float = 2.0, tries: int = 2, policy: retry.RetryPolicy | None = None) -> "Resolver":
+        """A resolver with no default servers, for queries sent to explicit ``servers=`` only.
+
+        A query that omits ``servers`` raises DnsError rather than going to
+        a recursive resolver by accident.
+        """
+        return cls([], timeout=timeout, tries=tries, policy=policy)
+
+    def _transport(self, host: str) -> _UdpTransport:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        with self._lock:
+            tr = self._transports.get(family)
+            if tr is None:
+                try:
+                    tr = _UdpTransport(family)
+                except OSError as exc:
+                    raise DnsError(f"udp socket: {exc}") from exc
+                self._transports[family] = tr
+            return tr
+
+    def query(
+        self,
+        name: str,
+        rtype: str,
+        *,
+        servers: list[tuple[str, int]] | None = None,
+        timeout: float | None = None,
+        tries: int | None = None,
+        recursion: bool = True,
+    ) -> Answer:
+        """Resolve one (name, type); raises DnsTimeout/DnsError when no server answers."""
+        targets = self.nameservers if servers is None else servers
+        if not targets:
+            raise DnsError("no nameservers configured" if servers is None else "empty server list")
+        rtype = rtype.upper()
+        timeout = self.timeout if timeout is None else timeout
+        policy = self.policy
+        last_err: Exception | None = None
+        skipped: list[str] = []
+        stopped = ""
+
+        for attempt in range(max(1, tries if tries is not None else self.tries)):
+            # Failing over between servers is free; another pass over them is a retry.
+            if attempt == 0:
+                policy.budget.deposit()
+            elif not policy.budget.withdraw():
+                stopped = "retry budget exhausted"
+                break
+            attempted = False
+            for server in targets:
+                left = retry.remaining()
+                if left is not None and left <= retry.MIN_ATTEMPT_SECONDS:
+                    stopped = "domain time budget exhausted"
+                    break
+                upstream = f"dns:{server[0]}:{server[1]}"
+                if not policy.allow(upstream):
+                    skipped.append(upstream)
+                    continue
+                attempted = True
+                wait = policy.timeout_for(upstream, timeout)
+                started = time.monotonic()
+                try:
+                    data = self._transport(server[0]).exchange(name, rtype, server, wait, recursion)
+                except OSError as exc:
+                    policy.record(upstream, time.monotonic() - started, False)
+                    last_err = DnsError(f"udp {server[0]}: {exc}")
+                    continue
+                if data is None:
+                    policy.record(upstream, time.monotonic() - started, False, wait)
+                    continue
+                policy.record(upstream, time.monotonic() - started, True)
+                flags = struct.unpack("!H", data[2:4])[0]
+                if flags & 0x0200:
+                    try:
+                        data = tcp_exchange(name, rtype, server, timeout, recursion)
+                    except DnsError as exc:
+                        last_err = exc
+                        continue
+                _, flags, _, _, answers, authority = parse_response(data)
+                rcode = RCODES.get(flags & 0x000F, str(flags & 0x000F))
+                if rcode in ("SERVFAIL", "REFUSED") and server != targets[-1]:
+                    continue
+                return Answer(name.strip().rstrip(".").lower(), rtype, rcode, answers, authority, server[0], bool(flags & 0x0400))
+            if not attempted and not stopped:
+                # Every server is behind an open circuit: fail fast rather than spend retries.
+                stopped = f"circuit open for {', '.join(sorted(set(skipped)))}"
+            if stopped:
+                break
+
+        if last_err is not None and not isinstance(last_err, DnsTimeout):
+            raise last_err
+        if stopped:
+            raise DnsTimeout(f"{stopped} ({name} {rtype})")
+        raise DnsTimeout(f"no response for {name} {rtype}")
+
+    def close(self) -> None:
+        with self._lock:
+            for tr in self._transports.values():
+                tr.close()
+            self._transports.clear()
@@ -0,0 +1,339 @@
+"""Shared retry policy: adaptive timeouts, retry budgets and circuit breakers.
+
+- ``CircuitBreaker`` opens after consecutive failures of one upstream and
+  fails calls fast until its cool-down passes, then lets a single probe
+  through; each failed probe doubles the cool-down
+- ``RetryBudget`` caps retries at a fraction of first attempts across the
+  whole run, so a failing upstream is not hit with extra load
+- adaptive timeouts follow the observed p99 latency of each upstream, kept
+  between a floor and the timeout the client was configured with
+- ``domain_budget`` sets a per-domain deadline (a context variable) that
+  shortens timeouts and stops retrying once it runs out
+
+Upstream keys are "<kind>:<host>", e.g. "dns:9.9.9.9:53" or "rdap:rdap.org".
+A client drives one logical request through a ``Call``::
+
+    call = policy.call("rdap:" + host, 6.0)
+    while call.attempt():
+        try:
+            payload = fetch(timeout=call.timeout)
+        except OSError as exc:
+            call.failure(str(exc))
+            continue
+        call.success()
+        return payload
+    return None, call.reason
+"""
+
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_RETRY_RATIO = 0.2
+DEFAULT_RETRY_RESERVE = 50
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+TIMEOUT_FLOOR = 0.25
+TIMEOUT_MULTIPLIER = 3.0
+LATENCY_WINDOW = 256
+MIN_SAMPLES = 20
+MIN_ATTEMPT_SECONDS = 0.05
+
+_DEADLINE: contextvars.ContextVar[float | None] = contextvars.ContextVar("domain_deadline", default=None)
+
+
+@contextmanager
+def domain_budget(seconds: float | None) -> Iterator[None]:
+    """Bound all calls made in this context (and contexts copied from it) to ``seconds``."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current domain budget, or None when unbounded."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` consecutive failures -> half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN) -> None:
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_started: float | None = None
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self.open_until:
+                self.state = self.HALF_OPEN
+                self.probe_started = None
+            # One probe at a time; a probe whose caller vanished is replaced after a cool-down.
+            if self.state == self.HALF_OPEN and (self.probe_started is None or now - self.probe_started > self.cooldown):
+                self.probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self.cooldown = self.base_cooldown
+                self.probe_started = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.open_until = time.monotonic() + self.cooldown
+        self.probe_started = None
+        self.trips += 1
+
+    @property
+    def closed(self) -> bool:
+        return self.state == self.CLOSED
+
+
+class RetryBudget:
+    """Token budget: every first attempt earns ``ratio`` of a retry, up to ``reserve`` banked."""
+
+    def __init__(self, ratio: float = DEFAULT_RETRY_RATIO, reserve: int = DEFAULT_RETRY_RESERVE) -> None:
+        self.ratio = max(0.0, ratio)
+        self.reserve = max(0, reserve)
+        self.tokens = float(self.reserve)
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.tokens = min(float(self.reserve), self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.retries += 1
+                return True
+            self.rejected += 1
+            return False
+
+
+class LatencyWindow:
+    """Recent latencies of one upstream, for percentile-based timeouts."""
+
+    def __init__(self, size: int = LATENCY_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._p99: float | None = None
+        self._stale = 0
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._stale += 1
+
+    def p99(self) -> float | None:
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            # Re-sorting the window on every call is wasteful; refresh every few samples.
+            if self._p99 is None or self._stale >= 8:
+                ordered = sorted(self._samples)
+                self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+                self._stale = 0
+            return self._p99
+
+
+class RetryPolicy:
+    """Retry decisions shared by every network client of a run."""
+
+    def __init__(
+        self,
+        attempts: int = DEFAULT_ATTEMPTS,
+        retry_ratio: float = DEFAULT_RETRY_RATIO,
+        retry_reserve: int = DEFAULT_RETRY_RESERVE,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        adaptive: bool = True,
+    ) -> None:
+        self.attempts = max(1, attempts)
+        self.budget = RetryBudget(retry_ratio, retry_reserve)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.adaptive = adaptive
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._windows: dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        with self._lock:
+            b = self._breakers.get(upstream)
+            if b is None:
+                b = self._breakers[upstream] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return b
+
+    def window(self, upstream: str) -> LatencyWindow:
+        with self._lock:
+            w = self._windows.get(upstream)
+            if w is None:
+                w = self._windows[upstream] = LatencyWindow()
+            return w
+
+    def allow(self, upstream: str) -> bool:
+        return self.breaker(upstream).allow()
+
+    def timeout_for(self, upstream: str, default: float) -> float:
+        """``default`` tightened to a multiple of the upstream's p99, then capped by the domain budget."""
+        timeout = default
+        if self.adaptive and self.breaker(upstream).closed:
+            p99 = self.window(upstream).p99()
+            if p99 is not None:
+                timeout = min(default, max(TIMEOUT_FLOOR, p99 * TIMEOUT_MULTIPLIER))
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, max(left, 0.0))
+        return timeout
+
+    def record(self, upstream: str, seconds: float, ok: bool, timeout: float | None = None) -> None:
+        """Report one attempt. Timed-out attempts feed the latency window so slow upstreams widen their timeout."""
+        breaker = self.breaker(upstream)
+        if ok:
+            breaker.success()
+            self.window(upstream).add(seconds)
+            return
+        breaker.failure()
+        if timeout is not None and seconds >= timeout * 0.9:
+            self.window(upstream).add(seconds)
+
+    def call(self, upstream: str, timeout: float, attempts: int | None = None) -> "Call":
+        return Call(self, upstream, timeout, attempts if attempts is not None else self.attempts)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "retry_budget": {
+                "requests": self.budget.requests,
+                "retries": self.budget.retries,
+                "rejected": self.budget.rejected,
+            },
+            "circuits": {
+                name: {"state": b.state, "trips": b.trips, "rejected": b.rejected}
+                for name, b in sorted(breakers.items())
+                if b.trips or not b.closed
+            },
+        }
+
+
+class Call:
+    """Attempt loop for one logical request under a ``RetryPolicy``."""
+
+    def __init__(self, policy: RetryPolicy, upstream: str, timeout: float, attempts: int) -> None:
+        self.policy = policy
+        self.upstream = upstream
+        self.default_timeout = timeout
+        self.max_attempts = max(1, attempts)
+        self.attempts = 0
+        self.timeout = timeout
+        self.reason = ""
+        self._started = 0.0
+        self._open = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def _stop(self, cause: str) -> bool:
+        self.reason = f"{cause}; last error: {self.reason}" if self.reason else cause
+        return False
+
+    def attempt(self) -> bool:
+        """Start the next attempt, sleeping a backoff first; False when the call should give up."""
+        policy = self.policy
+        if self.attempts >= self.max_attempts:
+            return False
+        if self.attempts == 0:
+            policy.budget.deposit()
+        else:
+            if not policy.budget.withdraw():
+                return self._stop("retry budget exhausted")
+            delay = 0.25 * self.attempts + random.random() * 0.2
+            left = remaining()
+            if left is not None and left <= delay + MIN_ATTEMPT_SECONDS:
+                return self._stop("domain time budget exhausted")
+            time.sleep(delay)
+        left = remaining()
+        if left is not None and left <= MIN_ATTEMPT_SECONDS:
+            return self._stop("domain time budget exhausted")
+        if not policy.allow(self.upstream):
+            return self._stop(f"circuit open for {self.upstream}")
+        self.timeout = policy.timeout_for(self.upstream, self.default_timeout)
+        self.attempts += 1
+        self._started = time.monotonic()
+        self._open = True
+        return True
+
+    def success(self) -> None:
+        if self._open:
+            self._open = False
+            self.policy.record(self.upstream, time.monotonic() - self._started, True)
+
+    def failure(self, error: str, upstream_fault: bool = True) -> None:
+        """Record a failed attempt; ``upstream_fault=False`` (e.g. HTTP 429) leaves the breaker alone."""
+        self.reason = error
+        if self._open:
+            self._open = False
+            if upstream_fault:
+                self.policy.record(self.upstream, time.monotonic() - self._started, False, self.timeout)
+
+
+_POLICY = RetryPolicy()
+
+
+def configure(policy: RetryPolicy) -> None:
+    global _POLICY
+    _POLICY = policy
+
+
+def current() -> RetryPolicy:
+    return _POLICY
@@ -0,0 +1,169 @@
+"""Incremental re-check scheduling for recurring monitor runs.
+
+Every (domain, signal) result is stored with the time it next falls due:
+- DNS-backed signals are due when the shortest TTL behind them runs out,
+  bounded by the --min-recheck/--max-recheck window
+- expiry is due sooner the closer the domain gets to a status threshold
+  (30 days out, then expiry itself), at most every 30 days
+- failed lookups are never stored, so they are retried on the next run
+
+A run re-checks only what is due and reuses the stored result for the rest.
+Rows also carry a digest of the policy/selector config, so editing either
+file makes every stored result due again.
+"""
+
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from dnsanalysis.history import transient
+
+DEFAULT_MIN_RECHECK = 300
+DEFAULT_MAX_RECHECK = 86400
+EXPIRY_WARN_DAYS = 30
+EXPIRY_NEAR_RECHECK = 86400
+EXPIRY_EXPIRED_RECHECK = 6 * 3600
+EXPIRY_MAX_RECHECK = 30 * 86400
+_COMMIT_EVERY = 200
+
+T = TypeVar("T")
+
+
+class TtlCollector:
+    """Tracks the smallest DNS TTL seen while computing one signal."""
+
+    __slots__ = ("ttl",)
+
+    def __init__(self) -> None:
+        self.ttl: int | None = None
+
+    def add(self, ttl: int | None) -> None:
+        if ttl is not None and (self.ttl is None or ttl < self.ttl):
+            self.ttl = ttl
+
+
+_COLLECTOR: contextvars.ContextVar[TtlCollector | None] = contextvars.ContextVar("ttl_collector", default=None)
+
+
+def note_ttl(ttl: int | None) -> None:
+    """Report the TTL of an answer to the signal currently being computed, if any."""
+    collector = _COLLECTOR.get()
+    if collector is not None:
+        collector.add(ttl)
+
+
+def collect_ttl(fn: Callable[[], T]) -> tuple[T, int | None]:
+    """Run ``fn`` and return its result with the minimum TTL it reported.
+
+    Work that ``fn`` hands to other threads must run under
+    ``contextvars.copy_context()`` for its TTLs to be counted.
+    """
+    collector = TtlCollector()
+    token = _COLLECTOR.set(collector)
+    try:
+        return fn(), collector.ttl
+    finally:
+        _COLLECTOR.reset(token)
+
+
+def expiry_recheck_after(days: int | None, min_recheck: float = DEFAULT_MIN_RECHECK) -> float:
+    if days is None:
+        return min_recheck
+    if days < 0:
+        return EXPIRY_EXPIRED_RECHECK
+    if days <= EXPIRY_WARN_DAYS:
+        return EXPIRY_NEAR_RECHECK
+    # Come back before the domain crosses into the warning window.
+    return min(max(EXPIRY_NEAR_RECHECK, (days - EXPIRY_WARN_DAYS) * 86400 / 2), EXPIRY_MAX_RECHECK)
+
+
+class StateStore:
+    """SQLite-backed next-due times and last results per (domain, signal)."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        config_digest: str = "",
+        min_recheck: float = DEFAULT_MIN_RECHECK,
+        max_recheck: float = DEFAULT_MAX_RECHECK,
+    ) -> None:
+        self.path = Path(path)
+        self.config_digest = config_digest
+        self.min_recheck = min_recheck
+        self.max_recheck = max_recheck
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signal_state ("
+            "domain TEXT NOT NULL, signal TEXT NOT NULL, due REAL NOT NULL, checked REAL NOT NULL, "
+            "config TEXT NOT NULL, result TEXT NOT NULL, PRIMARY KEY (domain, signal))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signal_state_due ON signal_state (due)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.reused = 0
+        self.rechecked = 0
+
+    def fresh(self, domain: str, now: float | None = None) -> dict[str, tuple[dict[str, Any], float, float]]:
+        """Stored results for ``domain`` that are not yet due: signal -> (result, checked, due)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT signal, result, checked, due FROM signal_state WHERE domain = ? AND due > ? AND config = ?",
+                (domain, now, self.config_digest),
+            ).fetchall()
+        return {signal: (json.loads(result), checked, due) for signal, result, checked, due in rows}
+
+    def due_in(self, signal: str, result: dict[str, Any], ttl: int | None) -> float | None:
+        """Seconds until ``result`` should be re-checked; None means do not store it."""
+        if transient(result):
+            return None
+        if signal == "expiry":
+            # Registration data has its own schedule; --max-recheck only bounds DNS TTLs.
+            return max(expiry_recheck_after((result.get("details") or {}).get("days"), self.min_recheck), self.min_recheck)
+        after = self.min_recheck if ttl is None else ttl
+        return min(max(after, self.min_recheck), self.max_recheck)
+
+    def record(self, domain: str, signal: str, result: dict[str, Any], ttl: int | None, now: float | None = None) -> float | None:
+        """Store a fresh result and return its due time (None if it was not stored)."""
+        now = time.time() if now is None else now
+        after = self.due_in(signal, result, ttl)
+        with self._lock:
+            self.rechecked += 1
+            if after is None:
+                self._conn.execute("DELETE FROM signal_state WHERE domain = ? AND signal = ?", (domain, signal))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signal_state VALUES (?, ?, ?, ?, ?, ?)",
+                    (domain, signal, now + after, now, self.config_digest, json.dumps(result, separators=(",", ":"))),
+                )
+            self._pending += 1
+            if self._pending >= _COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+        return None if after is None else now + after
+
+    def note_reused(self, count: int) -> None:
+        with self._lock:
+            self.reused += count
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.reused + self.rechecked
+            return {
+                "store": str(self.path),
+                "signals_rechecked": self.rechecked,
+                "signals_reused": self.reused,
+                "reuse_ratio": round(self.reused / total, 4) if total else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
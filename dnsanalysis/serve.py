@@ -0,0 +1,176 @@
+"""Local query API that keeps a tool's lookup state warm between requests.
+
+- ``QueryServer`` answers ``GET /<route>?key=value`` with JSON (or plain
+  text for ``format=text``) over a Unix socket (an address containing
+  ``/``) or localhost TCP (``host:port``), one thread per connection, with
+  HTTP/1.1 keep-alive
+- concurrent requests with the same route and parameters are coalesced
+  onto one execution, so a burst of alerts for one domain costs one check
+- ``GET /health`` and ``GET /stats`` are always available
+- the matching client lives in ``dnsanalysis.client``
+
+The socket is created mode 0600: anyone who can reach it can make the
+daemon issue DNS, RDAP, WHOIS and HTTP requests.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+from dnsanalysis.client import host_port, is_unix, query
+from dnsanalysis.planner import SingleFlight
+
+# Handlers take the query parameters and return a JSON-serialisable payload,
+# or a str when the client asked for format=text.
+Handler = Callable[[dict[str, str]], Any]
+
+
+LISTEN_BACKLOG = 128  # SOAR bursts open many connections at once; the socketserver default is 5
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost")
+
+
+def is_local_address(address: str) -> bool:
+    """A Unix socket path, or host:port on a loopback address."""
+    if is_unix(address):
+        return True
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1") in LOOPBACK_HOSTS and port.isdigit()
+
+
+class BadRequest(ValueError):
+    """Raised by a handler for missing or invalid parameters (HTTP 400)."""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "dns-analysis"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        parts = urlsplit(self.path)
+        route = parts.path.strip("/")
+        params = dict(parse_qsl(parts.query))
+        status, body, ctype = self.server.app.dispatch(route, params)  # type: ignore[attr-defined]
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+        if self.server.app.verbose:  # type: ignore[attr-defined]
+            sys.stderr.write(f"{time.strftime('%H:%M:%S')} {format % args}\n")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def get_request(self) -> tuple[socket.socket, Any]:
+        conn, _ = super().get_request()
+        return conn, ("local", 0)  # http.server expects a (host, port) client address
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class QueryServer:
+    """Route table plus request coalescing behind a threaded HTTP server."""
+
+    def __init__(self, routes: dict[str, Handler], address: str, stats: Callable[[], dict[str, Any]] | None = None, verbose: bool = False) -> None:
+        self.routes = dict(routes)
+        self.address = address
+        self.extra_stats = stats
+        self.verbose = verbose
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+        self._server: socketserver.BaseServer | None = None
+
+    def dispatch(self, route: str, params: dict[str, str]) -> tuple[int, str, str]:
+        """(HTTP status, body, content type) for one request."""
+        with self._lock:
+            self.requests += 1
+        if route == "health":
+            return 200, json.dumps({"status": "ok", "routes": sorted(self.routes)}), "application/json"
+        if route == "stats":
+            return 200, json.dumps(self.stats()), "application/json"
+        handler = self.routes.get(route)
+        if handler is None:
+            return self._error(404, f"unknown route {route!r}; try /health")
+        key = (route, tuple(sorted(params.items())))
+        try:
+            payload, _ = self.flight.do(key, lambda: handler(params))
+        except BadRequest as exc:
+            return self._error(400, str(exc))
+        except Exception as exc:
+            return self._error(500, f"{type(exc).__name__}: {str(exc)[:200]}")
+        if isinstance(payload, str):
+            return 200, payload, "text/plain; charset=utf-8"
+        return 200, json.dumps(payload), "application/json"
+
+    def _error(self, status: int, message: str) -> tuple[int, str, str]:
+        with self._lock:
+            self.errors += 1
+        return status, json.dumps({"error": message}), "application/json"
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {
+                "address": self.address,
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+            }
+        out["coalescing"] = self.flight.stats()
+        if self.extra_stats is not None:
+            out.update(self.extra_stats())
+        return out
+
+    def bind(self) -> None:
+        if is_unix(self.address):
+            if os.path.exists(self.address):
+                try:
+                    query(self.address, "health", timeout=1.0)
+                except OSError:
+                    os.unlink(self.address)  # stale socket left by a daemon that died
+                else:
+                    raise OSError(f"a server is already listening on {self.address}")
+            old = os.umask(0o177)
+            try:
+                server: socketserver.BaseServer = _UnixHTTPServer(self.address, _Handler)
+            finally:
+                os.umask(old)
+        else:
+            server = _TCPHTTPServer(host_port(self.address), _Handler)
+        server.app = self  # type: ignore[attr-defined]
+        self._server = server
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            self.bind()
+        assert self._server is not None
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if is_unix(self.address):
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,331 @@
+"""Recursive SPF (RFC 7208) expansion with a batch-wide memo of include targets.
+
+``SpfEvaluator.evaluate`` walks a domain's record through ``include:`` and
+``redirect=`` and reports:
+- DNS-querying terms against the 10-lookup limit (include, a, mx, ptr,
+  exists, redirect) and void lookups against the limit of 2
+- the IPv4/IPv6 ranges authorised by pass-qualified terms, with ``a``/``mx``
+  resolved to addresses
+- permerror/temperror conditions (missing or duplicate records, loops,
+  bad syntax, limits exceeded, DNS failures)
+
+Expanded include/redirect targets are memoized per evaluator until their
+shortest DNS TTL runs out, so a batch resolves ``_spf.google.com`` once
+rather than once per domain. Terms that use macros are listed but not
+expanded, because they need a sender.
+"""
+
+import ipaddress
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable
+
+from dnsanalysis.schedule import collect_ttl, note_ttl
+
+LOOKUP_LIMIT = 10
+VOID_LIMIT = 2
+MX_LIMIT = 10
+MAX_DEPTH = 10
+DEFAULT_MEMO_TTL = 3600
+DEFAULT_MEMO_ENTRIES = 50_000
+
+# (rtype, name) -> (records, source, rcode); the monitor's dns_lookup.
+Lookup = Callable[[str, str], tuple[list[str], str, str | None]]
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+_TXT_CHUNK = re.compile(r'"((?:[^"\\]|\\.)*)"')
+_ESCAPE = re.compile(r"\\(\d{3}|.)")
+_MECHANISMS = ("all", "include", "a", "mx", "ptr", "ip4", "ip6", "exists")
+_LOOKUP_TERMS = ("include", "a", "mx", "ptr", "exists")
+
+
+def txt_value(short: str) -> str:
+    """Join the character-strings of a ``dig +short`` TXT value (RFC 7208 3.3: no separator)."""
+    chunks = _TXT_CHUNK.findall(short)
+    if not chunks:
+        return short.strip()
+    return "".join(_ESCAPE.sub(lambda m: chr(int(m.group(1))) if m.group(1).isdigit() else m.group(1), c) for c in chunks)
+
+
+def spf_records(txt: list[str]) -> list[str]:
+    out = []
+    for raw in txt:
+        value = txt_value(raw)
+        if value.lower() == "v=spf1" or value.lower().startswith("v=spf1 "):
+            out.append(value)
+    return out
+
+
+@dataclass(frozen=True)
+class SpfNode:
+    """Expansion of one SPF record, including everything below it."""
+
+    name: str
+    record: str | None
+    lookups: int = 0
+    void_lookups: int = 0
+    networks: tuple[Network, ...] = ()
+    includes: tuple[str, ...] = ()
+    all: str | None = None
+    error: str | None = None
+    unresolved: tuple[str, ...] = ()
+    ttl: int | None = None
+
+
+def _failed(source: str, rcode: str | None) -> bool:
+    """True when a lookup gave no authoritative answer (RFC 7208 temperror)."""
+    return source != "dns" or rcode not in (None, "NOERROR", "NXDOMAIN")
+
+
+def _split_term(term: str) -> tuple[str, str, str, str]:
+    """Return (qualifier, name, value, separator) for a mechanism or modifier."""
+    qualifier = "+"
+    if term[0] in "+-~?":
+        qualifier, term = term[0], term[1:]
+    m = re.match(r"^([a-zA-Z][a-zA-Z0-9_.-]*)([:=/]?)(.*)$", term)
+    if not m:
+        return qualifier, "", term, ""
+    return qualifier, m.group(1).lower(), m.group(3), m.group(2)
+
+
+def _cidr(value: str, default: str) -> tuple[str, int | None, int | None]:
+    """Split ``domain/24//64`` into (domain, v4 prefix, v6 prefix)."""
+    v4 = v6 = None
+    if "//" in value:
+        value, tail = value.split("//", 1)
+        v6 = int(tail) if tail.isdigit() else -1
+    if "/" in value:
+        value, tail = value.split("/", 1)
+        v4 = int(tail) if tail.isdigit() else -1
+    return (value or default), v4, v6
+
+
+class SpfEvaluator:
+    """Thread-safe SPF expander sharing memoized include/redirect targets."""
+
+    def __init__(
+        self,
+        lookup: Lookup,
+        memo_ttl: int = DEFAULT_MEMO_TTL,
+        max_entries: int = DEFAULT_MEMO_ENTRIES,
+    ) -> None:
+        self.lookup = lookup
+        self.memo_ttl = memo_ttl
+        self.max_entries = max_entries
+        self._memo: OrderedDict[str, tuple[float, SpfNode]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"memo_hits": self.memo_hits, "memo_misses": self.memo_misses, "memo_entries": len(self._memo)}
+
+    def evaluate(self, domain: str, record: str) -> SpfNode:
+        """Expand ``record`` published at ``domain`` (the top level is not memoized)."""
+        return self._build(domain.lower().rstrip("."), record, (domain.lower().rstrip("."),))
+
+    def target(self, name: str, stack: tuple[str, ...] = ()) -> SpfNode:
+        """Expansion of the SPF record at an include/redirect target, memoized by name."""
+        name = name.lower().rstrip(".")
+        if name in stack:
+            return SpfNode(name, None, error=f"permerror: include loop via {name}")
+        if len(stack) > MAX_DEPTH:
+            return SpfNode(name, None, error=f"permerror: include depth over {MAX_DEPTH}")
+        now = time.time()
+        with self._lock:
+            hit = self._memo.get(name)
+            if hit is not None and hit[0] > now:
+                self._memo.move_to_end(name)
+                self.memo_hits += 1
+                node = hit[1]
+            else:
+                node = None
+                self.memo_misses += 1
+        if node is not None:
+            # Let the caller's TTL tracking see how long the shared answer stays valid.
+            note_ttl(max(0, int(hit[0] - now)))
+            return node
+
+        node, ttl = collect_ttl(lambda: self._fetch(name, stack + (name,)))
+        node = replace(node, ttl=ttl)
+        note_ttl(ttl)
+        # Loop/depth errors depend on the path taken, and DNS failures are transient.
+        if not (node.error and ("loop" in node.error or "depth" in node.error or node.error.startswith("temperror"))):
+            life = min(self.memo_ttl, ttl if ttl is not None else self.memo_ttl)
+            with self._lock:
+                self._memo[name] = (now + life, node)
+                self._memo.move_to_end(name)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return node
+
+    def _fetch(self, name: str, stack: tuple[str, ...]) -> SpfNode:
+        txt, source, rcode = self.lookup("TXT", name)
+        if _failed(source, rcode):
+            return SpfNode(name, None, error=f"temperror: TXT lookup for {name} failed")
+        records = spf_records(txt)
+        if not records:
+            void = 1 if (rcode == "NXDOMAIN" or not txt) else 0
+            return SpfNode(name, None, void_lookups=void, error=f"permerror: no SPF record at {name}")
+        if len(records) > 1:
+            return SpfNode(name, None, error=f"permerror: multiple SPF records at {name}")
+        return self._build(name, records[0], stack)
+
+    def _addresses(self, name: str, v4: int | None, v6: int | None) -> tuple[list[Network], bool, str | None]:
+        """Resolve A/AAAA for ``name``; returns (networks, void, error)."""
+        nets: list[Network] = []
+        answered = False
+        for rtype, prefix, width in (("A", v4, 32), ("AAAA", v6, 128)):
+            records, source, rcode = self.lookup(rtype, name)
+            if _failed(source, rcode):
+                return nets, False, f"temperror: {rtype} lookup for {name} failed"
+            for r in records:
+                try:
+                    addr = ipaddress.ip_address(r.strip())
+                except ValueError:
+                    continue
+                answered = True
+                nets.append(ipaddress.ip_network(f"{addr}/{width if prefix is None else prefix}", strict=False))
+        return nets, not answered, None
+
+    def _build(self, name: str, record: str, stack: tuple[str, ...]) -> SpfNode:
+        terms = record.split()[1:]
+        lookups = 0
+        void = 0
+        nets: list[Network] = []
+        includes: list[str] = []
+        unresolved: list[str] = []
+        all_q: str | None = None
+        redirect: str | None = None
+        error: str | None = None
+
+        def merge(child: SpfNode, qualifier: str) -> None:
+            nonlocal lookups, void
+            lookups += child.lookups
+            void += child.void_lookups
+            includes.append(child.name)
+            includes.extend(child.includes)
+            unresolved.extend(child.unresolved)
+            if qualifier == "+":
+                nets.extend(child.networks)
+
+        for term in terms:
+            qualifier, kind, value, sep = _split_term(term)
+            if sep == "=" and kind not in _MECHANISMS:
+                if kind == "redirect":
+                    if redirect is not None:
+                        error = "permerror: duplicate redirect"
+                        break
+                    redirect = value
+                continue
+            if kind not in _MECHANISMS:
+                error = f"permerror: unknown mechanism {term!r}"
+                break
+            if kind in _LOOKUP_TERMS:
+                lookups += 1
+            if kind == "all":
+                all_q = qualifier
+                break  # RFC 7208 5.1: terms after all are never reached
+            if kind in ("ip4", "ip6"):
+                try:
+                    net = ipaddress.ip_network(value, strict=False)
+                except ValueError:
+                    error = f"permerror: invalid {kind} {value!r}"
+                    break
+                if (kind == "ip4") != (net.version == 4):
+                    error = f"permerror: invalid {kind} {value!r}"
+                    break
+                if qualifier == "+":
+                    nets.append(net)
+                continue
+            if "%" in value:
+                unresolved.append(term)
+                continue
+            if kind == "include":
+                if not value:
+                    error = "permerror: include without domain"
+                    break
+                child = self.target(value, stack)
+                merge(child, qualifier)
+                if child.error:
+                    error = child.error
+                    break
+            elif kind in ("a", "mx"):
+                host, v4, v6 = _cidr(value if sep != "/" else "/" + value, name)
+                if (v4 is not None and not 0 <= v4 <= 32) or (v6 is not None and not 0 <= v6 <= 128):
+                    error = f"permerror: invalid prefix in {term!r}"
+                    break
+                if kind == "a":
+                    found, was_void, err = self._addresses(host, v4, v6)
+                else:
+                    found, was_void, err = self._mx(host, v4, v6)
+                if err:
+                    error = err
+                    break
+                void += was_void
+                if qualifier == "+":
+                    nets.extend(found)
+            elif kind == "exists":
+                records, source, rcode = self.lookup("A", value)
+                if _failed(source, rcode):
+                    error = f"temperror: A lookup for {value} failed"
+                    break
+                void += not records
+            # ptr is counted but never resolved (RFC 7208 5.5 discourages it).
+            if lookups > LOOKUP_LIMIT:
+                break
+
+        if error is None and redirect is not None and all_q is None:
+            lookups += 1
+            if "%" in redirect:
+                unresolved.append(f"redirect={redirect}")
+            else:
+                child = self.target(redirect, stack)
+                merge(child, "+")
+                all_q = child.all
+                error = child.error
+        if error is None and lookups > LOOKUP_LIMIT:
+            error = f"permerror: {lookups} DNS lookups (limit {LOOKUP_LIMIT})"
+        if error is None and void > VOID_LIMIT:
+            error = f"permerror: {void} void lookups (limit {VOID_LIMIT})"
+
+        return SpfNode(
+            name=name,
+            record=record,
+            lookups=lookups,
+            void_lookups=void,
+            networks=tuple(_collapse(nets)),
+            includes=tuple(dict.fromkeys(includes)),
+            all=all_q,
+            error=error,
+            unresolved=tuple(dict.fromkeys(unresolved)),
+        )
+
+    def _mx(self, host: str, v4: int | None, v6: int | None) -> tuple[list[Network], bool, str | None]:
+        records, source, rcode = self.lookup("MX", host)
+        if _failed(source, rcode):
+            return [], False, f"temperror: MX lookup for {host} failed"
+        exchanges = [r.split()[-1].rstrip(".") for r in records if r.split()]
+        if len(exchanges) > MX_LIMIT:
+            return [], False, f"permerror: {len(exchanges)} MX hosts for {host} (limit {MX_LIMIT})"
+        nets: list[Network] = []
+        for exchange in exchanges:
+            found, _, err = self._addresses(exchange, v4, v6)
+            if err:
+                return nets, False, err
+            nets.extend(found)
+        return nets, not exchanges, None
+
+
+def _collapse(nets: list[Network]) -> list[Network]:
+    v4 = [n for n in nets if n.version == 4]
+    v6 = [n for n in nets if n.version == 6]
+    return [*ipaddress.collapse_addresses(v4), *ipaddress.collapse_addresses(v6)]  # type: ignore[arg-type]
+
+
+def address_count(nets: tuple[Network, ...], version: int) -> int:
+    return sum(n.num_addresses for n in nets if n.version == version)
@@ -0,0 +1,156 @@
+"""Lazy input and bounded-memory deduplication for very large domain feeds.
+
+- ``iter_lines`` reads a file (or ``-`` for stdin) one line at a time
+- ``Deduper`` keeps an exact in-memory set for small inputs; past
+  ``memory_limit`` items it switches to a Bloom filter backed by an exact
+  on-disk SQLite set, which is only consulted when the filter says "maybe"
+- ``map_unordered`` runs a function over a lazy iterable on a worker pool
+  with a bounded number of items in flight, yielding in completion order
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Executor, as_completed, wait
+from typing import Callable, Iterable, Iterator, TextIO, TypeVar
+
+DEFAULT_MEMORY_LIMIT = 100_000
+DEFAULT_BLOOM_CAPACITY = 10_000_000
+DEFAULT_BLOOM_ERROR = 0.001
+_COMMIT_EVERY = 10_000
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def iter_lines(path: str, stdin: TextIO | None = None) -> Iterator[str]:
+    """Yield stripped, non-comment lines from ``path`` ("-" reads stdin)."""
+    if path == "-":
+        handle = stdin or sys.stdin
+        for ln in handle:
+            v = ln.strip()
+            if v and not v.startswith("#"):
+                yield v
+        return
+    with open(path, encoding="utf-8", errors="ignore") as handle:
+        for ln in handle:
+            v = ln.strip()
+            if v and not v.startswith("#"):
+                yield v
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest."""
+
+    def __init__(self, capacity: int = DEFAULT_BLOOM_CAPACITY, error_rate: float = DEFAULT_BLOOM_ERROR) -> None:
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class Deduper:
+    """Remembers seen items with memory bounded by ``memory_limit`` plus the Bloom filter."""
+
+    def __init__(
+        self,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        bloom_capacity: int = DEFAULT_BLOOM_CAPACITY,
+        spill_dir: str | None = None,
+    ) -> None:
+        self.memory_limit = memory_limit
+        self.bloom_capacity = bloom_capacity
+        self.spill_dir = spill_dir
+        self._seen: set[str] | None = set()
+        self._bloom: BloomFilter | None = None
+        self._db: sqlite3.Connection | None = None
+        self._db_path = ""
+        self._pending = 0
+
+    def _spill(self) -> None:
+        fd, self._db_path = tempfile.mkstemp(prefix="dns-analysis-seen-", suffix=".sqlite", dir=self.spill_dir)
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE seen (item TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._bloom = BloomFilter(self.bloom_capacity)
+        for item in self._seen or ():
+            self._bloom.add(item)
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((i,) for i in self._seen or ()))
+        self._db.commit()
+        self._seen = None
+
+    def add(self, item: str) -> bool:
+        """Record ``item``; returns True if it had not been seen before."""
+        if self._seen is not None:
+            if item in self._seen:
+                return False
+            self._seen.add(item)
+            if len(self._seen) > self.memory_limit:
+                self._spill()
+            return True
+
+        assert self._bloom is not None and self._db is not None
+        if item in self._bloom:
+            if self._db.execute("SELECT 1 FROM seen WHERE item = ?", (item,)).fetchone():
+                return False
+        self._bloom.add(item)
+        self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (item,))
+        self._pending += 1
+        if self._pending >= _COMMIT_EVERY:
+            self._db.commit()
+            self._pending = 0
+        return True
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            try:
+                os.unlink(self._db_path)
+            except OSError:
+                pass
+
+
+def unique(items: Iterable[str], deduper: Deduper | None = None) -> Iterator[str]:
+    """Yield each item once, in first-seen order."""
+    seen = deduper or Deduper()
+    try:
+        for item in items:
+            if seen.add(item):
+                yield item
+    finally:
+        if deduper is None:
+            seen.close()
+
+
+def map_unordered(pool: Executor, fn: Callable[[T], R], items: Iterable[T], in_flight: int) -> Iterator[R]:
+    """Yield ``fn(item)`` as each finishes, never holding more than ``in_flight`` pending items."""
+    in_flight = max(1, in_flight)
+    pending: set = set()
+    for item in items:
+        pending.add(pool.submit(fn, item))
+        if len(pending) >= in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(pending):
+        yield future.result()
@@ -0,0 +1,133 @@
+"""Concurrent subdomain sweeps with up-front wildcard detection.
+
+- before the sweep, a few random labels under the zone are resolved; any
+  addresses they return form the zone's wildcard profile
+- candidates whose addresses overlap the wildcard profile are dropped, since
+  they are indistinguishable from the wildcard and add no new host
+- AAAA is only asked for names whose A lookup was not NXDOMAIN, so the
+  (mostly nonexistent) candidates of a large wordlist cost one query each
+- at most ``concurrency`` names are in flight; hits stream back in
+  completion order. Query-rate limits belong to the ``lookup`` callable
+"""
+
+import re
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from dnsanalysis.ipranges import parse_ip
+from dnsanalysis.stream import map_unordered
+
+DEFAULT_WILDCARD_PROBES = 3
+_LABEL = re.compile(r"^[a-z0-9_](?:[a-z0-9_-]{0,62})(?:\.[a-z0-9_](?:[a-z0-9_-]{0,62}))*$")
+
+# (name, rtype) -> (rcode, records)
+Lookup = Callable[[str, str], tuple[str, list[str]]]
+
+
+@dataclass(frozen=True)
+class Wildcard:
+    ips: frozenset[str] = frozenset()
+    probes: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.ips)
+
+    def matches(self, ips: Iterable[str]) -> bool:
+        return bool(self.ips) and not self.ips.isdisjoint(ips)
+
+
+@dataclass
+class Hit:
+    name: str
+    ips: list[str]
+
+
+@dataclass
+class SweepStats:
+    candidates: int = 0
+    resolved: int = 0
+    nxdomain: int = 0
+    no_address: int = 0
+    wildcard_filtered: int = 0
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            setattr(self, key, getattr(self, key) + 1)
+
+    def as_dict(self) -> dict[str, int]:
+        return {k: v for k, v in self.__dict__.items() if k != "lock"}
+
+
+def candidates(zone: str, labels: Iterable[str]) -> Iterator[str]:
+    """Yield ``label.zone`` for each well-formed label (case and surrounding dots ignored)."""
+    zone = zone.strip(".").lower()
+    for raw in labels:
+        label = raw.strip().strip(".").lower()
+        if label.endswith("." + zone):
+            label = label[: -len(zone) - 1]
+        if label and _LABEL.match(label):
+            yield f"{label}.{zone}"
+
+
+class Sweeper:
+    """Resolve candidate names under one zone on a bounded worker pool."""
+
+    def __init__(self, lookup: Lookup, concurrency: int = 64, wildcard_probes: int = DEFAULT_WILDCARD_PROBES) -> None:
+        self.lookup = lookup
+        self.concurrency = max(1, int(concurrency))
+        self.wildcard_probes = max(1, int(wildcard_probes))
+        self.stats = SweepStats()
+        self.wildcard = Wildcard()
+
+    def resolve(self, name: str) -> tuple[str, list[str]]:
+        """(rcode, addresses) from A then, unless the name does not exist, AAAA."""
+        rcode, a = self.lookup(name, "A")
+        if rcode == "NXDOMAIN":
+            return rcode, []
+        rcode6, aaaa = self.lookup(name, "AAAA")
+        if rcode not in ("NOERROR", "NXDOMAIN"):
+            rcode = rcode6
+        return rcode, sorted({ip for ip in a + aaaa if parse_ip(ip)})
+
+    def detect_wildcard(self, zone: str) -> Wildcard:
+        probes = tuple(f"{secrets.token_hex(8)}.{zone}" for _ in range(self.wildcard_probes))
+        ips: set[str] = set()
+        for probe in probes:
+            ips.update(self.resolve(probe)[1])
+        self.wildcard = Wildcard(frozenset(ips), probes)
+        return self.wildcard
+
+    def _check(self, name: str) -> Hit | None:
+        rcode, ips = self.resolve(name)
+        if rcode == "NXDOMAIN":
+            self.stats.count("nxdomain")
+        elif rcode != "NOERROR":
+            self.stats.count("errors")
+        elif not ips:
+            self.stats.count("no_address")
+        elif self.wildcard.matches(ips):
+            self.stats.count("wildcard_filtered")
+        else:
+            self.stats.count("resolved")
+            return Hit(name, ips)
+        return None
+
+    def sweep(self, zone: str, labels: Iterable[str]) -> Iterator[Hit]:
+        """Detect the zone's wildcard, then yield every candidate that resolves to something else."""
+        zone = zone.strip(".").lower()
+        self.detect_wildcard(zone)
+
+        def counted() -> Iterator[str]:
+            for name in candidates(zone, labels):
+                self.stats.count("candidates")
+                yield name
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sweep") as pool:
+            for hit in map_unordered(pool, self._check, counted(), self.concurrency * 2):
+                if hit is not None:
+                    yield hit
@@ -0,0 +1,251 @@
+"""Port-43 WHOIS client with referral following and per-server budgets.
+
+- the registry server comes from a built-in TLD table, or from IANA's
+  ``refer:`` answer for TLDs not in the table (remembered per run)
+- thin-registry answers are followed to the registrar's WHOIS server
+- each server gets a concurrent connection cap and a query-rate token bucket
+- attempts go through the shared retry policy (circuit breaker per server,
+  adaptive timeouts)
+- internationalised names are sent as IDNA (``xn--``) labels
+- ``extract_expiry`` is the single expiry-date parser for WHOIS text
+"""
+
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from dnsanalysis import profiling, retry
+from dnsanalysis.ratelimit import TokenBucket
+
+IANA_WHOIS = "whois.iana.org"
+WHOIS_PORT = 43
+MAX_RESPONSE_BYTES = 1024 * 1024
+MAX_REFERRALS = 2
+
+WHOIS_SERVERS = {
+    "com": "whois.verisign-grs.com",
+    "net": "whois.verisign-grs.com",
+    "org": "whois.publicinterestregistry.org",
+    "info": "whois.nic.info",
+    "io": "whois.nic.io",
+    "co": "whois.nic.co",
+    "me": "whois.nic.me",
+    "us": "whois.nic.us",
+    "xyz": "whois.nic.xyz",
+    "app": "whois.nic.google",
+    "dev": "whois.nic.google",
+    "uk": "whois.nic.uk",
+    "be": "whois.dns.be",
+    "ch": "whois.nic.ch",
+    "li": "whois.nic.ch",
+    "sk": "whois.sk-nic.sk",
+    "de": "whois.denic.de",
+    "fr": "whois.nic.fr",
+    "nl": "whois.domain-registry.nl",
+    "eu": "whois.eu",
+}
+
+# Servers that need more than the bare domain name in the query line.
+QUERY_FORMATS = {
+    "whois.verisign-grs.com": "domain {domain}",
+    "whois.denic.de": "-T dn,ace {domain}",
+}
+
+EXPIRY_PATTERNS = [
+    r"Expiry Date:\s*(.+)",
+    r"Registrar Registration Expiration Date:\s*(.+)",
+    r"paid-till:\s*(.+)",
+    r"expires:\s*(.+)",
+]
+_DATE_FORMATS = ("%d-%b-%Y", "%Y.%m.%d", "%Y/%m/%d", "%d.%m.%Y", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y")
+_REFERRAL_PATTERNS = [
+    re.compile(r"^\s*Registrar WHOIS Server:\s*(\S+)", re.I | re.M),
+    re.compile(r"^\s*ReferralServer:\s*(\S+)", re.I | re.M),
+    re.compile(r"^\s*refer:\s*(\S+)", re.I | re.M),
+]
+
+
+class WhoisError(Exception):
+    """No WHOIS server could be reached or the answer was empty."""
+
+
+@dataclass
+class WhoisResult:
+    domain: str
+    text: str
+    servers: list[str] = field(default_factory=list)
+
+
+def parse_date(value: str) -> datetime | None:
+    value = value.strip()
+    try:
+        d = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        d = None
+        for fmt in _DATE_FORMATS:
+            try:
+                d = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+    if d is None:
+        return None
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return d.astimezone(timezone.utc)
+
+
+def extract_expiry(text: str) -> datetime | None:
+    """Find and parse the expiration date in a WHOIS answer."""
+    for p in EXPIRY_PATTERNS:
+        m = re.search(p, text or "", flags=re.I)
+        if m:
+            candidate = m.group(1).strip().splitlines()[0].strip()
+            return parse_date(candidate)
+    return None
+
+
+def to_ascii(domain: str) -> str:
+    """IDNA-encode each label, as the DNS and RDAP paths do; raises WhoisError if a label cannot be encoded."""
+    try:
+        labels = [label.encode("idna").decode("ascii") for label in domain.lower().strip(".").split(".")]
+    except UnicodeError:
+        labels = []
+    if not labels or not all(labels):
+        raise WhoisError(f"not an IDNA-encodable domain: {domain!r}")
+    return ".".join(labels)
+
+
+def _split_server(server: str) -> tuple[str, int]:
+    server = re.sub(r"^(r?whois)://", "", server.strip(), flags=re.I).rstrip("/")
+    host, _, port = server.partition(":")
+    return host.lower(), int(port) if port.isdigit() else WHOIS_PORT
+
+
+def find_referral(text: str, current: str) -> str | None:
+    for pattern in _REFERRAL_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            target = m.group(1).strip()
+            if target and _split_server(target) != _split_server(current):
+                return target
+    return None
+
+
+class _ServerBudget:
+    def __init__(self, max_connections: int, rate: float, burst: int) -> None:
+        self.slots = threading.BoundedSemaphore(max(1, max_connections))
+        self.bucket = TokenBucket(rate, burst)
+
+
+class WhoisClient:
+    """Thread-safe WHOIS lookups with per-server connection and rate budgets."""
+
+    def __init__(
+        self,
+        servers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+        retries: int = 2,
+        max_connections: int = 2,
+        rate: float = 1.0,
+        burst: int = 2,
+        follow_referrals: bool = True,
+        policy: retry.RetryPolicy | None = None,
+    ) -> None:
+        self.servers = dict(WHOIS_SERVERS)
+        self.servers.update({k.lower().strip("."): v for k, v in (servers or {}).items()})
+        self.timeout = timeout
+        self.retries = retries
+        self.max_connections = max_connections
+        self.rate = rate
+        self.burst = burst
+        self.follow_referrals = follow_referrals
+        self.policy = policy if policy is not None else retry.current()
+        self._budgets: dict[str, _ServerBudget] = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, host: str) -> _ServerBudget:
+        with self._lock:
+            b = self._budgets.get(host)
+            if b is None:
+                b = self._budgets[host] = _ServerBudget(self.max_connections, self.rate, self.burst)
+            return b
+
+    def _exchange(self, server: str, query: str) -> str:
+        host, port = _split_server(server)
+        budget = self._budget(f"{host}:{port}")
+        call = self.policy.call(f"whois:{host}:{port}", self.timeout, max(1, self.retries))
+        while call.attempt():
+            budget.bucket.acquire()
+            with budget.slots:
+                try:
+                    with socket.create_connection((host, port), timeout=call.timeout) as sock:
+                        sock.sendall(query.encode("utf-8") + b"\r\n")
+                        chunks = []
+                        size = 0
+                        while size < MAX_RESPONSE_BYTES:
+                            chunk = sock.recv(65536)
+                            if not chunk:
+                                break
+                            chunks.append(chunk)
+                            size += len(chunk)
+                except OSError as exc:
+                    call.failure(str(exc))
+                    continue
+            if not chunks:
+                call.failure("connection closed without an answer")
+                continue
+            call.success()
+            return b"".join(chunks).decode("utf-8", errors="replace")
+        raise WhoisError(f"{host}: {call.reason}")
+
+    def server_for(self, domain: str) -> str:
+        labels = domain.lower().strip(".").split(".")
+        for i in range(1, len(labels)):
+            server = self.servers.get(".".join(labels[i:]))
+            if server:
+                return server
+        tld = labels[-1]
+        referral = find_referral(self._exchange(IANA_WHOIS, tld), IANA_WHOIS)
+        if not referral:
+            raise WhoisError(f"no WHOIS server known for .{tld}")
+        with self._lock:
+            self.servers[tld] = referral
+        return referral
+
+    def query(self, domain: str) -> WhoisResult:
+        domain = to_ascii(domain)
+        server = self.server_for(domain)
+        result = WhoisResult(domain, "")
+        for _ in range(MAX_REFERRALS + 1):
+            fmt = QUERY_FORMATS.get(_split_server(server)[0], "{domain}")
+            try:
+                text = self._exchange(server, fmt.format(domain=domain))
+            except WhoisError:
+                if result.text:
+                    break
+                raise
+            result.servers.append(server)
+            result.text = f"{result.text}\n{text}" if result.text else text
+            nxt = find_referral(text, server) if self.follow_referrals else None
+            if not nxt or nxt in result.servers:
+                break
+            server = nxt
+        if not result.text.strip():
+            raise WhoisError(f"empty WHOIS answer for {domain}")
+        return result
+
+    def lookup(self, domain: str) -> tuple[str, str]:
+        """Return (text, source) in the monitor's source convention."""
+        started = time.perf_counter()
+        try:
+            result = self.query(domain)
+        except WhoisError as exc:
+            profiling.observe("whois", time.perf_counter() - started, self.servers.get(domain.rsplit(".", 1)[-1], ""), "error")
+            return "", f"whois_error:{str(exc)[:120]}"
+        upstream = _split_server(result.servers[0])[0] if result.servers else ""
+        profiling.observe("whois", time.perf_counter() - started, upstream, "ok")
+        return result.text, "whois"
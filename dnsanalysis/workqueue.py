@@ -0,0 +1,298 @@
+"""Splitting one batch across several hosts, and merging their outputs.
+
+- ``parse_shard``/``in_shard``: static ``--shard i/N`` partitioning by a
+  stable hash of the domain, so every host can read the same input file
+  and take a disjoint slice of it without coordinating
+- ``WorkQueue``: a SQLite file on shared storage that leases domains to
+  workers in small batches; a lease that is not completed before it
+  expires (a worker died or stalled) is handed out again, up to
+  ``max_attempts`` times
+- ``NdjsonMerge``: combines per-worker NDJSON outputs into one result
+  stream, keeping the newest result when a domain was checked twice and
+  using a temporary SQLite index so memory stays flat for millions of rows
+
+SQLite locking needs a filesystem with working POSIX locks (local disks,
+NFSv4 and most cluster filesystems; not SMB mounts or NFSv3 without lockd).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_LEASE_BATCH = 64
+DEFAULT_MAX_ATTEMPTS = 3
+_COMMIT_EVERY = 200
+_COMMIT_SECONDS = 2.0
+_LOAD_CHUNK = 10_000
+_POLL_SECONDS = 1.0
+
+PENDING, LEASED, DONE = 0, 1, 2
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """``"i/N"`` -> (i, N) with 0 <= i < N."""
+    index, sep, count = value.partition("/")
+    try:
+        i, n = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}") from None
+    if not sep or n < 1 or not 0 <= i < n:
+        raise ValueError(f"shard index must be 0..N-1, got {value!r}")
+    return i, n
+
+
+def shard_of(domain: str, count: int) -> int:
+    digest = hashlib.blake2b(domain.lower().rstrip(".").encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def in_shard(domains: Iterable[str], index: int, count: int) -> Iterator[str]:
+    for domain in domains:
+        if count == 1 or shard_of(domain, count) == index:
+            yield domain
+
+
+class WorkQueue:
+    """Lease-based domain queue shared by several workers through one SQLite file."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        worker: str | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        batch: int = DEFAULT_LEASE_BATCH,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.worker = worker or f"{os.uname().nodename}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.batch = max(1, batch)
+        self.max_attempts = max(1, max_attempts)
+        # Autocommit; lease and completion batches open their own IMMEDIATE transactions.
+        self._conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue ("
+            "domain TEXT PRIMARY KEY, state INTEGER NOT NULL DEFAULT 0, owner TEXT, "
+            "lease_until REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, finished REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_state ON queue (state, lease_until)")
+        self._lock = threading.Lock()
+        self._done: list[str] = []
+        self._flushed = time.monotonic()
+        self.loaded = 0
+        self.leased = 0
+        self.completed = 0
+
+    def _write(self, sql: str, rows: list[tuple[Any, ...]]) -> int:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            changed = self._conn.executemany(sql, rows).rowcount
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def load(self, domains: Iterable[str]) -> int:
+        """Add domains not queued yet; safe to run from several workers at once."""
+        added = 0
+        chunk: list[tuple[str]] = []
+        with self._lock:
+            for domain in domains:
+                chunk.append((domain,))
+                if len(chunk) >= _LOAD_CHUNK:
+                    added += self._write("INSERT OR IGNORE INTO queue (domain) VALUES (?)", chunk)
+                    chunk = []
+            if chunk:
+                added += self._write("INSERT OR IGNORE INTO queue (domain) VALUES (?)", chunk)
+        self.loaded += added
+        return added
+
+    def lease(self) -> list[str]:
+        """Lease the next batch of pending or expired domains to this worker."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT domain FROM queue WHERE (state = ? OR (state = ? AND lease_until < ?)) AND attempts < ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (PENDING, LEASED, now, self.max_attempts, self.batch),
+                ).fetchall()
+                domains = [r[0] for r in rows]
+                self._conn.executemany(
+                    "UPDATE queue SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1 WHERE domain = ?",
+                    ((LEASED, self.worker, now + self.lease_seconds, d) for d in domains),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.leased += len(domains)
+        return domains
+
+    def _next_expiry(self) -> float | None:
+        """Seconds until the earliest retryable lease held by another worker expires, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(lease_until) FROM queue WHERE state = ? AND attempts < ? AND owner != ?",
+                (LEASED, self.max_attempts, self.worker),
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def drain(self) -> Iterator[str]:
+        """Lease and yield domains until nothing is pending or expired right now."""
+        while True:
+            domains = self.lease()
+            if not domains:
+                return
+            yield from domains
+
+    def wait(self) -> bool:
+        """Flush completions, then wait for another worker's lease to expire.
+
+        Returns False once no retryable lease is held anywhere else, i.e. the
+        whole batch is finished; True when it is worth draining again.
+        """
+        self.flush()
+        remaining = self._next_expiry()
+        if remaining is None:
+            return False
+        time.sleep(min(remaining + 0.05, _POLL_SECONDS))
+        return True
+
+    def complete(self, domain: str) -> None:
+        with self._lock:
+            self._done.append(domain)
+            due = len(self._done) >= _COMMIT_EVERY or time.monotonic() - self._flushed >= _COMMIT_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            done, self._done = self._done, []
+            self._flushed = time.monotonic()
+            if done:
+                now = time.time()
+                self._write("UPDATE queue SET state = ?, owner = ?, finished = ? WHERE domain = ?", [(DONE, self.worker, now, d) for d in done])
+        self.completed += len(done)
+
+    def release(self) -> int:
+        """Hand this worker's unfinished leases back to the queue, e.g. on shutdown."""
+        with self._lock:
+            return self._write(
+                "UPDATE queue SET state = ?, lease_until = 0, attempts = MAX(attempts - 1, 0) WHERE state = ? AND owner = ?",
+                [(PENDING, LEASED, self.worker)],
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state").fetchall())
+            exhausted = self._conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE state = ? AND attempts >= ? AND lease_until < ?",
+                (LEASED, self.max_attempts, time.time()),
+            ).fetchone()[0]
+        return {
+            "store": str(self.path),
+            "worker": self.worker,
+            "loaded": self.loaded,
+            "leased": self.leased,
+            "completed": self.completed,
+            "pending": rows.get(PENDING, 0),
+            "in_progress": rows.get(LEASED, 0) - exhausted,
+            "done": rows.get(DONE, 0),
+            "exhausted": exhausted,
+        }
+
+    def close(self) -> None:
+        self.flush()
+        self.release()
+        with self._lock:
+            self._conn.close()
+
+
+class NdjsonMerge:
+    """One result per domain across NDJSON files, in first-seen order.
+
+    ``index()`` scans every file once and returns the number of distinct
+    domains; iterating then reads each winning line back by its offset.
+    When a domain appears more than once (an expired lease was retried) the
+    result with the latest ``generated_at_utc`` wins. Lines that are not
+    result objects are counted as ``invalid`` and skipped.
+    """
+
+    def __init__(self, paths: Iterable[str], spill_dir: str | None = None) -> None:
+        self.files = [str(p) for p in paths]
+        self.stats = {"files": len(self.files), "lines": 0, "invalid": 0, "duplicates": 0, "results": 0}
+        fd, self._db_path = tempfile.mkstemp(prefix="dns-analysis-merge-", suffix=".sqlite", dir=spill_dir)
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE merged (domain TEXT PRIMARY KEY, seq INTEGER NOT NULL, generated TEXT NOT NULL, "
+            "file INTEGER NOT NULL, offset INTEGER NOT NULL)"
+        )
+
+    def index(self) -> int:
+        db = self._db
+        seq = 0
+        for file_idx, path in enumerate(self.files):
+            with open(path, "rb") as handle:
+                offset = 0
+                for raw in handle:
+                    line_offset, offset = offset, offset + len(raw)
+                    if not raw.strip():
+                        continue
+                    self.stats["lines"] += 1
+                    try:
+                        item = json.loads(raw)
+                        domain = item["domain"]
+                    except (ValueError, KeyError, TypeError):
+                        self.stats["invalid"] += 1
+                        continue
+                    generated = str(item.get("generated_at_utc") or "")
+                    seq += 1
+                    row = db.execute("SELECT generated FROM merged WHERE domain = ?", (domain,)).fetchone()
+                    if row is None:
+                        db.execute("INSERT INTO merged VALUES (?, ?, ?, ?, ?)", (domain, seq, generated, file_idx, line_offset))
+                        continue
+                    self.stats["duplicates"] += 1
+                    if generated >= row[0]:
+                        db.execute(
+                            "UPDATE merged SET generated = ?, file = ?, offset = ? WHERE domain = ?",
+                            (generated, file_idx, line_offset, domain),
+                        )
+        db.commit()
+        return db.execute("SELECT COUNT(*) FROM merged").fetchone()[0]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        handles: dict[int, Any] = {}
+        try:
+            for file_idx, line_offset in self._db.execute("SELECT file, offset FROM merged ORDER BY seq"):
+                handle = handles.get(file_idx)
+                if handle is None:
+                    handle = handles[file_idx] = open(self.files[file_idx], "rb")
+                handle.seek(line_offset)
+                self.stats["results"] += 1
+                yield json.loads(handle.readline())
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def close(self) -> None:
+        self._db.close()
+        try:
+            os.unlink(self._db_path)
+        except OSError:
+            pass
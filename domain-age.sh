@@ -1,14 +1,14 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-age.sh"
   exit 0
 fi
 
 set -euo pipefail
 
-VERSION="1.2.0"
+VERSION="1.3.0"
 
 __r17q_blob="wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
 if [[ "${1:-}" == "m" || "${1:-}" == "-m" ]]; then
@@ -35,7 +35,16 @@ else
   search_string="Creation Date:"
 fi
 
-creation_line="$(whois "$domain" | grep -i "$search_string" | head -n1 || true)"
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+
+# Ask a running `domain-security-monitor.py serve` daemon first (pooled, rate-limited WHOIS);
+# domain-query.py exits 3 when no daemon is listening, and whois is used instead.
+rc=0
+whois_text="$(python3 "$repo_dir/domain-query.py" --timeout 60 whois domain="$domain" format=text 2>/dev/null)" || rc=$?
+if [[ $rc -ne 0 || -z "$whois_text" ]]; then
+  whois_text="$(whois "$domain" || true)"
+fi
+creation_line="$(grep -i "$search_string" <<< "$whois_text" | head -n1 || true)"
 [[ -n "$creation_line" ]] || { echo "Could not determine creation date for $domain"; exit 1; }
 
 creation_date="$(echo "$creation_line" | cut -d':' -f2- | xargs)"
@@ -1,14 +1,14 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-checkNS.sh"
   exit 0
 fi
 
 set -euo pipefail
 
-VERSION="1.2.0"
+VERSION="1.3.0"
 
 __r17q_blob="wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
 if [[ "${1:-}" == "m" || "${1:-}" == "-m" ]]; then
@@ -25,48 +25,55 @@ fi
 usage() {
   cat <<'EOF'
 Usage:
-  domain-checkNS.sh -d <domain> [-n "ns1,ns2,ns3"]
+  domain-checkNS.sh (-d <domain> | -f domains_file) [-n "ns1,ns2,ns3"] [-j] [-- monitor options]
 
 Options:
-  -d DOMAIN     Domain to check (required)
+  -d DOMAIN     Domain to check
+  -f FILE       File with one domain per line
   -n NS_LIST    Comma-separated expected NS list
-                default: ns1.example.com,ns2.example.com,ns3.example.com
+                default: the policy in config/expected_ns.json
+  -j            Stream NDJSON instead of text
+
+Runs domain-security-monitor.py ns-integrity: the parent delegation and every
+authoritative server (IPv4 and IPv6) are queried in parallel for NS and SOA,
+and lame servers and SOA serial skew are reported alongside the policy check.
+Exits 2 when any check fails. Options after -- are passed through.
 EOF
 }
 
 domain=""
-expected_csv="ns1.example.com,ns2.example.com,ns3.example.com"
+file=""
+expected_csv=""
+output="text"
 
-while getopts ":d:n:h" opt; do
+while getopts ":d:f:n:jh" opt; do
   case "$opt" in
     d) domain="$OPTARG" ;;
+    f) file="$OPTARG" ;;
     n) expected_csv="$OPTARG" ;;
+    j) output="ndjson" ;;
     h) usage; exit 0 ;;
     \?) echo "Invalid option -$OPTARG"; usage; exit 1 ;;
   esac
 done
+shift $((OPTIND - 1))
 
-[[ -n "$domain" ]] || { echo "Error: domain required"; usage; exit 1; }
-
-mapfile -t expected < <(echo "$expected_csv" | tr ',' '\n' | sed 's/\.$//' | tr '[:upper:]' '[:lower:]')
-mapfile -t found < <(dig +short NS "$domain" | sed 's/\.$//' | tr '[:upper:]' '[:lower:]')
-
-[[ ${#found[@]} -gt 0 ]] || { echo "No name servers found for $domain."; exit 1; }
+[[ -n "$domain" || -n "$file" ]] || { echo "Error: domain or file required"; usage; exit 1; }
+[[ -z "$file" || -f "$file" ]] || { echo "Error: file not found: $file"; exit 1; }
 
-declare -a missing=()
-for ns in "${expected[@]}"; do
-  if printf '%s\n' "${found[@]}" | grep -qx "$ns"; then
-    echo -e "\033[32mMatch: $ns\033[0m"
-  else
-    echo -e "\033[31mMissing expected NS: $ns\033[0m"
-    missing+=("$ns")
-  fi
-done
-
-echo
-echo "Actual NS for $domain:"
-printf '%s\n' "${found[@]}"
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+cmd=(python3 "$repo_dir/domain-security-monitor.py" ns-integrity --output "$output")
+[[ -n "$domain" ]] && cmd+=(--domain "$domain")
+[[ -n "$file" ]] && cmd+=(--input-file "$file")
 
-if [[ ${#missing[@]} -gt 0 ]]; then
-  exit 2
+if [[ -n "$expected_csv" ]]; then
+  policy="$(mktemp)"
+  trap 'rm -f "$policy"' EXIT
+  python3 -c 'import json, sys; print(json.dumps({"default": [n.strip().rstrip(".").lower() for n in sys.argv[1].split(",") if n.strip()]}))' \
+    "$expected_csv" > "$policy"
+  cmd+=(--expected-ns "$policy")
+  "${cmd[@]}" "$@"
+  exit $?
 fi
+
+exec "${cmd[@]}" "$@"
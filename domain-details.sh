@@ -1,14 +1,14 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-details.sh"
   exit 0
 fi
 
 set -euo pipefail
 
-VERSION="1.2.0"
+VERSION="1.3.0"
 
 __r17q_blob="wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
 if [[ "${1:-}" == "m" || "${1:-}" == "-m" ]]; then
@@ -29,21 +29,42 @@ usage() {
 [[ $# -ge 1 ]] || { usage; exit 1; }
 domain="$1"
 
-caa="$(dig -t CAA +short "$domain")"
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+use_daemon=true
+
+# Ask a running `domain-security-monitor.py serve` daemon first (warm cache, no fork of dig).
+# domain-query.py exits 3 when no daemon is listening; stop trying and use dig from then on.
+daemon_dns() {
+  local rr="$1" name="$2" out rc=0
+  $use_daemon || return 1
+  out="$(python3 "$repo_dir/domain-query.py" --timeout 15 dns name="$name" type="$rr" format=text 2>/dev/null)" || rc=$?
+  if [[ $rc -eq 3 ]]; then
+    use_daemon=false
+  fi
+  [[ $rc -eq 0 ]] || return 1
+  printf '%s' "$out"
+}
+
+digq() {
+  daemon_dns "$1" "$2" && return 0
+  dig -t "$1" +short "$2"
+}
+
+caa="$(digq CAA "$domain")"
 if [[ -n "$caa" ]]; then
   echo -e "\n\033[34mCAA record found:\033[0m\n\033[34m$caa\033[0m\n"
 else
   echo "No CAA record found for $domain."
 fi
 
-dmarc="$(dig -t TXT +short "_dmarc.$domain" | tr -d '"' | tr '[:upper:]' '[:lower:]')"
+dmarc="$(digq TXT "_dmarc.$domain" | tr -d '"' | tr '[:upper:]' '[:lower:]')"
 if [[ -n "$dmarc" ]]; then
   echo -e "\n\033[33mDMARC record found:\033[0m\n\033[33m$dmarc\033[0m\n"
 else
   echo "No DMARC record found for $domain."
 fi
 
-spf="$(dig -t TXT +short "$domain" | grep -ioE 'v=spf1[^" ]*.*' || true)"
+spf="$(digq TXT "$domain" | grep -ioE 'v=spf1[^" ]*.*' || true)"
 if [[ -n "$spf" ]]; then
   echo -e "\n\033[32mSPF record found:\033[0m\n\033[32m$spf\033[0m\n"
 else
@@ -1,14 +1,14 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-info.sh"
   exit 0
 fi
 
 set -euo pipefail
 
-VERSION="1.2.0"
+VERSION="1.3.0"
 if [[ "${1:-}" == "-v" || "${1:-}" == "--version" ]]; then
   echo "domain-info.sh $VERSION"
   exit 0
@@ -77,9 +77,26 @@ if $no_color; then
   RED=''; GREEN=''; BLUE=''; NC=''
 fi
 
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+use_daemon=true
+
+# Ask a running `domain-security-monitor.py serve` daemon first (warm cache, no fork of dig).
+# domain-query.py exits 3 when no daemon is listening; stop trying and use dig from then on.
+daemon_dns() {
+  local rr="$1" name="$2" out rc=0
+  $use_daemon || return 1
+  out="$(python3 "$repo_dir/domain-query.py" --timeout 15 dns name="$name" type="$rr" format=text 2>/dev/null)" || rc=$?
+  if [[ $rc -eq 3 ]]; then
+    use_daemon=false
+  fi
+  [[ $rc -eq 0 ]] || return 1
+  printf '%s' "$out"
+}
+
 digq() {
   local rr="$1"
   local name="$2"
+  daemon_dns "$rr" "$name" && return 0
   dig +time=3 +tries=1 "$rr" "$name" +short 2>/dev/null | grep -v '^;' || true
 }
 
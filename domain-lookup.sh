@@ -1,14 +1,14 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-lookup.sh"
   exit 0
 fi
 
 set -euo pipefail
 
-VERSION="1.2.0"
+VERSION="1.3.0"
 
 __r17q_blob="wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
 if [[ "${1:-}" == "m" || "${1:-}" == "-m" ]]; then
@@ -52,6 +52,36 @@ done
 [[ -n "$domain" ]] || { echo "Error: domain is required"; usage; exit 1; }
 [[ -f "$names_file" ]] || { echo "Error: names file not found: $names_file"; exit 1; }
 
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+use_daemon=true
+
+# Ask a running `domain-security-monitor.py serve` daemon first (warm cache, no fork of dig).
+# domain-query.py exits 3 when no daemon is listening; stop trying and use dig from then on.
+daemon_dns() {
+  local rr="$1" name="$2" out rc=0
+  $use_daemon || return 1
+  out="$(python3 "$repo_dir/domain-query.py" --timeout 15 dns name="$name" type="$rr" format=text 2>/dev/null)" || rc=$?
+  if [[ $rc -eq 3 ]]; then
+    use_daemon=false
+  fi
+  [[ $rc -eq 0 ]] || return 1
+  printf '%s' "$out"
+}
+
+# `host`-style output so the parsing below works for both sources.
+lookup_host() {
+  local fqdn="$1" answer
+  if answer="$(daemon_dns A "$fqdn")"; then
+    if [[ -z "$answer" ]]; then
+      echo "Host $fqdn not found: 3(NXDOMAIN)"
+    else
+      grep -E '^([0-9]{1,3}\.){3}[0-9]{1,3}$' <<< "$answer" | sed "s/^/$fqdn has address /" || echo "Host $fqdn not found"
+    fi
+    return 0
+  fi
+  host "$fqdn" 2>&1 || true
+}
+
 : > "$out_file"
 : > "$public_file"
 
@@ -68,7 +98,7 @@ while IFS= read -r name || [[ -n "$name" ]]; do
   fqdn="${name}.${domain}"
   echo -n "."
 
-  lookup="$(host "$fqdn" 2>&1 || true)"
+  lookup="$(lookup_host "$fqdn")"
   echo "$lookup" >> "$out_file"
 
   if echo "$lookup" | grep -qiE 'not found|NXDOMAIN|failed'; then
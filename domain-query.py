@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import sys
+if len(sys.argv) > 1 and sys.argv[1] in ("-a", "--author"):
+    print("Author: FoxSecIntel")
+    print("Repository: https://github.com/FoxSecIntel/DNS-analysis")
+    print("Tool: domain-query.py")
+    raise SystemExit(0)
+
+# Only socket/json-level imports: this runs once per alert and must start fast.
+import base64
+import json
+
+from dnsanalysis.client import ADDRESS_ENV, default_address, query
+
+VERSION = "1.0.0"
+EXIT_UNREACHABLE = 3
+__r17q_blob = "wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
+
+USAGE = f"""Usage:
+  domain-query.py [--server ADDRESS] [--timeout SECONDS] ROUTE [key=value ...]
+  domain-query.py [--server ADDRESS] ROUTE DOMAIN
+
+Routes (monitor): analyse, registered, ns-integrity, dns, whois, rdap, stats, health
+Routes (detector): check, classify, stats, health
+
+ADDRESS is a Unix socket path or 127.0.0.1:PORT; default ${ADDRESS_ENV} or {default_address()}.
+A bare DOMAIN argument is sent as domain= (name= for dns). Text responses
+(format=text) are printed as-is, JSON is pretty-printed. Exits {EXIT_UNREACHABLE} when no
+server is listening, so shell callers can fall back to their own lookups.
+"""
+
+
+def main(argv: list[str]) -> int:
+    server = None
+    timeout = 300.0
+    args = list(argv)
+    while args and args[0].startswith("-"):
+        opt = args.pop(0)
+        if opt in ("-h", "--help"):
+            print(USAGE, end="")
+            return 0
+        if opt == "--version":
+            print(f"domain-query.py {VERSION}")
+            return 0
+        if opt == "-m":
+            print(base64.b64decode(__r17q_blob).decode("utf-8", errors="replace"), end="")
+            return 0
+        if opt in ("--server", "--timeout") and args:
+            value = args.pop(0)
+            if opt == "--server":
+                server = value
+            else:
+                timeout = float(value)
+            continue
+        print(f"Unknown option: {opt}\n{USAGE}", file=sys.stderr, end="")
+        return 1
+    if not args:
+        print(USAGE, file=sys.stderr, end="")
+        return 1
+
+    route, rest = args[0], args[1:]
+    params: dict[str, str] = {}
+    for item in rest:
+        key, sep, value = item.partition("=")
+        if sep:
+            params[key] = value
+        else:
+            params["name" if route == "dns" else "ip" if route == "classify" else "domain"] = item
+
+    address = server or default_address()
+    try:
+        payload = query(address, route, params, timeout)
+    except OSError as exc:
+        print(f"Error: no server at {address}: {exc}", file=sys.stderr)
+        return EXIT_UNREACHABLE
+    except RuntimeError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if isinstance(payload, str):
+        sys.stdout.write(payload)
+    else:
+        print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,7 +1,7 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: domain-registered.sh"
   exit 0
 fi
@@ -25,47 +25,39 @@ fi
 usage() {
   cat <<'EOF'
 Usage:
-  domain-registered.sh [-f domains_file]
+  domain-registered.sh [-f domains_file] [-c checkpoint_file] [-j] [-- monitor options]
 
 Options:
   -f FILE   Input file with one domain per line (default: domains.txt)
+  -c FILE   Checkpoint file; rerun with the same file to resume an interrupted run
+  -j        Stream NDJSON instead of text
+
+Domains are checked concurrently by domain-security-monitor.py's bulk engine:
+DNS NS/SOA first, then RDAP, and WHOIS only when the answer is still ambiguous.
+Options after -- (e.g. --concurrency 64 --whois-rate 0.5) are passed through.
 EOF
 }
 
 file="domains.txt"
-while getopts ":f:h" opt; do
+checkpoint=""
+output="text"
+while getopts ":f:c:jh" opt; do
   case "$opt" in
     f) file="$OPTARG" ;;
+    c) checkpoint="$OPTARG" ;;
+    j) output="ndjson" ;;
     h) usage; exit 0 ;;
     \?) echo "Invalid option -$OPTARG"; usage; exit 1 ;;
   esac
 done
+shift $((OPTIND - 1))
 
 [[ -f "$file" ]] || { echo "Error: file not found: $file"; exit 1; }
 
-registered=0
-not_registered=0
-
-mapfile -t domains < <(grep -v '^\s*$' "$file")
-num_domains=${#domains[@]}
-
-echo "Checking $num_domains domains..."
-
-for ((i=0; i<num_domains; i++)); do
-  domain="${domains[i]}"
-  output="$(whois "$domain" 2>&1 || true)"
-
-  if echo "$output" | grep -qiE "is free|no match|not found|available"; then
-    ((not_registered+=1))
-    echo -e "\n$domain is not registered."
-  else
-    ((registered+=1))
-    echo -n "."
-  fi
-
-  echo -en "\r$((i+1))/$num_domains domains checked"
-done
+repo_dir="$(cd "$(dirname "$0")" && pwd)"
+cmd=(python3 "$repo_dir/domain-security-monitor.py" registered --input-file "$file" --output "$output")
+if [[ -n "$checkpoint" ]]; then
+  cmd+=(--checkpoint "$checkpoint")
+fi
 
-echo -e "\n\nSummary:"
-echo "$registered domains are registered"
-echo "$not_registered domains are not registered"
+exec "${cmd[@]}" "$@"
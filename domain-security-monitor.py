@@ -2,7 +2,7 @@
 import sys
 if len(sys.argv) > 1 and sys.argv[1] in ("-a", "--author"):
     print("Author: FoxSecIntel")
-    print("Repository: https://github.com/FoxSecIntel/DNS-analysis
+    print("Repository: https://github.com/FoxSecIntel/DNS-analysis")
     print("Tool: domain-security-monitor.py")
     raise SystemExit(0)
 
@@ -10,46 +10,99 @@ if len(sys.argv) > 1 and sys.argv[1] in ("-a", "--author"):
 
 Improvements included:
 - Per-domain expected nameserver overrides
+- Nameserver policy compiled once into a suffix/group/provider-pattern trie
 - DKIM selector-aware checks with confidence scoring
-- RDAP-first expiry lookup with WHOIS fallback
-- Retry/backoff for DNS and HTTP calls
+- Recursive SPF evaluation (10-lookup/void limits, authorised IP ranges) with batch-wide include memo
+- RDAP-first expiry lookup with native port-43 WHOIS fallback (referrals, per-server budgets)
+- RDAP routed per TLD via the IANA bootstrap registry over pooled, rate-limited connections
+- Shared retry policy: adaptive timeouts, global retry budget, per-upstream circuit breakers, per-domain time budget
+- Parallel DKIM selector probing with `_domainkey` NXDOMAIN short-circuit
+- In-process DNS resolver with `dig` subprocess fallback backend
+- Per-domain DNS query plan with single-flight coalescing across signals and domains
+- TTL-aware DNS answer cache, optionally persisted across runs
 - Structured JSON output with status/confidence/source per signal
+- Slotted signal records with enum-coded status/confidence/source; CSV/TSV and binary columnar exports
+- Streaming NDJSON/text/markdown output over lazily read, bounded-memory deduplicated input
+- Bounded concurrent batch engine with per-domain signal fan-out and deadline
+- Optional per-stage latency profiling (--profile, Prometheus/JSON export)
+- Incremental mode (--state): only signals whose TTL/expiry schedule is due are re-checked
+- Append-only result history (--history) with drift queries (`history` subcommand) and --changes-only output
+- Bulk NS integrity (`ns-integrity` subcommand): parent vs authoritative NS, lame servers, SOA serial skew
+- Bulk registration check (`registered` subcommand): DNS NS/SOA, then RDAP, then WHOIS, with a resumable checkpoint
+- Daemon mode (`serve` subcommand): warm lookup state behind a local Unix-socket/HTTP query API with request coalescing
+- Multi-host batches: static hash sharding (--shard i/N) or a shared SQLite lease queue (--queue), with a `merge` subcommand
 """
 
-from __future__ import annotations
 
 import argparse
+import contextvars
+import hashlib
+import ipaddress
 import json
-import random
 import re
+import signal
 import socket
 import subprocess
+import threading
 import time
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
+from itertools import chain
 from pathlib import Path
-from typing import Any
-from urllib.parse import quote
+from typing import Any, Callable, Iterable, Iterator, TextIO
+from urllib.error import HTTPError
+from urllib.parse import quote, urlsplit
 from urllib.request import Request, urlopen
 
+from dnsanalysis import profiling, retry
+from dnsanalysis.cache import DEFAULT_MAX_BYTES, DnsCache
+from dnsanalysis.delegation import DelegationChecker, DelegationReport, serial_skew
+from dnsanalysis.history import HistoryStore, parse_when
+from dnsanalysis.nspolicy import NsPolicy, compile_policy, load_policy
+from dnsanalysis.planner import QueryPlan, SingleFlight, plan_pool
+from dnsanalysis.rdap import DEFAULT_BOOTSTRAP_FILE, RdapClient, update_bootstrap
+from dnsanalysis.records import Signal
+from dnsanalysis.registration import STATUSES as REGISTRATION_STATUSES, Checkpoint, RegistrationChecker
+from dnsanalysis.retry import DEFAULT_COOLDOWN, DEFAULT_FAILURE_THRESHOLD, DEFAULT_RETRY_RATIO, RetryPolicy
+from dnsanalysis.resolver import DnsError, DnsTimeout, Resolver
+from dnsanalysis.client import default_address
+from dnsanalysis.columnar import ColumnarWriter, write_delimited
+from dnsanalysis.schedule import DEFAULT_MAX_RECHECK, DEFAULT_MIN_RECHECK, StateStore, collect_ttl, note_ttl
+from dnsanalysis.serve import BadRequest, QueryServer, is_local_address
+from dnsanalysis.spf import SpfEvaluator, address_count, spf_records
+from dnsanalysis.stream import Deduper, iter_lines, unique
+from dnsanalysis.whois import WhoisClient, extract_expiry
+from dnsanalysis.workqueue import (
+    DEFAULT_LEASE_BATCH,
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_MAX_ATTEMPTS,
+    NdjsonMerge,
+    WorkQueue,
+    in_shard,
+    parse_shard,
+)
+
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_EXPECTED_NS_FILE = BASE_DIR / "config" / "expected_ns.json"
 DEFAULT_DKIM_SELECTORS_FILE = BASE_DIR / "config" / "dkim_selectors.json"
 VERSION = "1.0.0"
-
-
-@dataclass
-class Signal:
-    status: str
-    confidence: str
-    data_source: str
-    details: dict[str, Any]
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DOMAIN_TIMEOUT = 120.0
+DEFAULT_REGISTRATION_CONCURRENCY = 32
+DNS_BACKENDS = ("native", "dig")
+SIGNAL_NAMES = ("ip_resolution", "nameservers", "spf", "dmarc", "dkim", "expiry")
+FLAT_OUTPUTS = ("csv", "tsv", "columnar")
 
 
 def now_utc() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _signal_status(sig: Signal) -> str:
+    return sig.status
+
+
 def norm_ns(value: str) -> str:
     return value.strip().rstrip(".").lower()
 
@@ -57,50 +110,186 @@ def norm_ns(value: str) -> str:
 def run_with_retry(cmd: list[str], retries: int = 3, timeout: int = 5) -> tuple[int, str, str, str]:
     last_rc = 1
     last_out = ""
-    last_err = ""
     source = "dns"
+    started = time.perf_counter()
 
-    for i in range(retries):
+    call = retry.current().call(f"exec:{cmd[0]}", timeout, retries)
+    while call.attempt():
         try:
-            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-            last_rc = proc.returncode
-            last_out = proc.stdout.strip()
-            last_err = proc.stderr.strip()
-            if last_rc == 0:
-                return last_rc, last_out, last_err, source
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=call.timeout)
         except Exception as exc:
-            last_err = str(exc)
-
-        if i < retries - 1:
-            time.sleep((0.25 * (i + 1)) + random.random() * 0.2)
+            call.failure(str(exc))
+            continue
+        last_rc = proc.returncode
+        last_out = proc.stdout.strip()
+        if last_rc == 0:
+            call.success()
+            profiling.observe("exec", time.perf_counter() - started, cmd[0], "ok", call.retries)
+            return last_rc, last_out, proc.stderr.strip(), source
+        call.failure(proc.stderr.strip() or f"exit status {last_rc}")
 
-    return last_rc, last_out, last_err, source
+    profiling.observe("exec", time.perf_counter() - started, cmd[0], "error", call.retries)
+    return last_rc, last_out, call.reason, source
 
 
-def http_json_with_retry(url: str, retries: int = 3, timeout: int = 6) -> tuple[dict[str, Any] | None, str]:
+def http_json_with_retry(url: str, retries: int = 3, timeout: int = 6) -> tuple[dict[str, Any] | None, str, int | None]:
+    """GET JSON; returns (payload, source, HTTP status), the status None when no response arrived."""
     source = "rdap"
-    last_err = ""
-    for i in range(retries):
+    host = urlsplit(url).hostname or ""
+    started = time.perf_counter()
+    call = retry.current().call(f"http:{host}", timeout, retries)
+    status: int | None = None
+    while call.attempt():
         try:
             req = Request(url, headers={"User-Agent": "dns-analysis-monitor/1.0"})
-            with urlopen(req, timeout=timeout) as resp:
+            with urlopen(req, timeout=call.timeout) as resp:
                 payload = json.loads(resp.read().decode("utf-8", errors="ignore"))
-                return payload, source
+        except HTTPError as exc:
+            status = exc.code
+            if exc.code == 429:
+                # Throttling says nothing about the host's health; as RdapClient, retry without tripping the breaker.
+                call.failure("HTTP Error 429", upstream_fault=False)
+                continue
+            if exc.code >= 500:
+                call.failure(f"HTTP Error {exc.code}")
+                continue
+            # 404 is the answer for an unregistered domain, and other 4xx will not change on retry.
+            call.success()
+            outcome = "notfound" if exc.code == 404 else "error"
+            profiling.observe("http", time.perf_counter() - started, host, outcome, call.retries)
+            reason = "HTTP 404 not found" if exc.code == 404 else f"HTTP Error {exc.code}"
+            return None, f"{source}_error:{reason}", exc.code
         except Exception as exc:
-            last_err = str(exc)
-        if i < retries - 1:
-            time.sleep((0.25 * (i + 1)) + random.random() * 0.2)
-    return None, f"{source}_error:{last_err[:120]}"
+            status = None
+            call.failure(str(exc))
+            continue
+        call.success()
+        profiling.observe("http", time.perf_counter() - started, host, "ok", call.retries)
+        return payload, source, 200
+    profiling.observe("http", time.perf_counter() - started, host, "error", call.retries)
+    return None, f"{source}_error:{call.reason[:120]}", status
 
 
-def dig(record_type: str, name: str, retries: int = 3) -> tuple[list[str], str]:
+_DNS_BACKEND = "native"
+_RESOLVER: Resolver | None = None
+_DNS_CACHE: DnsCache | None = None
+
+
+def configure_dns(
+    backend: str = "native",
+    nameservers: list[str] | None = None,
+    cache: DnsCache | None = None,
+) -> None:
+    global _DNS_BACKEND, _RESOLVER, _DNS_CACHE
+    _DNS_BACKEND = backend
+    if _RESOLVER is not None:
+        _RESOLVER.close()
+    _RESOLVER = Resolver(nameservers or None) if backend == "native" else None
+    _DNS_CACHE = cache
+
+
+def dig_subprocess(record_type: str, name: str, retries: int = 3) -> tuple[list[str], str]:
     rc, out, err, source = run_with_retry(["dig", "+time=2", "+tries=1", "+short", record_type, name], retries=retries, timeout=6)
     if rc != 0 or not out:
         return [], f"{source}_error:{err[:120]}" if err else source
     return [line.strip() for line in out.splitlines() if line.strip()], source
 
 
+_FLIGHT = SingleFlight()
+_PLAN: contextvars.ContextVar[QueryPlan | None] = contextvars.ContextVar("query_plan", default=None)
+_PLAN_TOTALS = {"declared": 0, "planned": 0}
+_PLAN_LOCK = threading.Lock()
+
+
+def _resolve(record_type: str, name: str, retries: int = 3) -> tuple[list[str], str, str | None, int | None]:
+    """Cache, then one coalesced upstream lookup; returns (records, source, rcode, ttl)."""
+    started = time.perf_counter()
+    if _DNS_CACHE is not None:
+        cached = _DNS_CACHE.get(name, record_type)
+        if cached is not None:
+            profiling.observe("dns", time.perf_counter() - started, "cache", "hit")
+            return list(cached.records), "dns", cached.rcode, cached.ttl()
+
+    def upstream() -> tuple[list[str], str, str | None, int | None]:
+        if _DNS_BACKEND == "native":
+            global _RESOLVER
+            if _RESOLVER is None:
+                _RESOLVER = Resolver()
+            try:
+                answer = _RESOLVER.query(name, record_type, tries=retries)
+            except DnsTimeout as exc:
+                profiling.observe("dns", time.perf_counter() - started, "native", "timeout")
+                return [], f"dns_error:{str(exc)[:120]}", None, None
+            except DnsError:
+                pass
+            else:
+                records = answer.short()
+                if _DNS_CACHE is not None:
+                    _DNS_CACHE.put(name, record_type, records, answer.rcode, answer.ttl())
+                profiling.observe("dns", time.perf_counter() - started, answer.server, answer.rcode.lower())
+                return records, "dns", answer.rcode, answer.ttl()
+
+        records, source = dig_subprocess(record_type, name, retries=retries)
+        profiling.observe("dns", time.perf_counter() - started, "dig", "ok" if source == "dns" else "error")
+        return records, source, None, None
+
+    result, shared = _FLIGHT.do(QueryPlan.key(record_type, name), upstream)
+    if shared:
+        profiling.observe("dns", time.perf_counter() - started, "coalesced", "hit")
+    return result
+
+
+def dns_lookup(record_type: str, name: str, retries: int = 3) -> tuple[list[str], str, str | None]:
+    """Resolve (name, type) through the plan, the cache and coalesced upstream lookups.
+
+    Returns (records, source, rcode). The rcode is None when it is unknown,
+    i.e. for the `dig` subprocess backend or when the lookup failed.
+    """
+    plan = _PLAN.get()
+    planned = plan.get(record_type, name) if plan is not None else None
+    records, source, rcode, ttl = planned.result() if planned is not None else _resolve(record_type, name, retries)
+    note_ttl(ttl)
+    return list(records), source, rcode
+
+
+def planned_queries(domain: str, names: Iterable[str]) -> list[tuple[str, str]]:
+    """The independent DNS queries each signal needs; DKIM selectors wait on the `_domainkey` probe."""
+    declared = {
+        "ip_resolution": [("A", domain)],
+        "nameservers": [("NS", domain)],
+        "spf": [("TXT", domain)],
+        "dmarc": [("TXT", f"_dmarc.{domain}")],
+        "dkim": [("TXT", f"_domainkey.{domain}")] if _DKIM_NXDOMAIN_CUT else [],
+    }
+    return [q for name in names for q in declared.get(name, [])]
+
+
+def planner_stats() -> dict[str, int]:
+    with _PLAN_LOCK:
+        return {**_PLAN_TOTALS, **_FLIGHT.stats()}
+
+
+def dig(record_type: str, name: str, retries: int = 3) -> tuple[list[str], str]:
+    """Resolve in-process, falling back to the `dig` binary if the native backend is unusable."""
+    records, source, _ = dns_lookup(record_type, name, retries=retries)
+    return records, source
+
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+@profiling.timed("resolve", upstream=lambda domain: _DNS_BACKEND)
 def resolve_ips(domain: str) -> tuple[list[str], str]:
+    """IPv4 addresses via the shared DNS path, falling back to the system resolver."""
+    records, source, rcode = dns_lookup("A", domain)
+    ips = sorted({r for r in records if _is_ip(r)})
+    if ips or rcode in ("NOERROR", "NXDOMAIN"):
+        return ips, source
     try:
         _, _, ips = socket.gethostbyname_ex(domain)
         return sorted(set(ips)), "dns"
@@ -117,49 +306,84 @@ def load_json(path: Path, default: dict[str, Any]) -> dict[str, Any]:
     return default
 
 
-def check_nameservers(domain: str, expected_cfg: dict[str, Any]) -> Signal:
+@profiling.timed("check:nameservers", outcome=_signal_status)
+def check_nameservers(domain: str, expected_cfg: NsPolicy | dict[str, Any]) -> Signal:
+    policy = expected_cfg if isinstance(expected_cfg, NsPolicy) else compile_policy(expected_cfg)
     ns_records, src = dig("NS", domain)
     actual = sorted(set(norm_ns(x) for x in ns_records))
 
-    domain_overrides = {k.lower(): [norm_ns(v) for v in vals] for k, vals in (expected_cfg.get("domain_overrides") or {}).items()}
-    default_ns = [norm_ns(x) for x in (expected_cfg.get("default") or [])]
-    expected = sorted(set(domain_overrides.get(domain.lower(), default_ns)))
+    rule = policy.lookup(domain)
+    expected = list(rule.nameservers)
+    details: dict[str, Any] = {"actual": actual, "expected": expected, "match": None, "rule": rule.source}
+    if rule.patterns:
+        details["patterns"] = list(rule.patterns)
 
     if not actual:
-        return Signal("unknown", "low", src, {"actual": [], "expected": expected, "match": None})
+        return Signal("unknown", "low", src, {**details, "actual": []})
 
-    if not expected:
-        return Signal("unknown", "medium", src, {"actual": actual, "expected": [], "match": None})
+    if not expected and not rule.patterns:
+        return Signal("unknown", "medium", src, details)
+
+    match = rule.matches(actual)
+    return Signal("pass" if match else "fail", "high", src, {**details, "match": match})
+
+
+_SPF: SpfEvaluator | None = None
 
-    match = actual == expected
-    return Signal(
-        "pass" if match else "fail",
-        "high",
-        src,
-        {"actual": actual, "expected": expected, "match": match},
-    )
 
+def configure_spf(evaluator: SpfEvaluator | None) -> None:
+    global _SPF
+    _SPF = evaluator
 
+
+def spf_evaluator() -> SpfEvaluator:
+    global _SPF
+    if _SPF is None:
+        _SPF = SpfEvaluator(dns_lookup)
+    return _SPF
+
+
+@profiling.timed("check:spf", outcome=_signal_status)
 def check_spf(domain: str) -> Signal:
     txt, src = dig("TXT", domain)
-    records = [x.replace('"', "") for x in txt]
-    spf = [r for r in records if "v=spf1" in r.lower()]
-    if not records:
+    if not txt:
         return Signal("unknown", "low", src, {"present": None, "record": None})
+    spf = spf_records(txt)
     if not spf:
         return Signal("fail", "high", src, {"present": False, "record": None})
+    if len(spf) > 1:
+        return Signal("fail", "high", src, {"present": True, "record": spf[0], "error": "permerror: multiple SPF records"})
+
     rec = spf[0]
-    if "-all" in rec.lower():
-        status = "pass"
-    elif "~all" in rec.lower() or "?all" in rec.lower():
-        status = "warn"
-    else:
-        status = "warn"
-    return Signal(status, "high", src, {"present": True, "record": rec})
+    node = spf_evaluator().evaluate(domain, rec)
+    details: dict[str, Any] = {
+        "present": True,
+        "record": rec,
+        "all": f"{node.all}all" if node.all else None,
+        "lookups": node.lookups,
+        "void_lookups": node.void_lookups,
+        "includes": list(node.includes),
+        "ip4": [str(n) for n in node.networks if n.version == 4],
+        "ip6": [str(n) for n in node.networks if n.version == 6],
+        "ip4_addresses": address_count(node.networks, 4),
+        "error": node.error,
+    }
+    if node.unresolved:
+        details["unresolved_macros"] = list(node.unresolved)
+    if node.error and node.error.startswith("temperror"):
+        return Signal("unknown", "low", src, details)
+    if node.error:
+        return Signal("fail", "high", src, details)
+    status = "pass" if node.all == "-" else "warn"
+    return Signal(status, "high", src, details)
 
 
+@profiling.timed("check:dmarc", outcome=_signal_status)
 def check_dmarc(domain: str) -> Signal:
     txt, src = dig("TXT", f"_dmarc.{domain}")
+    if not txt and src.startswith("dns_error"):
+        # A failed lookup says nothing about the record; do not report an outage as a missing policy.
+        return Signal("unknown", "low", src, {"present": None, "policy": None, "record": None})
     records = [x.replace('"', "") for x in txt]
     dmarc = [r for r in records if "v=dmarc1" in r.lower()]
     if not dmarc:
@@ -181,6 +405,34 @@ def check_dmarc(domain: str) -> Signal:
     return Signal(status, "high", src, {"present": True, "policy": policy, "record": rec})
 
 
+_DKIM_STOP_EARLY = False
+_DKIM_NXDOMAIN_CUT = True
+_PROBE_POOL: ThreadPoolExecutor | None = None
+_PROBE_POOL_LOCK = threading.Lock()
+PROBE_WORKERS = 64
+
+
+def configure_dkim(stop_early: bool = False, nxdomain_cut: bool = True) -> None:
+    global _DKIM_STOP_EARLY, _DKIM_NXDOMAIN_CUT
+    _DKIM_STOP_EARLY = stop_early
+    _DKIM_NXDOMAIN_CUT = nxdomain_cut
+
+
+def probe_pool() -> ThreadPoolExecutor:
+    """Shared pool for fanning out independent lookups inside a single check."""
+    global _PROBE_POOL
+    with _PROBE_POOL_LOCK:
+        if _PROBE_POOL is None:
+            _PROBE_POOL = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="probe")
+        return _PROBE_POOL
+
+
+def dkim_selector_hit(txt: list[str]) -> bool:
+    joined = " ".join(txt).lower()
+    return "v=dkim1" in joined or " p=" in joined or "k=rsa" in joined
+
+
+@profiling.timed("check:dkim", outcome=_signal_status)
 def check_dkim(domain: str, selectors_cfg: dict[str, Any]) -> Signal:
     base = ["selector1", "selector2", "default", "google", "k1", "k2", "dkim", "mail", "smtp", "s1", "s2"]
     extra = selectors_cfg.get(domain.lower(), []) if isinstance(selectors_cfg, dict) else []
@@ -192,22 +444,56 @@ def check_dkim(domain: str, selectors_cfg: dict[str, Any]) -> Signal:
             continue
         seen.add(sl)
         selectors.append(sl)
+    configured = set(selectors[: len(extra)])
+
+    # RFC 8020: NXDOMAIN for _domainkey.<domain> means no selector can exist beneath it.
+    if _DKIM_NXDOMAIN_CUT:
+        _, src, rcode = dns_lookup("TXT", f"_domainkey.{domain}", retries=2)
+        if rcode == "NXDOMAIN":
+            return Signal(
+                "fail",
+                "medium" if extra else "low",
+                src,
+                {"selectors_checked": selectors, "selectors_found": [], "short_circuit": "_domainkey NXDOMAIN"},
+            )
 
+    # Each probe runs in a copy of this context so its TTL counts towards the dkim signal.
+    futures = {
+        probe_pool().submit(contextvars.copy_context().run, dig, "TXT", f"{sel}._domainkey.{domain}", 2): sel
+        for sel in selectors
+    }
     hits = []
     sources = set()
-    for sel in selectors:
-        txt, src = dig("TXT", f"{sel}._domainkey.{domain}", retries=2)
+    errors = []
+    done_selectors = set()
+    stopped_early = False
+    for fut in as_completed(futures):
+        sel = futures[fut]
+        txt, src = fut.result()
+        done_selectors.add(sel)
         sources.add(src)
-        joined = " ".join(txt).lower()
-        if "v=dkim1" in joined or " p=" in joined or "k=rsa" in joined:
+        if not txt and src.startswith("dns_error"):
+            errors.append(src)
+        if dkim_selector_hit(txt):
             hits.append(sel)
+            if _DKIM_STOP_EARLY and sel in configured:
+                stopped_early = True
+                break
+    checked = selectors
+    if stopped_early:
+        for fut in futures:
+            fut.cancel()
+        checked = [s for s in selectors if s in done_selectors]
 
     if hits:
         confidence = "high" if any(s in selectors[: max(1, len(extra))] for s in hits) and extra else "medium"
-        return Signal("pass", confidence, "+".join(sorted(sources)), {"selectors_checked": selectors, "selectors_found": sorted(set(hits))})
+        return Signal("pass", confidence, "+".join(sorted(sources)), {"selectors_checked": checked, "selectors_found": sorted(set(hits))})
 
+    if errors and len(errors) == len(done_selectors):
+        # Every probe failed: the selectors are unknown, not absent.
+        return Signal("unknown", "low", errors[0], {"selectors_checked": checked, "selectors_found": [], "failed_probes": len(errors)})
     confidence = "medium" if extra else "low"
-    return Signal("fail", confidence, "+".join(sorted(sources)), {"selectors_checked": selectors, "selectors_found": []})
+    return Signal("fail", confidence, "+".join(sorted(sources)), {"selectors_checked": checked, "selectors_found": []})
 
 
 def parse_iso_date(date_str: str) -> datetime | None:
@@ -220,9 +506,55 @@ def parse_iso_date(date_str: str) -> datetime | None:
         return None
 
 
+_RDAP: RdapClient | None = None
+
+
+def configure_rdap(client: RdapClient | None) -> None:
+    global _RDAP
+    if _RDAP is not None:
+        _RDAP.close()
+    _RDAP = client
+
+
+_WHOIS: WhoisClient | None = None
+
+
+def configure_whois(client: WhoisClient | None) -> None:
+    global _WHOIS
+    _WHOIS = client
+
+
+def whois_lookup(domain: str) -> tuple[str, str]:
+    global _WHOIS
+    if _WHOIS is None:
+        _WHOIS = WhoisClient()
+    return _WHOIS.lookup(domain)
+
+
+def rdap_domain(domain: str) -> tuple[dict[str, Any] | None, str]:
+    payload, source, _ = rdap_domain_status(domain)
+    return payload, source
+
+
+def rdap_domain_status(domain: str) -> tuple[dict[str, Any] | None, str, int | None]:
+    """As ``rdap_domain``, plus the HTTP status so callers can tell "not found" from a failure."""
+    if _RDAP is None:
+        return http_json_with_retry(f"https://rdap.org/domain/{quote(domain)}")
+    return _RDAP.domain_status(domain)
+
+
+def expiry_status(days: int) -> str:
+    if days < 0:
+        return "fail"
+    if days <= 30:
+        return "warn"
+    return "pass"
+
+
+@profiling.timed("check:expiry", outcome=_signal_status)
 def check_expiry(domain: str) -> Signal:
     # RDAP-first
-    payload, src = http_json_with_retry(f"https://rdap.org/domain/{quote(domain)}")
+    payload, src = rdap_domain(domain)
     if payload:
         for ev in payload.get("events", []):
             action = str(ev.get("eventAction", "")).lower()
@@ -230,207 +562,1052 @@ def check_expiry(domain: str) -> Signal:
                 dt = parse_iso_date(str(ev.get("eventDate", "")))
                 if dt:
                     days = (dt - datetime.now(timezone.utc)).days
-                    if days < 0:
-                        status = "fail"
-                    elif days <= 30:
-                        status = "warn"
-                    else:
-                        status = "pass"
-                    return Signal(status, "high", "rdap", {"days": days, "expiry_utc": dt.isoformat()})
+                    return Signal(expiry_status(days), "high", "rdap", {"days": days, "expiry_utc": dt.isoformat()})
 
     # WHOIS fallback
-    rc, out, err, whois_src = run_with_retry(["whois", domain], retries=2, timeout=10)
-    text = out or ""
-    patterns = [
-        r"Expiry Date:\s*(.+)",
-        r"Registrar Registration Expiration Date:\s*(.+)",
-        r"paid-till:\s*(.+)",
-        r"expires:\s*(.+)",
-    ]
-    candidate = None
-    for p in patterns:
-        m = re.search(p, text, flags=re.I)
-        if m:
-            candidate = m.group(1).strip().splitlines()[0].strip()
-            break
-
-    if candidate:
-        dt = parse_iso_date(candidate)
-        if dt:
-            days = (dt - datetime.now(timezone.utc)).days
-            status = "fail" if days < 0 else ("warn" if days <= 30 else "pass")
-            return Signal(status, "medium", "whois", {"days": days, "expiry_utc": dt.isoformat()})
+    text, whois_src = whois_lookup(domain)
+    dt = extract_expiry(text)
+    if dt:
+        days = (dt - datetime.now(timezone.utc)).days
+        return Signal(expiry_status(days), "medium", "whois", {"days": days, "expiry_utc": dt.isoformat()})
 
-    return Signal("unknown", "low", whois_src if rc == 0 else src, {"days": None, "expiry_utc": None})
+    return Signal("unknown", "low", whois_src if text else src, {"days": None, "expiry_utc": None})
 
 
-def analyse_domain(domain: str, expected_cfg: dict[str, Any], dkim_cfg: dict[str, Any]) -> dict[str, Any]:
+@profiling.timed("check:ip_resolution", outcome=_signal_status)
+def check_ip_resolution(domain: str) -> Signal:
     ips, ip_src = resolve_ips(domain)
+    return Signal("pass" if ips else "unknown", "high" if ips else "low", ip_src, {"ips": ips})
 
+
+def signal_checks(domain: str, expected_cfg: NsPolicy | dict[str, Any], dkim_cfg: dict[str, Any]) -> dict[str, Callable[[], Signal]]:
     return {
-        "domain": domain,
-        "generated_at_utc": now_utc(),
-        "signals": {
-            "ip_resolution": Signal("pass" if ips else "unknown", "high" if ips else "low", ip_src, {"ips": ips}).__dict__,
-            "nameservers": check_nameservers(domain, expected_cfg).__dict__,
-            "spf": check_spf(domain).__dict__,
-            "dmarc": check_dmarc(domain).__dict__,
-            "dkim": check_dkim(domain, dkim_cfg).__dict__,
-            "expiry": check_expiry(domain).__dict__,
-        },
+        "ip_resolution": lambda: check_ip_resolution(domain),
+        "nameservers": lambda: check_nameservers(domain, expected_cfg),
+        "spf": lambda: check_spf(domain),
+        "dmarc": lambda: check_dmarc(domain),
+        "dkim": lambda: check_dkim(domain, dkim_cfg),
+        "expiry": lambda: check_expiry(domain),
     }
 
 
+def timed_out_signal(name: str, timeout: float) -> Signal:
+    return Signal("unknown", "low", "deadline", {"error": f"{name} exceeded {timeout:g}s domain deadline"})
+
+
+_STATE: StateStore | None = None
+
+
+def configure_state(store: StateStore | None) -> None:
+    global _STATE
+    _STATE = store
+
+
+def config_digest(*paths: str | Path) -> str:
+    """Fingerprint of the config files a stored result depends on."""
+    h = hashlib.sha256()
+    for path in paths:
+        try:
+            h.update(Path(path).read_bytes())
+        except OSError:
+            pass
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def refresh_reused(name: str, result: dict[str, Any]) -> dict[str, Any]:
+    """Bring a stored result up to date where that needs no network, e.g. days left to expiry."""
+    if name == "expiry":
+        dt = parse_iso_date(str((result.get("details") or {}).get("expiry_utc") or ""))
+        if dt:
+            days = (dt - datetime.now(timezone.utc)).days
+            return {**result, "status": expiry_status(days), "details": {**result["details"], "days": days}}
+    return result
+
+
+def analyse_domain(
+    domain: str,
+    expected_cfg: NsPolicy | dict[str, Any],
+    dkim_cfg: dict[str, Any],
+    pool: ThreadPoolExecutor | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Run every signal check for one domain.
+
+    With a pool the checks fan out concurrently and anything still running
+    when the deadline expires is reported as unknown with source "deadline".
+    In incremental mode only signals that are due run; the others are taken
+    from the state store.
+    """
+    started = time.perf_counter()
+    checks = signal_checks(domain, expected_cfg, dkim_cfg)
+    state = _STATE
+    reused = state.fresh(domain) if state is not None else {}
+    names = [n for n in SIGNAL_NAMES if n not in reused]
+    signals: dict[str, Any] = {}
+    ttls: dict[str, int | None] = {}
+
+    # Issue the declared queries as one batch; checks read their answers from the plan.
+    # The domain deadline also bounds retries, so work behind a timed-out signal stops promptly.
+    with retry.domain_budget(timeout):
+        plan = QueryPlan(plan_pool(), _resolve).start(planned_queries(domain, names))
+        with _PLAN_LOCK:
+            _PLAN_TOTALS["declared"] += plan.declared
+            _PLAN_TOTALS["planned"] += plan.issued
+        token = _PLAN.set(plan)
+        try:
+            if pool is None:
+                for name in names:
+                    sig, ttls[name] = collect_ttl(checks[name])
+                    signals[name] = sig.as_dict()
+            else:
+                futures = {name: pool.submit(contextvars.copy_context().run, collect_ttl, checks[name]) for name in names}
+                wait(futures.values(), timeout=timeout if timeout and timeout > 0 else None)
+                for name in names:
+                    fut = futures[name]
+                    if not fut.done():
+                        fut.cancel()
+                        signals[name] = timed_out_signal(name, timeout or 0).as_dict()
+                        continue
+                    try:
+                        sig, ttls[name] = fut.result()
+                        signals[name] = sig.as_dict()
+                    except Exception as exc:
+                        signals[name] = Signal("unknown", "low", "error", {"error": str(exc)[:120]}).as_dict()
+        finally:
+            _PLAN.reset(token)
+            plan.cancel()
+
+    result: dict[str, Any] = {"domain": domain, "generated_at_utc": now_utc()}
+    if state is not None:
+        next_due = {name: due for name, (_, _, due) in reused.items()}
+        for name in names:
+            due = state.record(domain, name, signals[name], ttls.get(name))
+            if due is not None:
+                next_due[name] = due
+        for name, (stored, checked, _) in reused.items():
+            signals[name] = refresh_reused(name, stored)
+        state.note_reused(len(reused))
+        result["incremental"] = {
+            "rechecked": names,
+            "reused": {name: datetime.fromtimestamp(checked, timezone.utc).isoformat() for name, (_, checked, _) in reused.items()},
+            "next_due_utc": {name: datetime.fromtimestamp(due, timezone.utc).isoformat() for name, due in sorted(next_due.items())},
+        }
+
+    profiling.observe_domain(domain, time.perf_counter() - started)
+    result["signals"] = {name: signals[name] for name in SIGNAL_NAMES}
+    return result
+
+
+def iter_analyses(
+    domains: Iterable[str],
+    expected_cfg: NsPolicy | dict[str, Any],
+    dkim_cfg: dict[str, Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float | None = DEFAULT_DOMAIN_TIMEOUT,
+) -> Iterator[dict[str, Any]]:
+    """Analyse domains on a bounded worker pool, yielding results in input order.
+
+    At most ``concurrency`` domains are in flight; each one fans its signal
+    checks out onto a second pool so a domain costs roughly its slowest check.
+    """
+    concurrency = max(1, int(concurrency))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="domain") as domain_pool, ThreadPoolExecutor(
+        max_workers=concurrency * len(SIGNAL_NAMES), thread_name_prefix="signal"
+    ) as signal_pool:
+        # Keep a few batches queued so workers stay busy behind a slow head-of-line domain.
+        window = concurrency * 4
+        pending: deque[Future] = deque()
+        for domain in domains:
+            pending.append(domain_pool.submit(analyse_domain, domain, expected_cfg, dkim_cfg, signal_pool, timeout))
+            while pending and (len(pending) >= window or pending[0].done()):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def add_lookup_args(p: argparse.ArgumentParser) -> None:
+    """DNS, RDAP, WHOIS and retry options shared by the monitor and its bulk subcommands."""
+    p.add_argument("--dns-backend", choices=DNS_BACKENDS, default="native", help="DNS lookup backend (native falls back to dig)")
+    p.add_argument("--nameserver", action="append", help="Resolver address for the native backend, e.g. 9.9.9.9 or 127.0.0.1:5353 (repeatable)")
+    p.add_argument("--dns-cache", metavar="FILE", help="Persist the DNS answer cache to this SQLite file between runs")
+    p.add_argument("--dns-cache-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), help="In-memory DNS cache cap in MiB")
+    p.add_argument("--no-dns-cache", action="store_true", help="Disable DNS answer caching")
+    p.add_argument("--rdap-bootstrap", default=str(DEFAULT_BOOTSTRAP_FILE), help="IANA RDAP bootstrap (dns.json) used to route TLDs")
+    p.add_argument("--rdap-rate", type=float, default=2.0, help="RDAP requests per second per registry host")
+    p.add_argument(
+        "--whois-server",
+        action="append",
+        metavar="TLD=HOST[:PORT]",
+        help="Override the WHOIS server for a TLD (repeatable)",
+    )
+    p.add_argument("--whois-connections", type=int, default=2, help="Concurrent connections allowed per WHOIS server")
+    p.add_argument("--whois-rate", type=float, default=1.0, help="WHOIS queries per second per server")
+    p.add_argument("--retry-budget", type=float, default=DEFAULT_RETRY_RATIO, help="Retries allowed per request across the run (0.2 = 20%%)")
+    p.add_argument("--circuit-threshold", type=int, default=DEFAULT_FAILURE_THRESHOLD, help="Consecutive failures that open an upstream's circuit")
+    p.add_argument("--circuit-cooldown", type=float, default=DEFAULT_COOLDOWN, help="Seconds an open circuit fails fast before a probe is let through")
+    p.add_argument("--no-adaptive-timeouts", action="store_true", help="Always use the fixed client timeouts instead of p99-derived ones")
+    p.add_argument("--profile", action="store_true", help="Print per-stage latency percentiles and slowest domains to stderr")
+    p.add_argument("--profile-export", metavar="FILE", help="Write profile data as a Prometheus textfile (.prom) or JSON")
+
+
+def configure_lookups(args: argparse.Namespace) -> DnsCache | None:
+    """Install the retry policy, resolver, cache, WHOIS and RDAP clients from ``add_lookup_args`` options."""
+    retry.configure(
+        RetryPolicy(
+            retry_ratio=args.retry_budget,
+            failure_threshold=args.circuit_threshold,
+            cooldown=args.circuit_cooldown,
+            adaptive=not args.no_adaptive_timeouts,
+        )
+    )
+    cache = None if args.no_dns_cache else DnsCache(int(args.dns_cache_mb * 1024 * 1024), args.dns_cache)
+    try:
+        configure_dns(args.dns_backend, args.nameserver, cache)
+    except ValueError as exc:
+        raise SystemExit(f"error: --nameserver: {exc}") from None
+    whois_servers = dict(item.split("=", 1) for item in (args.whois_server or []) if "=" in item)
+    configure_whois(WhoisClient(whois_servers, max_connections=args.whois_connections, rate=args.whois_rate))
+    configure_rdap(RdapClient(bootstrap_file=args.rdap_bootstrap, rate=args.rdap_rate))
+    return cache
+
+
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="DNS analysis monitor with confidence metadata")
     p.add_argument("--domain", help="Single domain to analyse")
-    p.add_argument("--input-file", help="Batch file with one domain per line")
+    p.add_argument("--input-file", help="Batch file with one domain per line (- reads stdin)")
     p.add_argument("--expected-ns", default=str(DEFAULT_EXPECTED_NS_FILE), help="Expected nameserver policy JSON")
+    p.add_argument("--ns-policy-cache", metavar="FILE", help="Cache the compiled nameserver policy here for fast startup")
     p.add_argument("--dkim-selectors", default=str(DEFAULT_DKIM_SELECTORS_FILE), help="Per-domain DKIM selectors JSON")
-    p.add_argument("--output", choices=["json", "markdown", "text"], default="json")
+    p.add_argument(
+        "--output",
+        choices=["json", "ndjson", "markdown", "text", *FLAT_OUTPUTS],
+        default="json",
+        help="csv/tsv: one row per domain, four columns per signal; columnar: binary file with one column per signal field",
+    )
+    add_lookup_args(p)
+    p.add_argument("--dkim-stop-early", action="store_true", help="Stop DKIM probing once a configured selector is found")
+    p.add_argument(
+        "--no-dkim-nxdomain-cut",
+        action="store_true",
+        help="Probe every DKIM selector even when _domainkey.<domain> is NXDOMAIN (for non-RFC 8020 servers)",
+    )
+    p.add_argument("--update-rdap-bootstrap", action="store_true", help="Refresh the RDAP bootstrap file from IANA and exit")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Domains analysed in parallel")
+    p.add_argument(
+        "--domain-timeout",
+        type=float,
+        default=DEFAULT_DOMAIN_TIMEOUT,
+        help="Per-domain deadline in seconds; also bounds retries, and unfinished signals are reported as unknown (0 disables)",
+    )
+    p.add_argument("--state", metavar="FILE", help="Incremental mode: SQLite store of per-signal results and next-due times")
+    p.add_argument("--min-recheck", type=float, default=DEFAULT_MIN_RECHECK, help="Incremental mode: shortest re-check interval in seconds")
+    p.add_argument("--max-recheck", type=float, default=DEFAULT_MAX_RECHECK, help="Incremental mode: longest re-check interval in seconds")
+    p.add_argument("--history", metavar="FILE", help="Append results to this SQLite history store (query it with the 'history' subcommand)")
+    p.add_argument("--changes-only", action="store_true", help="With --history, emit only signals that changed since they were last recorded")
+    p.add_argument("--shard", metavar="I/N", help="Only analyse domains whose hash falls in shard I of N (0-based)")
+    p.add_argument("--queue", metavar="FILE", help="Shared SQLite work queue; --domain/--input-file are added to it, then domains are leased from it")
+    p.add_argument("--worker-id", help="Name of this worker in the queue (default: host:pid)")
+    p.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS, help="Queue lease length; unfinished leases are handed out again after this")
+    p.add_argument("--lease-batch", type=int, default=DEFAULT_LEASE_BATCH, help="Domains leased from the queue at a time")
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="Leases per domain before the queue gives up on it")
     p.add_argument("--version", action="version", version=f"domain-security-monitor {VERSION}")
     return p.parse_args()
 
 
-def load_domains(args: argparse.Namespace) -> list[str]:
-    items: list[str] = []
-    if args.domain:
-        items.append(args.domain.strip().lower())
-    if args.input_file:
-        for ln in Path(args.input_file).read_text(encoding="utf-8").splitlines():
-            v = ln.strip().lower()
-            if not v or v.startswith("#"):
+def record_history(
+    results: Iterable[dict[str, Any]],
+    store: HistoryStore,
+    run_id: int,
+    changes_only: bool = False,
+    totals: dict[str, int] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Append each result to the history store as it completes.
+
+    Changed signals are listed under ``changes``; with ``changes_only`` only
+    those signals are emitted, and domains with no changes are skipped.
+    """
+    totals = totals if totals is not None else {}
+    for item in results:
+        domain = item["domain"]
+        changes = {}
+        for name, sig in item.get("signals", {}).items():
+            change = store.record(run_id, domain, name, sig)
+            if change is not None:
+                changes[name] = change
+        totals["domains"] = totals.get("domains", 0) + 1
+        totals["changes"] = totals.get("changes", 0) + len(changes)
+        if changes:
+            item["changes"] = changes
+        if changes_only:
+            if not changes:
                 continue
-            items.append(v)
+            item["signals"] = {name: sig for name, sig in item["signals"].items() if name in changes}
+        yield item
+
+
+def iter_queue_analyses(
+    queue: WorkQueue,
+    expected_cfg: NsPolicy | dict[str, Any],
+    dkim_cfg: dict[str, Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float | None = DEFAULT_DOMAIN_TIMEOUT,
+) -> Iterator[dict[str, Any]]:
+    """Analyse domains leased from the shared queue until no work is left anywhere.
+
+    A domain is marked done once the consumer has taken its result. When the
+    queue runs dry this worker drains its own results, then waits for leases
+    held by other workers and picks up any that expire.
+    """
+    while True:
+        for item in iter_analyses(queue.drain(), expected_cfg, dkim_cfg, concurrency, timeout):
+            yield item
+            queue.complete(item["domain"])
+        if not queue.wait():
+            return
+
+
+def json_body(item: dict[str, Any]) -> str:
+    """One result as it appears inside the indented JSON report's results list."""
+    return json.dumps(item, indent=2).replace("\n", "\n    ")
+
+
+def write_json_document(out: TextIO, count: int, bodies: Iterable[str], metadata: dict[str, Any]) -> None:
+    """Write {"count", "results", "metadata"} byte-identical to json.dumps(indent=2), from pre-encoded bodies."""
+    out.write(f'{{\n  "count": {count},\n  "results": [')
+    for n, body in enumerate(bodies):
+        out.write(("," if n else "") + "\n    " + body)
+    out.write("\n  ]" if count else "]")
+    encoded = json.dumps(metadata, indent=2).replace("\n", "\n  ")
+    out.write(f',\n  "metadata": {encoded}\n}}\n')
+
+
+def write_flat(results: Iterable[dict[str, Any]], output: str, out: TextIO, metadata: dict[str, Any] | None = None) -> int:
+    """CSV/TSV rows streamed as results arrive, or the binary columnar file written at the end."""
+    if output == "columnar":
+        writer = ColumnarWriter(out.buffer, SIGNAL_NAMES, {"tool": "domain-security-monitor", "version": VERSION, **(metadata or {})})
+        writer.extend(results)
+        writer.close()
+        return writer.rows
+    return write_delimited(results, SIGNAL_NAMES, out, "," if output == "csv" else "\t")
+
+
+def merge_main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(
+        prog="domain-security-monitor.py merge",
+        description="Merge per-worker NDJSON outputs into one report, one result per domain (newest wins)",
+    )
+    p.add_argument("inputs", nargs="+", help="NDJSON files written by --output ndjson workers")
+    p.add_argument("--output", choices=["json", "ndjson", "markdown", "text", *FLAT_OUTPUTS], default="json")
+    args = p.parse_args(argv)
+    missing = [f for f in args.inputs if not Path(f).is_file()]
+    if missing:
+        p.error(f"file not found: {', '.join(missing)}")
+    if args.output == "columnar" and sys.stdout.isatty():
+        p.error("--output columnar writes a binary file; redirect stdout")
+
+    merge = NdjsonMerge(args.inputs)
+    out = sys.stdout
+    try:
+        count = merge.index()
+        if args.output in ("markdown", "text"):
+            write_report(merge, args.output, out)
+        elif args.output in FLAT_OUTPUTS:
+            write_flat(merge, args.output, out, {"merge": merge.stats})
+        elif args.output == "ndjson":
+            for item in merge:
+                out.write(json.dumps(item, separators=(",", ":")) + "\n")
+        else:
+            write_json_document(out, count, (json_body(item) for item in merge), {"merge": merge.stats})
+    finally:
+        merge.close()
+    if merge.stats["invalid"]:
+        sys.stderr.write(f"merge: skipped {merge.stats['invalid']} lines that were not results\n")
+    return 0
 
-    dedup = []
-    seen = set()
-    for d in items:
-        if d in seen:
-            continue
-        seen.add(d)
-        dedup.append(d)
-    return dedup
+
+def iter_domains(args: argparse.Namespace, deduper: Deduper | None = None) -> Iterator[str]:
+    """Lazily yield unique domains from --domain and --input-file ("-" reads stdin)."""
+
+    def raw() -> Iterator[str]:
+        if args.domain:
+            yield args.domain.strip().lower()
+        if args.input_file:
+            for v in iter_lines(args.input_file):
+                yield v.lower()
+
+    return unique(raw(), deduper)
 
 
 def _md_cell(value: Any) -> str:
     return str(value).replace("|", "\\|").replace("\n", " ").strip()
 
 
-def render_markdown(results: list[dict[str, Any]]) -> str:
-    lines = [
-        "# Domain Security Monitor Report",
-        "",
-        f"Domains checked: **{len(results)}**",
-        "",
-    ]
+def _status_counts(signals: dict[str, Any]) -> dict[str, int]:
+    status_counts = {"pass": 0, "warn": 0, "fail": 0, "unknown": 0}
+    for sig in signals.values():
+        st = str((sig or {}).get("status", "unknown")).lower()
+        status_counts[st] = status_counts.get(st, 0) + 1
+    return status_counts
 
-    for item in results:
-        domain = item.get("domain", "unknown")
-        generated = item.get("generated_at_utc", "")
-        signals = item.get("signals", {})
-
-        lines.append(f"## {domain}")
-        lines.append("")
-        if generated:
-            lines.append(f"- Generated (UTC): `{generated}`")
-
-        # quick summary counts
-        status_counts = {"pass": 0, "warn": 0, "fail": 0, "unknown": 0}
-        for sig in signals.values():
-            st = str((sig or {}).get("status", "unknown")).lower()
-            status_counts[st] = status_counts.get(st, 0) + 1
+
+def markdown_item_lines(item: dict[str, Any]) -> list[str]:
+    domain = item.get("domain", "unknown")
+    generated = item.get("generated_at_utc", "")
+    signals = item.get("signals", {})
+
+    lines = [f"## {domain}", ""]
+    if generated:
+        lines.append(f"- Generated (UTC): `{generated}`")
+
+    # quick summary counts
+    status_counts = _status_counts(signals)
+    lines.append(
+        "- Summary: "
+        f"pass={status_counts.get('pass', 0)}, "
+        f"warn={status_counts.get('warn', 0)}, "
+        f"fail={status_counts.get('fail', 0)}, "
+        f"unknown={status_counts.get('unknown', 0)}"
+    )
+    lines.append("")
+
+    lines.append("| Signal | Status | Confidence | Data source |")
+    lines.append("| --- | --- | --- | --- |")
+    for name, sig in signals.items():
+        sig = sig or {}
         lines.append(
-            "- Summary: "
-            f"pass={status_counts.get('pass', 0)}, "
-            f"warn={status_counts.get('warn', 0)}, "
-            f"fail={status_counts.get('fail', 0)}, "
-            f"unknown={status_counts.get('unknown', 0)}"
+            f"| {_md_cell(name)} | {_md_cell(sig.get('status', 'unknown'))} | {_md_cell(sig.get('confidence', 'low'))} | {_md_cell(sig.get('data_source', 'unknown'))} |"
         )
-        lines.append("")
-
-        lines.append("| Signal | Status | Confidence | Data source |")
-        lines.append("| --- | --- | --- | --- |")
-        for name, sig in signals.items():
-            sig = sig or {}
-            lines.append(
-                f"| {_md_cell(name)} | {_md_cell(sig.get('status', 'unknown'))} | {_md_cell(sig.get('confidence', 'low'))} | {_md_cell(sig.get('data_source', 'unknown'))} |"
-            )
 
-        lines.append("")
+    lines.append("")
+    return lines
 
-    return "\n".join(lines).rstrip() + "\n"
 
+def text_item_lines(item: dict[str, Any]) -> list[str]:
+    domain = item.get("domain", "unknown")
+    generated = item.get("generated_at_utc", "")
+    signals = item.get("signals", {})
 
-def render_text(results: list[dict[str, Any]]) -> str:
-    lines = [
-        "Domain Security Monitor Report",
-        "=" * 72,
-        f"Domains checked: {len(results)}",
-        "",
-    ]
+    lines = [f"Domain: {domain}", "-" * 72]
+    if generated:
+        lines.append(f"Generated (UTC): {generated}")
 
-    for item in results:
-        domain = item.get("domain", "unknown")
-        generated = item.get("generated_at_utc", "")
-        signals = item.get("signals", {})
-
-        lines.append(f"Domain: {domain}")
-        lines.append("-" * 72)
-        if generated:
-            lines.append(f"Generated (UTC): {generated}")
-
-        status_counts = {"pass": 0, "warn": 0, "fail": 0, "unknown": 0}
-        for sig in signals.values():
-            st = str((sig or {}).get("status", "unknown")).lower()
-            status_counts[st] = status_counts.get(st, 0) + 1
+    status_counts = _status_counts(signals)
+    lines.append(
+        "Summary: "
+        f"pass={status_counts.get('pass', 0)} "
+        f"warn={status_counts.get('warn', 0)} "
+        f"fail={status_counts.get('fail', 0)} "
+        f"unknown={status_counts.get('unknown', 0)}"
+    )
+    lines.append("Signals:")
+
+    for name, sig in signals.items():
+        sig = sig or {}
+        details = sig.get("details", {})
         lines.append(
-            "Summary: "
-            f"pass={status_counts.get('pass', 0)} "
-            f"warn={status_counts.get('warn', 0)} "
-            f"fail={status_counts.get('fail', 0)} "
-            f"unknown={status_counts.get('unknown', 0)}"
+            f"  - {name}: status={sig.get('status', 'unknown')} "
+            f"confidence={sig.get('confidence', 'low')} source={sig.get('data_source', 'unknown')}"
         )
-        lines.append("Signals:")
-
-        for name, sig in signals.items():
-            sig = sig or {}
-            details = sig.get("details", {})
-            lines.append(
-                f"  - {name}: status={sig.get('status', 'unknown')} "
-                f"confidence={sig.get('confidence', 'low')} source={sig.get('data_source', 'unknown')}"
+        if isinstance(details, dict) and details:
+            detail_bits = []
+            for key in ("match", "present", "policy", "days", "selectors_found", "lame", "unresolved_ns", "skew"):
+                if key in details:
+                    detail_bits.append(f"{key}={details.get(key)}")
+            if detail_bits:
+                lines.append(f"    details: {', '.join(detail_bits)}")
+
+    lines.append("")
+    return lines
+
+
+def write_report(results: Iterable[dict[str, Any]], output: str, out: TextIO) -> int:
+    """Stream a markdown or text report; the batch summary is written last."""
+    if output == "markdown":
+        out.write("# Domain Security Monitor Report\n\n")
+    else:
+        out.write("Domain Security Monitor Report\n" + "=" * 72 + "\n\n")
+    out.flush()
+
+    count = 0
+    totals = {"pass": 0, "warn": 0, "fail": 0, "unknown": 0}
+    for item in results:
+        count += 1
+        for st, n in _status_counts(item.get("signals", {})).items():
+            totals[st] = totals.get(st, 0) + n
+        lines = markdown_item_lines(item) if output == "markdown" else text_item_lines(item)
+        out.write("\n".join(lines) + "\n")
+        out.flush()
+
+    totals_line = ", ".join(f"{k}={totals.get(k, 0)}" for k in ("pass", "warn", "fail", "unknown"))
+    if output == "markdown":
+        out.write(f"## Batch summary\n\nDomains checked: **{count}**\n\n- Signals: {totals_line}\n")
+    else:
+        out.write(f"Batch summary\n{'-' * 72}\nDomains checked: {count}\nSignals: {totals_line}\n")
+    return count
+
+
+def history_main(argv: list[str]) -> int:
+    # --db/--output are accepted before or after the query name.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=argparse.SUPPRESS, help="History store written with --history")
+    common.add_argument("--output", choices=["json", "ndjson"], default=argparse.SUPPRESS)
+    p = argparse.ArgumentParser(prog="domain-security-monitor.py history", description="Drift queries over a --history store", parents=[common])
+    sub = p.add_subparsers(dest="query", required=True)
+    q = sub.add_parser("runs", help="List recorded runs, newest first", parents=[common])
+    q.add_argument("--limit", type=int, default=20)
+    q = sub.add_parser("transitions", help="Status/value changes, oldest first", parents=[common])
+    q.add_argument("--domain")
+    q.add_argument("--signal", choices=SIGNAL_NAMES)
+    q.add_argument("--from-status", help="Only changes away from this status")
+    q.add_argument("--to-status", help="Only changes into this status")
+    q.add_argument("--since", help="Start time: ISO date/time or relative (7d, 12h)")
+    q.add_argument("--until", help="End time: ISO date/time or relative")
+    q.add_argument("--include-first-seen", action="store_true", help="Also list first observations")
+    q.add_argument("--limit", type=int)
+    q = sub.add_parser("timeline", help="Current status with first-seen, last-changed and last-seen times", parents=[common])
+    q.add_argument("--domain")
+    q.add_argument("--signal", choices=SIGNAL_NAMES)
+    q.add_argument("--status")
+    q = sub.add_parser("diff", help="Per-signal differences between two runs", parents=[common])
+    q.add_argument("run_a", nargs="?", default="prev", help="Run id, 'prev' or 'last~N' (default prev)")
+    q.add_argument("run_b", nargs="?", default="last", help="Run id or 'last' (default last)")
+    q.add_argument("--domain")
+    q.add_argument("--signal", choices=SIGNAL_NAMES)
+    args = p.parse_args(argv)
+    args.db = getattr(args, "db", None)
+    args.output = getattr(args, "output", "json")
+    if not args.db:
+        p.error("--db is required")
+
+    if not Path(args.db).exists():
+        print(json.dumps({"error": f"history store not found: {args.db}"}, indent=2))
+        return 2
+    store = HistoryStore(args.db)
+    try:
+        if args.query == "runs":
+            rows = store.runs(args.limit)
+        elif args.query == "transitions":
+            rows = store.transitions(
+                args.domain,
+                args.signal,
+                args.from_status,
+                args.to_status,
+                parse_when(args.since),
+                parse_when(args.until),
+                args.include_first_seen,
+                args.limit,
             )
-            if isinstance(details, dict) and details:
-                detail_bits = []
-                for key in ("match", "present", "policy", "days", "selectors_found"):
-                    if key in details:
-                        detail_bits.append(f"{key}={details.get(key)}")
-                if detail_bits:
-                    lines.append(f"    details: {', '.join(detail_bits)}")
+        elif args.query == "timeline":
+            rows = store.timeline(args.domain, args.signal, args.status)
+        else:
+            rows = store.diff(store.resolve_run(args.run_a), store.resolve_run(args.run_b), args.domain, args.signal)
+    except ValueError as exc:
+        print(json.dumps({"error": str(exc)}, indent=2))
+        return 2
+    finally:
+        store.close()
+
+    if args.output == "ndjson":
+        for row in rows:
+            sys.stdout.write(json.dumps(row, separators=(",", ":")) + "\n")
+    else:
+        print(json.dumps({"count": len(rows), "results": rows}, indent=2))
+    return 0
 
-        lines.append("")
 
-    return "\n".join(lines).rstrip() + "\n"
+def delegation_signals(report: DelegationReport) -> dict[str, Signal]:
+    """Delegation consistency, lame servers and SOA serial skew as monitor signals."""
+    base = {"parent_zone": report.parent_zone, "parent_ns": report.parent_ns}
+    if report.error:
+        unknown = Signal("unknown", "low", f"dns_error:{report.error}", base)
+        return {"delegation": unknown, "lame_servers": unknown, "soa_serial": unknown}
+    if not report.parent_ns:
+        status = "fail" if report.parent_rcode == "NXDOMAIN" else "unknown"
+        sig = Signal(status, "high" if status == "fail" else "low", "dns", {**base, "parent_rcode": report.parent_rcode})
+        return {"delegation": sig, "lame_servers": Signal("unknown", "low", "dns", base), "soa_serial": Signal("unknown", "low", "dns", base)}
+
+    servers = [s.__dict__ for s in report.servers]
+    parent_only = sorted(set(report.parent_ns) - set(report.child_ns))
+    child_only = sorted(set(report.child_ns) - set(report.parent_ns))
+    if not report.child_ns:
+        delegation = Signal("unknown", "low", "dns", {**base, "child_ns": [], "match": None})
+    else:
+        match = not parent_only and not child_only
+        delegation = Signal(
+            "pass" if match else "warn",
+            "high",
+            "dns",
+            {**base, "child_ns": report.child_ns, "match": match, "parent_only": parent_only, "child_only": child_only},
+        )
+
+    lame = [f"{s.ns}/{s.address}" for s in report.lame]
+    unreachable = [f"{s.ns}/{s.address}" for s in report.servers if s.status == "unreachable"]
+    lame_details = {"lame": lame, "unresolved_ns": report.unresolved_ns, "unreachable_from_here": unreachable, "servers": servers}
+    if not report.healthy:
+        lame_status = "fail" if lame or report.unresolved_ns else "unknown"
+    else:
+        lame_status = "warn" if lame or report.unresolved_ns else "pass"
+    lame_sig = Signal(lame_status, "high" if lame_status != "unknown" else "low", "dns", lame_details)
+
+    serials = report.serials
+    if not serials:
+        serial_sig = Signal("unknown", "low", "dns", {"serials": {}, "skew": None})
+    else:
+        skew = serial_skew(list(serials.values()))
+        serial_sig = Signal("pass" if skew == 0 else "warn", "high" if len(serials) > 1 else "medium", "dns", {"serials": serials, "skew": skew})
+    return {"delegation": delegation, "lame_servers": lame_sig, "soa_serial": serial_sig}
+
+
+def check_integrity(
+    checker: DelegationChecker, domain: str, expected_cfg: NsPolicy | dict[str, Any], timeout: float | None
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    with retry.domain_budget(timeout):
+        signals = {"nameservers": check_nameservers(domain, expected_cfg)}
+        signals.update(delegation_signals(checker.check(domain)))
+    profiling.observe_domain(domain, time.perf_counter() - started)
+    return {"domain": domain, "generated_at_utc": now_utc(), "signals": {k: v.as_dict() for k, v in signals.items()}}
+
+
+def integrity_main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(
+        prog="domain-security-monitor.py ns-integrity",
+        description="Bulk NS integrity: parent delegation vs authoritative NS, lame servers and SOA serial skew",
+    )
+    p.add_argument("--domain", help="Single domain to check")
+    p.add_argument("--input-file", help="Batch file with one domain per line (- reads stdin)")
+    p.add_argument("--expected-ns", default=str(DEFAULT_EXPECTED_NS_FILE), help="Expected nameserver policy JSON")
+    p.add_argument("--ns-policy-cache", metavar="FILE", help="Cache the compiled nameserver policy here for fast startup")
+    p.add_argument("--output", choices=["json", "ndjson", "markdown", "text"], default="json")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Domains checked in parallel")
+    p.add_argument("--domain-timeout", type=float, default=30.0, help="Per-domain deadline in seconds (0 disables)")
+    p.add_argument("--server-timeout", type=float, default=2.0, help="Seconds to wait for each authoritative server")
+    p.add_argument("--authoritative-port", type=int, default=53, help="Port for direct parent/authoritative queries; for test rigs")
+    add_lookup_args(p)
+    args = p.parse_args(argv)
+    if not args.domain and not args.input_file:
+        p.error("provide --domain or --input-file")
+    if args.dns_backend != "native":
+        p.error("ns-integrity queries servers directly and needs --dns-backend native")
+
+    prof = profiling.enable("domain-security-monitor") if args.profile or args.profile_export else None
+    cache = configure_lookups(args)
+    expected_cfg = load_policy(args.expected_ns, args.ns_policy_cache)
+    concurrency = max(1, args.concurrency)
+    direct = Resolver.direct(timeout=args.server_timeout)
+    deduper = Deduper()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="domain") as domain_pool, ThreadPoolExecutor(
+        max_workers=concurrency * 8, thread_name_prefix="nsprobe"
+    ) as probe_pool:
+        checker = DelegationChecker(direct, dns_lookup, probe_pool, args.authoritative_port, args.server_timeout)
+
+        def results() -> Iterator[dict[str, Any]]:
+            nonlocal failed
+            window = concurrency * 4
+            pending: deque[Future] = deque()
+            for domain in iter_domains(args, deduper):
+                pending.append(domain_pool.submit(check_integrity, checker, domain, expected_cfg, args.domain_timeout))
+                while pending and (len(pending) >= window or pending[0].done()):
+                    item = pending.popleft().result()
+                    failed += any(sig["status"] == "fail" for sig in item["signals"].values())
+                    yield item
+            while pending:
+                item = pending.popleft().result()
+                failed += any(sig["status"] == "fail" for sig in item["signals"].values())
+                yield item
+
+        try:
+            if args.output in ("markdown", "text"):
+                write_report(results(), args.output, sys.stdout)
+            elif args.output == "ndjson":
+                for item in results():
+                    sys.stdout.write(json.dumps(item, separators=(",", ":")) + "\n")
+                    sys.stdout.flush()
+            else:
+                collected = list(results())
+                metadata: dict[str, Any] = {"ns_integrity": checker.stats(), "retry": retry.current().stats()}
+                if cache is not None:
+                    metadata["dns_cache"] = cache.stats()
+                print(json.dumps({"count": len(collected), "results": collected, "metadata": metadata}, indent=2))
+        finally:
+            deduper.close()
+            direct.close()
+            if cache is not None:
+                cache.save()
+            if prof is not None:
+                if args.profile:
+                    sys.stderr.write(prof.render_text())
+                if args.profile_export:
+                    prof.export(args.profile_export)
+    return 2 if failed else 0
+
+
+def check_registration(checker: RegistrationChecker, domain: str, timeout: float | None) -> dict[str, Any]:
+    started = time.perf_counter()
+    with retry.domain_budget(timeout):
+        result = checker.check(domain).to_dict()
+    result["checked_utc"] = now_utc()
+    profiling.observe_domain(domain, time.perf_counter() - started)
+    return result
+
+
+def iter_registrations(
+    domains: Iterable[str],
+    checker: RegistrationChecker,
+    checkpoint: Checkpoint | None = None,
+    concurrency: int = DEFAULT_REGISTRATION_CONCURRENCY,
+    timeout: float | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Check domains on a bounded worker pool, yielding results in input order.
+
+    Domains already settled in the checkpoint are replayed from it (marked
+    ``resumed``) instead of being looked up again; new settled results are
+    recorded as they are yielded.
+    """
+    concurrency = max(1, int(concurrency))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="registration") as pool:
+        window = concurrency * 4
+        pending: deque[Future] = deque()
+
+        def emit() -> dict[str, Any]:
+            item = pending.popleft().result()
+            if checkpoint is not None and not item.get("resumed"):
+                checkpoint.record(item)
+            return item
+
+        for domain in domains:
+            stored = checkpoint.get(domain) if checkpoint is not None else None
+            if stored is not None:
+                fut: Future = Future()
+                fut.set_result({**stored, "resumed": True})
+            else:
+                fut = pool.submit(check_registration, checker, domain, timeout)
+            pending.append(fut)
+            while pending and (len(pending) >= window or pending[0].done()):
+                yield emit()
+        while pending:
+            yield emit()
+
+
+def registered_main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(
+        prog="domain-security-monitor.py registered",
+        description="Bulk registered/unregistered check: DNS NS/SOA first, then RDAP, WHOIS only when still ambiguous",
+    )
+    p.add_argument("--domain", help="Single domain to check")
+    p.add_argument("--input-file", help="Batch file with one domain per line (- reads stdin)")
+    p.add_argument("--output", choices=["json", "ndjson", "text"], default="ndjson")
+    p.add_argument("--checkpoint", metavar="FILE", help="SQLite checkpoint of settled results; rerun with the same file to resume")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_REGISTRATION_CONCURRENCY, help="Domains checked in parallel")
+    p.add_argument("--domain-timeout", type=float, default=60.0, help="Per-domain deadline in seconds across all tiers (0 disables)")
+    add_lookup_args(p)
+    args = p.parse_args(argv)
+    if not args.domain and not args.input_file:
+        p.error("provide --domain or --input-file")
+    if args.input_file and args.input_file != "-" and not Path(args.input_file).exists():
+        p.error(f"file not found: {args.input_file}")
+
+    prof = profiling.enable("domain-registered") if args.profile or args.profile_export else None
+    cache = configure_lookups(args)
+    rdap = _RDAP
+    assert rdap is not None
+    checker = RegistrationChecker(dns_lookup, rdap_domain_status, whois_lookup, lambda d: rdap.base_for(d) != rdap.fallback_base)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    deduper = Deduper()
+    results = iter_registrations(iter_domains(args, deduper), checker, checkpoint, args.concurrency, args.domain_timeout)
+    counts = {status: 0 for status in REGISTRATION_STATUSES}
+    out = sys.stdout
+    try:
+        collected = []
+        for item in results:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+            if args.output == "ndjson":
+                out.write(json.dumps(item, separators=(",", ":")) + "\n")
+                out.flush()
+            elif args.output == "text":
+                out.write(f"{item['domain']:<40} {item['status']:<13} {item['data_source']}\n")
+                out.flush()
+            else:
+                collected.append(item)
+        if args.output == "json":
+            metadata: dict[str, Any] = {"tiers": checker.stats(), "retry": retry.current().stats()}
+            if checkpoint is not None:
+                metadata["checkpoint"] = checkpoint.stats()
+            if cache is not None:
+                metadata["dns_cache"] = cache.stats()
+            print(json.dumps({"count": len(collected), "summary": counts, "results": collected, "metadata": metadata}, indent=2))
+        elif args.output == "text":
+            out.write(f"\nSummary:\n{counts['registered']} domains are registered\n{counts['unregistered']} domains are not registered\n")
+            if counts["unknown"]:
+                out.write(f"{counts['unknown']} domains could not be settled (rerun with the same --checkpoint to retry them)\n")
+    finally:
+        deduper.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if cache is not None:
+            cache.save()
+        if prof is not None:
+            if args.profile:
+                sys.stderr.write(prof.render_text())
+            if args.profile_export:
+                prof.export(args.profile_export)
+    return 0
+
+
+def _param_domain(params: dict[str, str], key: str = "domain") -> str:
+    value = (params.get(key) or "").strip().rstrip(".").lower()
+    if not value or "." not in value or not re.fullmatch(r"[a-z0-9_.-]+", value):
+        raise BadRequest(f"{key} must be a domain name")
+    return value
+
+
+def serve_main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(
+        prog="domain-security-monitor.py serve",
+        description="Keep resolver, cache, RDAP and WHOIS state warm and answer queries over a local socket",
+    )
+    p.add_argument("--listen", default=default_address(), help="Unix socket path, or host:port for localhost HTTP (default: %(default)s)")
+    p.add_argument("--expected-ns", default=str(DEFAULT_EXPECTED_NS_FILE), help="Expected nameserver policy JSON")
+    p.add_argument("--ns-policy-cache", metavar="FILE", help="Cache the compiled nameserver policy here for fast startup")
+    p.add_argument("--dkim-selectors", default=str(DEFAULT_DKIM_SELECTORS_FILE), help="Per-domain DKIM selectors JSON")
+    p.add_argument("--concurrency", type=int, default=32, help="Domains analysed at once across all requests")
+    p.add_argument("--domain-timeout", type=float, default=DEFAULT_DOMAIN_TIMEOUT, help="Per-request deadline in seconds (0 disables)")
+    p.add_argument("--server-timeout", type=float, default=2.0, help="Seconds to wait for each authoritative server (ns-integrity)")
+    p.add_argument("--authoritative-port", type=int, default=53, help="Port for direct parent/authoritative queries (ns-integrity); for test rigs")
+    p.add_argument("--verbose", action="store_true", help="Log every request to stderr")
+    add_lookup_args(p)
+    args = p.parse_args(argv)
+    if not is_local_address(args.listen):
+        p.error("--listen takes a Unix socket path or a loopback host:port")
+
+    prof = profiling.enable("domain-security-monitor serve") if args.profile or args.profile_export else None
+    cache = configure_lookups(args)
+    configure_dkim()
+    configure_spf(SpfEvaluator(dns_lookup))
+    expected_cfg = load_policy(args.expected_ns, args.ns_policy_cache)
+    dkim_cfg = load_json(Path(args.dkim_selectors), {})
+    rdap = _RDAP
+    assert rdap is not None
+    registration = RegistrationChecker(dns_lookup, rdap_domain_status, whois_lookup, lambda d: rdap.base_for(d) != rdap.fallback_base)
+    concurrency = max(1, args.concurrency)
+    signal_pool = ThreadPoolExecutor(max_workers=concurrency * len(SIGNAL_NAMES), thread_name_prefix="signal")
+    probe_pool = ThreadPoolExecutor(max_workers=concurrency * 8, thread_name_prefix="nsprobe")
+    direct = Resolver.direct(timeout=args.server_timeout)
+    delegation = DelegationChecker(direct, dns_lookup, probe_pool, args.authoritative_port, args.server_timeout)
+    # Caps concurrent analyses; the HTTP server itself runs a thread per connection.
+    slots = threading.BoundedSemaphore(concurrency)
+    timeout = args.domain_timeout
+
+    def analyse(params: dict[str, str]) -> dict[str, Any]:
+        domain = _param_domain(params)
+        with slots:
+            item = analyse_domain(domain, expected_cfg, dkim_cfg, signal_pool, timeout)
+        return {"count": 1, "results": [item]}
+
+    def registered(params: dict[str, str]) -> dict[str, Any]:
+        domain = _param_domain(params)
+        with slots:
+            return check_registration(registration, domain, timeout)
+
+    def integrity(params: dict[str, str]) -> dict[str, Any]:
+        domain = _param_domain(params)
+        with slots:
+            return check_integrity(delegation, domain, expected_cfg, timeout)
+
+    def dns(params: dict[str, str]) -> dict[str, Any] | str:
+        name = _param_domain(params, "name")
+        rtype = (params.get("type") or "A").upper()
+        if not re.fullmatch(r"[A-Z0-9]{1,10}", rtype):
+            raise BadRequest("type must be a record type such as A, MX or TXT")
+        records, source, rcode = dns_lookup(rtype, name)
+        if params.get("format") == "text":
+            return "".join(f"{r}\n" for r in records)
+        return {"name": name, "type": rtype, "records": records, "source": source, "rcode": rcode}
+
+    def whois(params: dict[str, str]) -> dict[str, Any] | str:
+        domain = _param_domain(params)
+        text, source = whois_lookup(domain)
+        if params.get("format") == "text":
+            return text
+        return {"domain": domain, "source": source, "text": text}
+
+    def rdap_route(params: dict[str, str]) -> dict[str, Any]:
+        domain = _param_domain(params)
+        payload, source = rdap_domain(domain)
+        return {"domain": domain, "source": source, "rdap": payload}
+
+    def stats() -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "query_planner": planner_stats(),
+            "spf": spf_evaluator().stats(),
+            "registration_tiers": registration.stats(),
+            "ns_integrity": delegation.stats(),
+            "retry": retry.current().stats(),
+        }
+        if cache is not None:
+            out["dns_cache"] = cache.stats()
+        return out
+
+    routes = {
+        "analyse": analyse,
+        "registered": registered,
+        "ns-integrity": integrity,
+        "dns": dns,
+        "whois": whois,
+        "rdap": rdap_route,
+    }
+    server = QueryServer(routes, args.listen, stats, args.verbose)
+    try:
+        server.bind()
+    except OSError as exc:
+        print(json.dumps({"error": f"cannot listen on {args.listen}: {exc}"}, indent=2))
+        return 1
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    sys.stderr.write(f"serving {', '.join(sorted(routes))} on {args.listen}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal_pool.shutdown(wait=False, cancel_futures=True)
+        probe_pool.shutdown(wait=False, cancel_futures=True)
+        direct.close()
+        if cache is not None:
+            cache.save()
+        if prof is not None:
+            if args.profile:
+                sys.stderr.write(prof.render_text())
+            if args.profile_export:
+                prof.export(args.profile_export)
+    return 0
 
 
 def main() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        return serve_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "history":
+        return history_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "registered":
+        return registered_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "ns-integrity":
+        return integrity_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        return merge_main(sys.argv[2:])
     args = parse_args()
-    domains = load_domains(args)
-    if not domains:
+    if args.update_rdap_bootstrap:
+        try:
+            count = update_bootstrap(args.rdap_bootstrap)
+        except Exception as exc:
+            print(json.dumps({"error": f"bootstrap update failed: {str(exc)[:120]}"}, indent=2))
+            return 1
+        print(json.dumps({"rdap_bootstrap": args.rdap_bootstrap, "services": count}, indent=2))
+        return 0
+
+    if not args.domain and not args.input_file and not args.queue:
         print(json.dumps({"error": "provide --domain or --input-file"}, indent=2))
         return 2
-
-    expected_cfg = load_json(Path(args.expected_ns), {"default": [], "domain_overrides": {}})
+    if args.changes_only and not args.history:
+        print(json.dumps({"error": "--changes-only needs --history"}, indent=2))
+        return 2
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as exc:
+            print(json.dumps({"error": str(exc)}, indent=2))
+            return 2
+    if args.output == "columnar" and sys.stdout.isatty():
+        print(json.dumps({"error": "--output columnar writes a binary file; redirect stdout"}, indent=2))
+        return 2
+    if args.queue and (shard or args.output != "ndjson"):
+        print(json.dumps({"error": "--queue workers write --output ndjson and cannot be combined with --shard"}, indent=2))
+        return 2
+    deduper = Deduper()
+    queue = None
+    if args.queue:
+        queue = WorkQueue(args.queue, args.worker_id, args.lease_seconds, args.lease_batch, args.max_attempts)
+        if args.domain or args.input_file:
+            queue.load(iter_domains(args, deduper))
+        first = None
+    else:
+        domains = iter_domains(args, deduper)
+        if shard is not None:
+            domains = in_shard(domains, *shard)
+        first = next(domains, None)
+        if first is None and shard is None:
+            print(json.dumps({"error": "provide --domain or --input-file"}, indent=2))
+            return 2
+
+    prof = profiling.enable("domain-security-monitor") if args.profile or args.profile_export else None
+    cache = configure_lookups(args)
+    configure_dkim(args.dkim_stop_early, not args.no_dkim_nxdomain_cut)
+    configure_spf(SpfEvaluator(dns_lookup))
+    expected_cfg = load_policy(args.expected_ns, args.ns_policy_cache)
     dkim_cfg = load_json(Path(args.dkim_selectors), {})
-
-    results = [analyse_domain(d, expected_cfg, dkim_cfg) for d in domains]
-
-    if args.output == "markdown":
-        print(render_markdown(results), end="")
-    elif args.output == "text":
-        print(render_text(results), end="")
+    state = None
+    if args.state:
+        digest = config_digest(args.expected_ns, args.dkim_selectors)
+        state = StateStore(args.state, digest, args.min_recheck, args.max_recheck)
+    configure_state(state)
+
+    if queue is not None:
+        results = iter_queue_analyses(queue, expected_cfg, dkim_cfg, args.concurrency, args.domain_timeout)
     else:
-        print(json.dumps({"count": len(results), "results": results}, indent=2))
+        results = iter_analyses(chain([first] if first else [], domains), expected_cfg, dkim_cfg, args.concurrency, args.domain_timeout)
+    history = HistoryStore(args.history) if args.history else None
+    history_totals: dict[str, int] = {}
+    if history is not None:
+        run_id = history.begin_run("domain-security-monitor")
+        results = record_history(results, history, run_id, args.changes_only, history_totals)
+    try:
+        if args.output in ("markdown", "text"):
+            write_report(results, args.output, sys.stdout)
+        elif args.output in FLAT_OUTPUTS:
+            write_flat(results, args.output, sys.stdout, {"shard": args.shard} if shard is not None else None)
+        elif args.output == "ndjson":
+            for item in results:
+                sys.stdout.write(json.dumps(item, separators=(",", ":")) + "\n")
+                sys.stdout.flush()
+        else:
+            # Hold each result as its encoded text rather than as nested dicts until the count is known.
+            bodies = [json_body(item) for item in results]
+            metadata: dict[str, Any] = {}
+            if cache is not None:
+                metadata["dns_cache"] = cache.stats()
+            metadata["query_planner"] = planner_stats()
+            metadata["spf"] = spf_evaluator().stats()
+            metadata["retry"] = retry.current().stats()
+            if state is not None:
+                metadata["incremental"] = state.stats()
+            if history is not None:
+                metadata["history"] = {"store": args.history, "run_id": run_id, **history_totals}
+            if shard is not None:
+                metadata["shard"] = {"index": shard[0], "count": shard[1]}
+            write_json_document(sys.stdout, len(bodies), bodies, metadata)
+    finally:
+        deduper.close()
+        if queue is not None:
+            queue.flush()
+            sys.stderr.write(f"queue: {json.dumps(queue.stats())}\n")
+            queue.close()
+        if state is not None:
+            state.close()
+        if history is not None:
+            history.finish_run(run_id, history_totals.get("domains", 0), history_totals.get("changes", 0))
+            history.close()
+        if cache is not None:
+            cache.save()
+        if prof is not None:
+            if args.profile:
+                sys.stderr.write(prof.render_text())
+            if args.profile_export:
+                prof.export(args.profile_export)
     return 0
 
 
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import sys
+if len(sys.argv) > 1 and sys.argv[1] in ("-a", "--author"):
+    print("Author: FoxSecIntel")
+    print("Repository: https://github.com/FoxSecIntel/DNS-analysis")
+    print("Tool: domain-typosquat.py")
+    raise SystemExit(0)
+
+
+import argparse
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dnsanalysis.backends import BACKENDS, DEFAULT_DOH_URL, BackendChain, BackendError, build_chain
+from dnsanalysis.permute import DEFAULT_TLDS, TECHNIQUES, permutations
+from dnsanalysis.ratelimit import TokenBucket
+from dnsanalysis.stream import Deduper, iter_lines, map_unordered
+
+VERSION = "1.0.0"
+DEFAULT_EXPECTED_NS_FILE = Path(__file__).resolve().parent / "config" / "expected_ns.json"
+DEFAULT_CONCURRENCY = 64
+DEFAULT_QPS = 200.0
+__r17q_blob = "wqhWaWN0b3J5IGlzIG5vdCB3aW5uaW5nIGZvciBvdXJzZWx2ZXMsIGJ1dCBmb3Igb3RoZXJzLiAtIFRoZSBNYW5kYWxvcmlhbsKoCg=="
+
+
+def policy_brands(path):
+    """Exact (non-wildcard) domains named in the nameserver policy."""
+    try:
+        cfg = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    names = list((cfg.get("domain_overrides") or {}).keys())
+    for group in (cfg.get("groups") or {}).values():
+        if isinstance(group, dict):
+            names.extend(group.get("domains") or [])
+    return [n.lower().strip(".") for n in names if "*" not in n and "." in n]
+
+
+def iter_brands(args):
+    seen = set()
+    sources = [args.brands or []]
+    if args.file:
+        sources.append(iter_lines(args.file))
+    if not args.brands and not args.file:
+        sources.append(policy_brands(args.expected_ns))
+    for source in sources:
+        for raw in source:
+            brand = raw.strip().lower().strip(".")
+            if brand and brand not in seen:
+                seen.add(brand)
+                yield brand
+
+
+def iter_candidates(brands, techniques, tlds, cross_tlds, deduper, counts):
+    """Unique (brand, technique, candidate) tuples, produced lazily across all brands."""
+    brands = list(brands)
+    for brand in brands:
+        deduper.add(brand)
+    for brand in brands:
+        for technique, candidate in permutations(brand, techniques, tlds, cross_tlds):
+            counts["generated"] += 1
+            if deduper.add(candidate):
+                counts["unique"] += 1
+                yield brand, technique, candidate
+
+
+class ExistenceCheck:
+    """Delegation (NS) check per candidate; existing names also get their A and MX records."""
+
+    def __init__(self, chain, limiter=None):
+        self.chain = chain
+        self.limiter = limiter
+
+    def query(self, name, rtype):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return self.chain.query(name, rtype)
+
+    def __call__(self, item):
+        brand, technique, candidate = item
+        ns = self.query(candidate, "NS")
+        row = {"domain": candidate, "brand": brand, "technique": technique, "exists": None, "rcode": ns.rcode}
+        if ns.rcode == "NXDOMAIN":
+            row["exists"] = False
+        elif ns.rcode == "NOERROR":
+            a = self.query(candidate, "A")
+            row["exists"] = bool(ns.records or a.records)
+            if row["exists"]:
+                row["ns"] = [r.rstrip(".") for r in ns.records]
+                row["a"] = a.records
+                row["mx"] = [r.rstrip(".") for r in self.query(candidate, "MX").records]
+        return row
+
+
+def split_list(values, default=()):
+    items = [v.strip().lower() for item in (values or []) for v in item.split(",") if v.strip()]
+    return items or list(default)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate typosquat permutations of brand domains and check which exist in DNS")
+    parser.add_argument("brands", nargs="*", help="Brand domains (default: exact domains in --expected-ns)")
+    parser.add_argument("-f", "--file", help="File with one brand domain per line (- reads stdin)")
+    parser.add_argument("-m", action="store_true", help="Print hidden message")
+    parser.add_argument("--version", action="store_true", help="Show script version")
+    parser.add_argument("--expected-ns", default=str(DEFAULT_EXPECTED_NS_FILE), help="Nameserver policy whose domains are the default brands")
+    parser.add_argument("--technique", action="append", metavar="NAME", help=f"Permutation techniques (repeatable or comma-separated): {', '.join(TECHNIQUES)}. Default: all")
+    parser.add_argument("--tlds", action="append", metavar="LIST", help="TLDs for tld-swap (and --cross-tlds), comma-separated (repeatable)")
+    parser.add_argument("--tld-file", metavar="FILE", help="TLDs for tld-swap, one per line")
+    parser.add_argument("--cross-tlds", action="store_true", help="Also emit every label permutation under every TLD")
+    parser.add_argument("--no-dns", action="store_true", help="Only print the unique candidates, without DNS checks")
+    parser.add_argument("--all", action="store_true", help="Also report candidates that do not exist")
+    parser.add_argument("--output", choices=["text", "ndjson"], default="text", help="Output format")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="DNS checks in flight")
+    parser.add_argument("--qps", type=float, default=DEFAULT_QPS, help="Maximum DNS queries per second")
+    parser.add_argument(
+        "--resolver",
+        action="append",
+        metavar="BACKEND",
+        help=f"Resolver backend, in fallback order (repeatable or comma-separated): {', '.join(('auto',) + BACKENDS)}. Default: auto",
+    )
+    parser.add_argument("--nameserver", action="append", help="Nameserver for the native/dnspython backends, e.g. 9.9.9.9 or 127.0.0.1:5353 (repeatable)")
+    parser.add_argument("--doh-url", default=DEFAULT_DOH_URL, help="DNS-over-HTTPS JSON endpoint for the doh backend")
+    args = parser.parse_args()
+
+    if args.version:
+        print(f"domain-typosquat.py {VERSION}")
+        return 0
+
+    if args.m:
+        print(base64.b64decode(__r17q_blob).decode("utf-8", errors="replace"), end="")
+        return 0
+
+    if args.file and args.file != "-" and not Path(args.file).exists():
+        print(f"Error: file not found: {args.file}", file=sys.stderr)
+        return 1
+    techniques = split_list(args.technique, TECHNIQUES)
+    unknown = [t for t in techniques if t not in TECHNIQUES]
+    if unknown:
+        parser.error(f"unknown technique: {', '.join(unknown)}")
+    tlds = split_list(args.tlds) + (list(iter_lines(args.tld_file)) if args.tld_file else [])
+    tlds = [t.lower().strip(".") for t in tlds] or list(DEFAULT_TLDS)
+
+    brands = list(iter_brands(args))
+    if not brands:
+        print("No brand domains supplied. Use positional args, --file or --expected-ns.", file=sys.stderr)
+        return 1
+
+    counts = {"brands": len(brands), "generated": 0, "unique": 0, "checked": 0, "existing": 0}
+    deduper = Deduper()
+    candidates = iter_candidates(brands, techniques, tlds, args.cross_tlds, deduper, counts)
+    out = sys.stdout
+    started = time.perf_counter()
+    try:
+        if args.no_dns:
+            for brand, technique, candidate in candidates:
+                if args.output == "ndjson":
+                    out.write(json.dumps({"domain": candidate, "brand": brand, "technique": technique}, separators=(",", ":")) + "\n")
+                else:
+                    out.write(f"{candidate}\n")
+            return 0
+        return check_candidates(parser, args, candidates, counts)
+    finally:
+        deduper.close()
+        elapsed = time.perf_counter() - started
+        sys.stderr.write(
+            f"# {counts['brands']} brands, {counts['generated']} permutations, {counts['unique']} unique"
+            + ("" if args.no_dns else f", {counts['checked']} checked, {counts['existing']} exist")
+            + f" in {elapsed:.1f}s\n"
+        )
+
+
+def check_candidates(parser, args, candidates, counts):
+    backends = split_list(args.resolver, ["auto"])
+    unknown = [b for b in backends if b not in ("auto",) + BACKENDS]
+    if unknown:
+        parser.error(f"unknown resolver backend: {', '.join(unknown)}")
+    try:
+        chain: BackendChain = build_chain(backends, args.nameserver, args.doh_url)
+    except (BackendError, ValueError) as exc:
+        parser.error(str(exc))
+    check = ExistenceCheck(chain, TokenBucket(args.qps, max(1, int(args.qps // 10))))
+    out = sys.stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="exists") as pool:
+            for row in map_unordered(pool, check, candidates, max(1, args.concurrency) * 2):
+                counts["checked"] += 1
+                counts["existing"] += bool(row["exists"])
+                if not row["exists"] and not args.all:
+                    continue
+                if args.output == "ndjson":
+                    out.write(json.dumps(row, separators=(",", ":")) + "\n")
+                else:
+                    state = {True: "EXISTS", False: "free", None: row["rcode"].lower()}[row["exists"]]
+                    addrs = ", ".join(row.get("a") or [])
+                    out.write(f"{row['domain']:<40} {row['technique']:<14} {state:<9} {addrs}\n")
+                out.flush()
+    finally:
+        chain.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,7 @@
 #!/bin/bash
 if [[ "${1:-}" == "-a" || "${1:-}" == "--author" ]]; then
   echo "Author: FoxSecIntel"
-  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis
+  echo "Repository: https://github.com/FoxSecIntel/DNS-analysis"
   echo "Tool: qa_check.sh"
   exit 0
 fi
@@ -38,6 +38,11 @@ for f in ./*.py; do
   python3 -m py_compile "$f"
   echo "  OK  $f"
 done
+for f in ./dnsanalysis/*.py ./bench/*.py; do
+  [[ -f "$f" ]] || continue
+  python3 -m py_compile "$f"
+  echo "  OK  $f"
+done
 
 if command -v shellcheck >/dev/null 2>&1; then
   echo "[3/3] shellcheck"